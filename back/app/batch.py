@@ -0,0 +1,316 @@
+"""
+Analyse d'un corpus de progressions hors ligne, sans passer par HTTP.
+
+    python -m app.batch corpus.jsonl -o resultats.jsonl --detector local
+    cat corpus.csv | python -m app.batch - --format csv -o resultats.jsonl
+
+Chaque progression passe par le même pipeline que /analyze. Les résultats sont écrits
+au fil de l'eau (une ligne JSON par progression) ; relancer la commande sur le même
+fichier de sortie reprend là où elle s'était arrêtée.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from dotenv import load_dotenv
+
+from app.pipeline import DEFAULT_MODEL, DETECTORS, build_progression_analysis, detect_key
+from app.schema import ChordItem
+from app.utils.common import as_chord
+
+# Séparateurs des accords dans une cellule CSV ou une chaîne JSON (ex: "Dm7 G7 | Cmaj7")
+_CHORD_SEPARATORS = re.compile(r"[\s,|]+")
+
+# Étapes chronométrées dans chaque worker
+STAGES = ("parse", "detection", "analysis", "serialization")
+
+
+class BatchRecord(NamedTuple):
+    id: str  # Identifiant de la progression (numéro de ligne par défaut)
+    chords: List[str]
+    error: Optional[str] = None  # Ligne illisible : écrite en erreur sans être analysée
+
+
+class BatchOutcome(NamedTuple):
+    line: str  # Ligne JSON à écrire dans le fichier de résultats
+    failed: bool
+    timings: Dict[str, float]  # Secondes passées dans chaque étape
+
+
+class BatchStats:
+    """Compteurs et durées cumulées d'une exécution."""
+
+    def __init__(self) -> None:
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+
+    def add(self, outcome: BatchOutcome) -> None:
+        self.processed += 1
+        self.failed += outcome.failed
+        for stage, seconds in outcome.timings.items():
+            self.stage_seconds[stage] += seconds
+
+    def report(self, elapsed: float) -> str:
+        throughput = self.processed / elapsed if elapsed > 0 else 0.0
+        lines = [
+            f"{self.processed} progressions analysées ({self.failed} en erreur, "
+            f"{self.skipped} déjà traitées) en {elapsed:.2f} s : {throughput:.1f} progressions/s",
+        ]
+        for stage, seconds in self.stage_seconds.items():
+            average = 1000 * seconds / self.processed if self.processed else 0.0
+            lines.append(f"  {stage:<14} {seconds:8.2f} s  ({average:.2f} ms / progression)")
+        return "\n".join(lines)
+
+
+def split_chords(value: Any) -> List[str]:
+    """Accords d'une cellule : liste de noms, ou chaîne séparée par espaces, virgules ou |."""
+    if isinstance(value, str):
+        return [chord for chord in _CHORD_SEPARATORS.split(value) if chord]
+    return [str(chord) for chord in value]
+
+
+def read_records(
+    stream: IO[str], fmt: str, id_column: str = "id", chords_column: str = "chords"
+) -> Iterator[BatchRecord]:
+    """
+    Lit les progressions une à une (JSONL ou CSV). Une ligne JSON contient soit une
+    liste de noms d'accords, soit des `chordsData` comme la requête /analyze. Une
+    ligne illisible donne un enregistrement en erreur, sans interrompre la lecture.
+    """
+    if fmt == "csv":
+        yield from _read_csv_records(stream, id_column, chords_column)
+        return
+    if fmt != "jsonl":
+        raise ValueError(f"Format '{fmt}' inconnu (jsonl ou csv).")
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        record_id = str(number)
+        try:
+            data = json.loads(line)
+            record_id = str(data.get(id_column, number))
+            if "chordsData" in data:
+                chords = [f"{item['root']}{item.get('quality', '')}" for item in data["chordsData"]]
+            else:
+                chords = split_chords(data[chords_column])
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            yield BatchRecord(record_id, [], f"Ligne {number} illisible : {error!r}")
+            continue
+        yield BatchRecord(record_id, chords)
+
+
+def _read_csv_records(stream: IO[str], id_column: str, chords_column: str) -> Iterator[BatchRecord]:
+    reader = csv.DictReader(stream)
+    number = 0
+    while True:
+        number += 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            yield BatchRecord(str(number), [], f"Ligne {number} illisible : {error!r}")
+            continue
+        record_id = row.get(id_column) or str(number)
+        try:
+            yield BatchRecord(record_id, split_chords(row[chords_column]))
+        except (KeyError, TypeError) as error:
+            yield BatchRecord(record_id, [], f"Ligne {number} illisible : {error!r}")
+
+
+def to_chord_items(chords: List[str]) -> List[ChordItem]:
+    """Convertit des noms d'accords en `ChordItem`. Lève ValueError si l'un est inconnu."""
+    items = []
+    for index, name in enumerate(chords):
+        chord = as_chord(name)
+        if chord is None:
+            raise ValueError(f"Accord non reconnu : '{name}'")
+        root = chord.name[: len(chord.name) - len(chord.quality)]
+        items.append(ChordItem(id=index, root=root, quality=chord.quality))
+    return items
+
+
+def analyze_record(record: BatchRecord, detector: str, model: str) -> BatchOutcome:
+    """Analyse une progression comme /analyze et chronomètre chaque étape."""
+    timings = dict.fromkeys(STAGES, 0.0)
+    started = time.perf_counter()
+    output: Dict[str, Any] = {"id": record.id}
+    try:
+        if record.error is not None:
+            raise ValueError(record.error)
+        if not record.chords:
+            raise ValueError("Progression cannot be empty")
+        progression_data = to_chord_items(record.chords)
+        progression = [f"{item.root}{item.quality}" for item in progression_data]
+        timings["parse"], started = _lap(started)
+
+        analysis_result = detect_key(progression, detector, model)
+        timings["detection"], started = _lap(started)
+
+        output["result"] = build_progression_analysis(progression_data, analysis_result)
+        timings["analysis"], started = _lap(started)
+    except Exception as error:
+        # Une progression en erreur n'interrompt pas le corpus
+        output["error"] = str(error)
+    line = json.dumps(output, ensure_ascii=False)
+    timings["serialization"], _ = _lap(started)
+    return BatchOutcome(line, "error" in output, timings)
+
+
+def _lap(started: float) -> Tuple[float, float]:
+    now = time.perf_counter()
+    return now - started, now
+
+
+def load_done_ids(path: str) -> Set[str]:
+    """
+    Identifiants déjà analysés avec succès dans un fichier de résultats (reprise).
+    Les progressions en erreur sont refaites ; leur nouvelle ligne suit l'ancienne.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as results:
+        for line in results:
+            try:
+                result = json.loads(line)
+                if "error" not in result:
+                    done.add(str(result["id"]))
+            except (ValueError, KeyError, TypeError):
+                # Dernière ligne tronquée par une interruption : elle sera refaite
+                continue
+    return done
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as results:
+        results.seek(0, os.SEEK_END)
+        if results.tell() == 0:
+            return True
+        results.seek(-1, os.SEEK_END)
+        return results.read(1) == b"\n"
+
+
+def run_batch(
+    records: Iterable[BatchRecord],
+    output: IO[str],
+    detector: str = "local",
+    model: str = DEFAULT_MODEL,
+    workers: int = 1,
+    max_in_flight: Optional[int] = None,
+    done_ids: Optional[Set[str]] = None,
+) -> BatchStats:
+    """
+    Analyse les progressions au fil de leur lecture. Avec plusieurs workers, au plus
+    `max_in_flight` progressions sont en cours à la fois : la lecture avance au rythme
+    de l'analyse, le corpus n'est jamais chargé entièrement. Les résultats sont écrits
+    dans l'ordre où ils se terminent.
+    """
+    if detector not in DETECTORS:
+        raise ValueError(f"Détecteur '{detector}' inconnu ({', '.join(DETECTORS)}).")
+    stats = BatchStats()
+    done_ids = done_ids or set()
+
+    def pending_records() -> Iterator[BatchRecord]:
+        for record in records:
+            if record.id in done_ids:
+                stats.skipped += 1
+                continue
+            yield record
+
+    def write(outcome: BatchOutcome) -> None:
+        output.write(outcome.line + "\n")
+        output.flush()
+        stats.add(outcome)
+
+    if workers <= 1:
+        for record in pending_records():
+            write(analyze_record(record, detector, model))
+        return stats
+
+    limit = max_in_flight or workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight: Set[Future] = set()
+        for record in pending_records():
+            if len(in_flight) >= limit:
+                in_flight = _drain(in_flight, write)
+            in_flight.add(executor.submit(analyze_record, record, detector, model))
+        while in_flight:
+            in_flight = _drain(in_flight, write)
+    return stats
+
+
+def _drain(in_flight: Set[Future], write: Callable[[BatchOutcome], None]) -> Set[Future]:
+    """Attend qu'au moins une analyse se termine et écrit les résultats disponibles."""
+    finished, remaining = wait(in_flight, return_when=FIRST_COMPLETED)
+    for future in finished:
+        write(future.result())
+    return remaining
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyse un corpus de progressions d'accords.")
+    parser.add_argument("input", help="Fichier JSONL ou CSV, ou '-' pour l'entrée standard")
+    parser.add_argument("-o", "--output", required=True, help="Fichier de résultats (JSONL)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="Déduit de l'extension")
+    parser.add_argument("--detector", choices=DETECTORS, default="local")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Modèle Gemini")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-in-flight", type=int, help="Défaut : 4 par worker")
+    parser.add_argument("--id-column", default="id")
+    parser.add_argument("--chords-column", default="chords")
+    parser.add_argument(
+        "--no-resume", action="store_true", help="Écrase le fichier de résultats existant"
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    done_ids = set() if args.no_resume else load_done_ids(args.output)
+    if not args.no_resume and os.path.exists(args.output) and not _ends_with_newline(args.output):
+        # Ligne tronquée par une interruption : les résultats repris commencent à la ligne
+        with open(args.output, "a", encoding="utf-8") as output:
+            output.write("\n")
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+    started = time.perf_counter()
+    try:
+        with open(args.output, "w" if args.no_resume else "a", encoding="utf-8") as output:
+            stats = run_batch(
+                read_records(source, fmt, args.id_column, args.chords_column),
+                output,
+                args.detector,
+                args.model,
+                args.workers,
+                args.max_in_flight,
+                done_ids,
+            )
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(stats.report(time.perf_counter() - started), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
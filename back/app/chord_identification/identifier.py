@@ -0,0 +1,201 @@
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Tuple, TypedDict
+
+import numpy as np
+
+from app.utils.common import get_note_from_index
+from app.utils.qualities import QUALITIES
+
+# Nombre maximal de propositions conservées par ensemble de notes et par basse
+MAX_MATCHES = 8
+
+# Pénalités du classement (plus le score est bas, meilleure est la proposition)
+EXTRA_NOTE_PENALTY = 100  # Note jouée absente de l'accord
+MISSING_NOTE_PENALTY = 30  # Note de l'accord non jouée
+MISSING_FIFTH_PENALTY = 10  # Quinte juste omise (courant au clavier)
+INVERSION_PENALTY = 20  # Basse sur une autre note de l'accord (renversement)
+MAX_EXTRA_NOTES = 1
+MAX_MISSING_NOTES = 2
+
+_NO_BASS = 12
+_PITCH_SETS = 1 << 12
+_POPCOUNT = np.array([bin(mask).count("1") for mask in range(_PITCH_SETS)], dtype=np.int16)
+
+
+class ChordTable(NamedTuple):
+    """Accords candidats et propositions classées pour chaque ensemble de notes et basse."""
+
+    roots: np.ndarray  # [candidat] fondamentale
+    qualities: np.ndarray  # [candidat] identifiant de qualité
+    masks: np.ndarray  # [candidat] classes de hauteur de l'accord
+    indices: np.ndarray  # [ensemble de notes][basse][rang] candidat (-1 au-delà)
+    scores: np.ndarray  # [ensemble de notes][basse][rang] score
+
+
+class ChordIdentification(TypedDict):
+    name: str
+    root: str
+    quality: str
+    bass: Optional[str]
+    score: int
+    missing_notes: List[str]
+    extra_notes: List[str]
+
+
+def _rotate(mask: int, root: int) -> int:
+    return ((mask << root) | (mask >> (12 - root))) & 0xFFF
+
+
+def _build_candidates() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Accords candidats : chaque qualité du registre sur chacune des 12 fondamentales.
+    Les alias ("M", "min", "d", "+"...) sont écartés : seule la première qualité
+    d'un même ensemble d'intervalles est proposée.
+    """
+    quality_ids: List[int] = []
+    seen_masks = set()
+    for quality in QUALITIES:
+        if quality.mask not in seen_masks:
+            seen_masks.add(quality.mask)
+            quality_ids.append(quality.id)
+
+    roots = np.repeat(np.arange(12, dtype=np.int16), len(quality_ids))
+    qualities = np.tile(np.array(quality_ids, dtype=np.int16), 12)
+    masks = np.array(
+        [_rotate(QUALITIES[q].mask, int(r)) for r, q in zip(roots, qualities)], dtype=np.int32
+    )
+    return roots, qualities, masks
+
+
+def _build_table(roots: np.ndarray, masks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Table des propositions classées : [ensemble de notes (4096)][basse (12, ou 12 = aucune)]
+    -> indices des meilleurs candidats (-1 au-delà), et leurs scores.
+    """
+    pitch_sets = np.arange(_PITCH_SETS, dtype=np.int32)[:, None]
+    chord_masks = masks[None, :]
+    root_bits = (1 << roots.astype(np.int32))[None, :]
+    fifth_bits = (1 << ((roots.astype(np.int32) + 7) % 12))[None, :]
+
+    missing_mask = chord_masks & ~pitch_sets
+    extra = _POPCOUNT[pitch_sets & ~chord_masks]
+    missing = _POPCOUNT[missing_mask]
+    # Fondamentale jouée, au plus une note étrangère et deux notes omises
+    valid = (
+        ((pitch_sets & root_bits) != 0)
+        & (extra <= MAX_EXTRA_NOTES)
+        & (missing <= MAX_MISSING_NOTES)
+    )
+    fifth_missing = (missing_mask & fifth_bits) != 0
+    base_score = (
+        EXTRA_NOTE_PENALTY * extra
+        + MISSING_NOTE_PENALTY * missing
+        - (MISSING_NOTE_PENALTY - MISSING_FIFTH_PENALTY) * fifth_missing
+        # À égalité, l'accord le plus simple (le moins de notes) d'abord
+        + _POPCOUNT[chord_masks]
+    ).astype(np.int32)
+
+    unreachable = np.iinfo(np.int32).max
+    indices = np.full((_PITCH_SETS, _NO_BASS + 1, MAX_MATCHES), -1, dtype=np.int16)
+    scores = np.zeros((_PITCH_SETS, _NO_BASS + 1, MAX_MATCHES), dtype=np.int32)
+    for bass in range(_NO_BASS + 1):
+        if bass == _NO_BASS:
+            score = base_score
+        else:
+            bass_bit = 1 << bass
+            is_root = roots[None, :] == bass
+            in_chord = (chord_masks & bass_bit) != 0
+            score = base_score + np.where(is_root | ~in_chord, 0, INVERSION_PENALTY)
+        score = np.where(valid, score, unreachable)
+
+        # Sélection partielle puis tri des MAX_MATCHES meilleurs (tri stable : à score égal,
+        # l'ordre des fondamentales puis du registre est conservé)
+        best = np.argpartition(score, MAX_MATCHES, axis=1)[:, :MAX_MATCHES]
+        best_scores = np.take_along_axis(score, best, axis=1)
+        order = np.lexsort((best, best_scores), axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+        indices[:, bass, :] = np.where(best_scores < unreachable, best, -1)
+        scores[:, bass, :] = np.where(best_scores < unreachable, best_scores, 0)
+
+    indices.flags.writeable = False
+    scores.flags.writeable = False
+    return indices, scores
+
+
+@lru_cache(maxsize=1)
+def _chord_table() -> ChordTable:
+    """Tables construites à la première identification, puis partagées."""
+    roots, qualities, masks = _build_candidates()
+    indices, scores = _build_table(roots, masks)
+    return ChordTable(roots, qualities, masks, indices, scores)
+
+
+def pitch_set_of(notes: Iterable[int]) -> int:
+    """Masque des classes de hauteur (bit i = note i) de notes MIDI ou de classes 0-11."""
+    mask = 0
+    for note in notes:
+        if note < 0:
+            raise ValueError(f"Note invalide : {note}")
+        mask |= 1 << (note % 12)
+    return mask
+
+
+def _note_names(mask: int) -> List[str]:
+    return [get_note_from_index(note) for note in range(12) if mask >> note & 1]
+
+
+def identify_chord(
+    notes: Iterable[int], bass: Optional[int] = None, limit: int = 5
+) -> List[ChordIdentification]:
+    """
+    Nomme l'accord formé par des notes jouées, du plus probable au moins probable.
+
+    Les notes sont des classes de hauteur (0-11) ou des notes MIDI. La basse, si elle
+    est donnée, sert à reconnaître les renversements (ex: "C/E"). Si elle est omise
+    et que les notes sont des notes MIDI (>= 12), la plus grave sert de basse.
+
+    La recherche est une simple lecture dans une table précalculée : elle peut être
+    relancée à chaque touche enfoncée.
+    """
+    notes = list(notes)
+    if bass is None and notes and min(notes) >= 12:
+        bass = min(notes)
+    # La basse fait toujours partie des notes jouées
+    pitch_set = pitch_set_of(notes if bass is None else [*notes, bass])
+    bass_index = _NO_BASS if bass is None else bass % 12
+
+    table = _chord_table()
+    matches: List[ChordIdentification] = []
+    row = zip(
+        table.indices[pitch_set, bass_index].tolist(),
+        table.scores[pitch_set, bass_index].tolist(),
+    )
+    for candidate, score in row:
+        if candidate < 0 or len(matches) >= limit:
+            break
+        root = int(table.roots[candidate])
+        quality = QUALITIES[table.qualities[candidate]].name
+        chord_mask = int(table.masks[candidate])
+        name = get_note_from_index(root) + quality
+        slash_bass = None
+        if bass is not None and bass_index != root:
+            slash_bass = get_note_from_index(bass_index)
+            name += f"/{slash_bass}"
+        matches.append(
+            {
+                "name": name,
+                "root": get_note_from_index(root),
+                "quality": quality,
+                "bass": slash_bass,
+                "score": score,
+                "missing_notes": _note_names(chord_mask & ~pitch_set),
+                "extra_notes": _note_names(pitch_set & ~chord_mask),
+            }
+        )
+    return matches
+
+
+# Caches exposés par /metrics (succès, échecs, taille)
+CACHES = {"chord_table": _chord_table}
@@ -0,0 +1,315 @@
+import re
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypedDict
+
+from app.pipeline import DEFAULT_MODEL, build_progression_analysis, detect_key
+from app.schema import ChordItem
+from app.utils.common import as_chord, get_chord_notes, get_note_index
+from app.utils.qualities import QUALITY_IDS
+from constants import CHORD_SYMBOL_ALIASES
+
+BEATS_PER_BAR = 4  # Par défaut, sauf directive {time: 3/4}
+LYRIC_LINE_BARS = 2  # Durée estimée d'une ligne de paroles
+
+_SYMBOL_PATTERN = re.compile(r"^([A-G][#b]?)(.*?)(?:/([A-G][#b]?))?$")
+_DIRECTIVE_PATTERN = re.compile(r"^\{\s*([^:}\s]+)\s*(?::\s*(.*?))?\s*\}$")
+_INLINE_CHORD_PATTERN = re.compile(r"\[([^\]]*)\]")
+_SECTION_PATTERN = re.compile(
+    r"^(\[)?((?:pre-?)?(?:verse|chorus|bridge|intro|outro|refrain|solo|interlude|coda|tag"
+    r"|instrumental|hook|couplet|pont)(?:\s*\d+)?)\]?\s*(:)?\s*(.*)$",
+    re.IGNORECASE,
+)
+# Ce qui ressemble à un accord sans en être un connu (ex: "Cmaj11#5") : signalé, pas ignoré
+_CHORD_LIKE_PATTERN = re.compile(r"^[A-G][#b]?[0-9#b+\-/()°øΔoMmajdinsuglt]*$")
+_REPEAT_PATTERN = re.compile(r"^\(?x(\d+)\)?$", re.IGNORECASE)
+_NO_CHORD = {"N.C.", "NC", "N.C"}
+# Étiquettes des directives ChordPro sans argument
+_SECTION_DIRECTIVES = {
+    "soc": "Chorus",
+    "sov": "Verse",
+    "sob": "Bridge",
+    "sot": "Tab",
+    "start_of_chorus": "Chorus",
+    "start_of_verse": "Verse",
+    "start_of_bridge": "Bridge",
+}
+_END_DIRECTIVES = {"eoc", "eov", "eob", "eot"}
+_COMMENT_DIRECTIVES = {"c", "ci", "cb", "comment", "comment_italic", "comment_box"}
+
+
+class SongSection(TypedDict):
+    label: str
+    start_index: int
+    end_index: int
+
+
+class ParsedSong(NamedTuple):
+    """Morceau extrait d'une grille, prêt pour le pipeline d'analyse."""
+
+    title: Optional[str]
+    chords: List[ChordItem]
+    sections: List[SongSection]
+    unknown_symbols: List[str]  # Symboles d'accords non reconnus, ignorés
+
+
+def normalize_chord_symbol(symbol: str) -> Optional[Tuple[str, str, int]]:
+    """
+    Symbole d'une grille -> (fondamentale, qualité du registre, renversement).
+    Une basse étrangère à l'accord (ex: "C/Bb") est ignorée ; une basse de l'accord
+    donne le renversement (ex: "C/E" -> 1). Renvoie None si le symbole est inconnu.
+    """
+    match = _SYMBOL_PATTERN.match(symbol.strip().replace("♭", "b").replace("♯", "#"))
+    if match is None:
+        return None
+    root, quality, bass = match.groups()
+    quality = CHORD_SYMBOL_ALIASES.get(quality, quality)
+    chord = as_chord(root + quality) if quality in QUALITY_IDS else None
+    if chord is None or chord.quality != quality:
+        return None
+    inversion = 0
+    if bass:
+        note_indexes = [get_note_index(note) for note in get_chord_notes(chord) or []]
+        bass_index = get_note_index(bass)
+        if bass_index in note_indexes:
+            inversion = note_indexes.index(bass_index)
+    return root, quality, inversion
+
+
+def _tokenize(line: str) -> List[str]:
+    for bar in ("||", "|:", ":|"):
+        line = line.replace(bar, "|")
+    return re.findall(r"\||[^\s|]+", line)
+
+
+class LeadSheetParser:
+    """
+    Lecture incrémentale de fichiers ChordPro et de grilles en texte brut, morceau par
+    morceau : le texte est fourni par morceaux quelconques (`feed`), chaque morceau de
+    musique terminé est renvoyé dès sa fin, sans garder le recueil entier en mémoire.
+
+    Un nouveau morceau commence à `{new_song}`, à un `{title}` après des accords, ou à
+    un saut de page. Les lignes de paroles sans accords sont ignorées.
+    """
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._start_song(None)
+
+    def _start_song(self, title: Optional[str]) -> None:
+        self._title = title
+        self._chords: List[ChordItem] = []
+        self._sections: List[SongSection] = []
+        self._unknown: List[str] = []
+        self._label: Optional[str] = None
+        self._section_open = False
+        self._beats_per_bar = BEATS_PER_BAR
+        self._last_bar: List[Tuple[str, int]] = []
+
+    def feed(self, text: str) -> List[ParsedSong]:
+        *lines, self._pending = (self._pending + text).split("\n")
+        songs: List[ParsedSong] = []
+        for line in lines:
+            songs.extend(self._parse_line(line))
+        return songs
+
+    def close(self) -> List[ParsedSong]:
+        """Termine la lecture : renvoie le dernier morceau."""
+        songs = self._parse_line(self._pending)
+        self._pending = ""
+        songs.extend(self._finish_song(None))
+        return songs
+
+    def _finish_song(self, next_title: Optional[str]) -> List[ParsedSong]:
+        song = ParsedSong(self._title, self._chords, self._sections, self._unknown)
+        self._start_song(next_title)
+        return [song] if song.chords else []
+
+    def _parse_line(self, line: str) -> List[ParsedSong]:
+        songs: List[ParsedSong] = []
+        pages = line.split("\f")
+        for page, text in enumerate(pages):
+            if page:
+                songs.extend(self._finish_song(None))
+            songs.extend(self._parse_text(text.strip()))
+        return songs
+
+    def _parse_text(self, line: str) -> List[ParsedSong]:
+        if not line or line.startswith("#"):
+            return []
+        directive = _DIRECTIVE_PATTERN.match(line)
+        if directive:
+            return self._apply_directive(directive.group(1).lower(), directive.group(2) or "")
+
+        section = _SECTION_PATTERN.match(line)
+        if section and (section.group(1) or section.group(3) or not section.group(4)):
+            self._set_label(section.group(2).strip().title())
+            line = section.group(4)
+            if not line:
+                return []
+
+        if "[" in line:
+            self._parse_inline_chords(line)
+        else:
+            self._parse_chord_line(_tokenize(line))
+        return []
+
+    def _apply_directive(self, name: str, value: str) -> List[ParsedSong]:
+        if name in ("new_song", "ns"):
+            return self._finish_song(None)
+        if name in ("title", "t"):
+            if self._chords:
+                return self._finish_song(value)
+            self._title = value
+        elif name == "time":
+            beats = value.split("/")[0].strip()
+            if beats.isdigit() and int(beats) > 0:
+                self._beats_per_bar = int(beats)
+        elif name in _SECTION_DIRECTIVES or name.startswith("start_of_"):
+            default = _SECTION_DIRECTIVES.get(name, name.removeprefix("start_of_").title())
+            self._set_label(value or default)
+        elif name in _END_DIRECTIVES or name.startswith("end_of_"):
+            self._set_label(None)
+        elif name in _COMMENT_DIRECTIVES and value:
+            # Les commentaires servent d'étiquettes de section (ex: {c: Refrain})
+            self._set_label(value)
+        return []
+
+    def _set_label(self, label: Optional[str]) -> None:
+        self._label = label
+        self._section_open = False
+
+    def _add_chord(self, symbol: str, beats: int) -> None:
+        normalized = normalize_chord_symbol(symbol)
+        if normalized is None:
+            self._unknown.append(symbol)
+            return
+        root, quality, inversion = normalized
+        index = len(self._chords)
+        self._chords.append(
+            ChordItem(
+                id=index, root=root, quality=quality, inversion=inversion, duration=max(1, beats)
+            )
+        )
+        if self._label is None:
+            return
+        if self._section_open:
+            self._sections[-1]["end_index"] = index
+        else:
+            self._sections.append({"label": self._label, "start_index": index, "end_index": index})
+            self._section_open = True
+
+    def _parse_inline_chords(self, line: str) -> None:
+        """Ligne ChordPro : "[Am]Paroles [F]suite" ; durée selon le texte couvert."""
+        chords: List[Tuple[str, int]] = []
+        text_length = 0
+        position = 0
+        for match in _INLINE_CHORD_PATTERN.finditer(line):
+            text_length += len(line[position : match.start()])
+            chords.append((match.group(1).strip(), text_length))
+            position = match.end()
+        text_length += len(line[position:])
+        if not chords:
+            return
+        lyrics = _INLINE_CHORD_PATTERN.sub("", line)
+        first_offset = chords[0][1]
+        covered = text_length - first_offset
+        if not lyrics.strip() or covered <= 0:
+            # Accords sans paroles ("[C] [G] | [Am]") : même lecture qu'une ligne d'accords
+            self._parse_chord_line(_tokenize(" ".join(symbol for symbol, _ in chords)))
+            return
+        line_beats = LYRIC_LINE_BARS * self._beats_per_bar
+        ends = [offset for _, offset in chords[1:]] + [text_length]
+        for (symbol, offset), end in zip(chords, ends):
+            if symbol and symbol not in _NO_CHORD:
+                self._add_chord(symbol, round(line_beats * (end - offset) / covered))
+
+    def _parse_chord_line(self, tokens: List[str]) -> None:
+        """
+        Ligne d'accords ("| C / G / | Am | % |", "C G Am F x2"). Avec des barres de
+        mesure, chaque mesure est partagée entre ses accords (un "/" prolonge l'accord
+        d'un temps, "%" répète la mesure précédente) ; sans barres, un accord par mesure.
+        Une ligne qui contient autre chose que des accords est une ligne de paroles.
+        """
+        repeat = 1
+        symbols = []
+        for token in tokens:
+            repeat_match = _REPEAT_PATTERN.match(token)
+            if repeat_match:
+                repeat = max(1, int(repeat_match.group(1)))
+            elif token in ("|", "/", "%", "-") or token in _NO_CHORD:
+                symbols.append(token)
+            elif normalize_chord_symbol(token) or _CHORD_LIKE_PATTERN.match(token):
+                symbols.append(token)
+            else:
+                return
+        if not any(normalize_chord_symbol(symbol) for symbol in symbols):
+            return
+
+        bars: List[List[str]] = [[]]
+        for symbol in symbols:
+            if symbol == "|":
+                bars.append([])
+            elif symbol != "-":
+                bars[-1].append(symbol)
+        has_bars = len(bars) > 1
+        if not has_bars and "/" not in symbols:
+            bars = [[symbol] for symbol in symbols]
+
+        for _ in range(repeat):
+            for bar in bars:
+                if not bar:
+                    continue
+                if bar == ["%"]:
+                    timed = self._last_bar
+                else:
+                    timed = self._time_bar(bar, has_bars)
+                    self._last_bar = timed
+                for symbol, beats in timed:
+                    self._add_chord(symbol, beats)
+
+    def _time_bar(self, bar: List[str], has_bars: bool) -> List[Tuple[str, int]]:
+        """Durée (en temps) de chaque accord d'une mesure ("N.C." occupe sa part)."""
+        slots: List[Tuple[Optional[str], int]] = []
+        for symbol in bar:
+            if symbol == "/":
+                if slots:
+                    slots[-1] = (slots[-1][0], slots[-1][1] + 1)
+            elif symbol != "%":
+                slots.append((None if symbol in _NO_CHORD else symbol, 1))
+        if has_bars:
+            total = sum(count for _, count in slots)
+            timed = [
+                (symbol, round(self._beats_per_bar * count / total)) for symbol, count in slots
+            ]
+        elif "/" in bar:
+            timed = slots  # Sans barres de mesure, chaque symbole vaut un temps
+        else:
+            timed = [(symbol, self._beats_per_bar) for symbol, _ in slots]
+        return [(symbol, beats) for symbol, beats in timed if symbol is not None]
+
+
+def parse_lead_sheets(chunks: Iterable[str]) -> Iterator[ParsedSong]:
+    """Morceaux d'un recueil lu par blocs de texte (fichier, flux réseau)."""
+    parser = LeadSheetParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def analyze_song(
+    song: ParsedSong, detector: str = "gemini", model: str = DEFAULT_MODEL
+) -> Dict[str, Any]:
+    """Résultat d'un morceau : grille normalisée et analyse complète comme /analyze."""
+    result: Dict[str, Any] = {
+        "title": song.title,
+        "sections": song.sections,
+        "chordsData": [chord.model_dump() for chord in song.chords],
+        "unknown_symbols": song.unknown_symbols,
+    }
+    try:
+        progression = [f"{chord.root}{chord.quality}" for chord in song.chords]
+        analysis_result = detect_key(progression, detector, model)
+        result["analysis"] = build_progression_analysis(song.chords, analysis_result)
+    except Exception as error:
+        # Un morceau en erreur n'interrompt pas le recueil
+        result["error"] = str(error)
+    return result
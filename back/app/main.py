@@ -1,24 +1,114 @@
-from typing import Any, Dict, List, Tuple
+import asyncio
+import codecs
+import hmac
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, List, Optional
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-
-from app.modal_substitution.generator import get_substitution_info, get_substitutions
-from app.schema import ChordItem, ProgressionRequest
-from app.secondary_dominant.generator import get_secondary_dominant_for_target
-from app.tritone_substitution.generator import get_tritone_substitute
-from app.utils.borrowed_modes import get_borrowed_chords
-from app.utils.chords_analyzer import QualityAnalysisItem, analyze_chord_in_context
-from app.utils.common import get_note_from_index, get_note_index
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.chord_identification import identifier as chord_identification
+from app.chord_identification.identifier import identify_chord
+from app.lead_sheet_ingestion.parser import LeadSheetParser, ParsedSong, analyze_song
+from app.markov_generation import generator as markov_generation
+from app.markov_generation.generator import (
+    generate_progressions,
+    model_from_templates,
+    preset_model,
+)
+from app.melody_harmonization import generator as melody_harmonization
+from app.melody_harmonization.generator import (
+    HarmonizationWeights,
+    MelodyNote,
+    harmonize_melody_analysis,
+)
+from app.numeral_realization.generator import realize_template
+from app.pipeline import DEFAULT_MODEL, build_progression_analysis
+from app.progression_enumeration.generator import EnumerationConstraints, enumerate_page
+from app.reharmonization.generator import CostWeights, reharmonize
+from app.scale_identification.identifier import identify_scales
+from app.schema import (
+    ApproachesRequest,
+    ChordIdentificationRequest,
+    ChordItem,
+    KeyFitRequest,
+    MarkovGenerationRequest,
+    MelodyHarmonizationRequest,
+    NumeralRealizationRequest,
+    ProgressionEnumerationRequest,
+    ProgressionRequest,
+    ReharmonizationRequest,
+    ScaleIdentificationRequest,
+    ScaleRegistrationRequest,
+    SimilarityInsertRequest,
+    SimilarityQueryRequest,
+    SubstitutesRequest,
+    SubstitutionChainRequest,
+    VoiceLeadingRequest,
+)
+from app.similarity_search.index import analyze_for_index, get_similarity_index
+from app.substitution_graph import generator as substitution_graph
+from app.substitution_graph.generator import find_chain, get_approaches, get_substitutes
+from app.utils import common, progression_kernel
+from app.utils.deadline import AnalysisCancelled, Deadline, DeadlineExceeded
+from app.utils.metrics import StageTimer, render_metrics
 from app.utils.mode_detection_gemini import detect_tonic_and_mode
-from constants import MAJOR_MODES_DATA, MODES_DATA
+from app.utils.modes import (
+    ModeRegistry,
+    get_mode_registry,
+    load_modes_file,
+    register_heptatonic_scales,
+    register_modes,
+)
+from app.utils.profiling import RequestProfiler, profiled_call
+from app.utils.progression_kernel import diatonic_fit, serialize_fit
+from app.utils.repetition import compress_progression, expand_segments
+from app.voice_leading import generator as voice_leading
+from app.voice_leading.generator import optimize_variants, optimize_voicings
+from constants import PROGRESSION_PRESETS
 
 load_dotenv()
 
-
-app = FastAPI()
+# Délai maximal (en secondes) accordé à une requête /analyze, détection comprise.
+ANALYZE_TIMEOUT_SECONDS = float(os.getenv("ANALYZE_TIMEOUT_SECONDS", "60"))
+# Jeton d'administration à envoyer dans l'en-tête `X-Profile-Token` pour profiler
+# une requête /analyze (profilage désactivé si absent).
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+# Jeton d'administration à envoyer dans l'en-tête `X-Admin-Token` pour ajouter des
+# gammes au registre (POST /scales désactivé si absent).
+SCALES_TOKEN = os.getenv("SCALES_TOKEN", "")
+# Gammes ajoutées au registre au démarrage (fichier JSON au format de POST /scales)
+USER_SCALES_FILE = os.getenv("USER_SCALES_FILE", "")
+# Intervalle de vérification de la déconnexion du client.
+DISCONNECT_POLL_INTERVAL = 0.25
+
+# Caches exposés par /metrics (succès, échecs, taille)
+METRIC_CACHES = {
+    **common.CACHES,
+    **progression_kernel.CACHES,
+    **substitution_graph.CACHES,
+    **voice_leading.CACHES,
+    **markov_generation.CACHES,
+    **melody_harmonization.CACHES,
+    **chord_identification.CACHES,
+}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if USER_SCALES_FILE:
+        load_modes_file(USER_SCALES_FILE)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,168 +119,445 @@ app.add_middleware(
 )
 
 
-def analyze_progression_segments(
-    progression: List[str], harmonic_segments: List[Dict[str, Any]]
-) -> List[QualityAnalysisItem]:
+def has_admin_token(token: Optional[str], expected: str) -> bool:
+    """Jeton présent et égal au jeton configuré (toujours faux si aucun n'est configuré)."""
+    return bool(expected) and token is not None and hmac.compare_digest(token, expected)
+
+
+async def watch_disconnect(http_request: Request, deadline: Deadline) -> None:
+    """Annule l'échéance dès que le client ferme la connexion."""
+    while not await http_request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+    deadline.cancel()
+
+
+async def run_cancellable(
+    watcher: "asyncio.Task[None]", deadline: Deadline, func: Callable[..., Any], *args: Any
+) -> Any:
     """
-    Analyse chaque accord de la progression en utilisant le contexte
-    tonal de son segment harmonique assigné.
+    Exécute `func` dans le pool de threads et rend la main dès que le client se
+    déconnecte ou que l'échéance est dépassée, sans attendre la fin du calcul.
     """
-    # FIX: Use a generic `list` for the local variable to resolve the __setitem__ error.
-    # mypy can be strict about assigning a specific TypedDict item to a list
-    # annotated as List[Dict[str, Any]]. A generic list avoids this problem internally.
-    final_analysis: list = [{} for _ in progression]
-
-    for segment in harmonic_segments:
-        segment_tonic_index = get_note_index(segment["tonic"])
-        segment_mode = segment["mode"]
-
-        # Applique l'analyse pour chaque accord dans la plage du segment
-        for i in range(segment["start_index"], segment["end_index"] + 1):
-            if i < len(progression):
-                analyzed_chord = analyze_chord_in_context(
-                    progression[i], segment_tonic_index, segment_mode
-                )
-                # Ajoute le contexte du segment pour référence future
-                analyzed_chord["segment_context"] = {
-                    "tonic": segment["tonic"],
-                    "mode": segment["mode"],
-                    "explanation": segment["explanation"],
-                }
-                final_analysis[i] = analyzed_chord
-
-    # S'assure qu'il n'y a pas de trou si l'IA a manqué un accord
-    # (ceci est une sécurité)
-    for i, analysis in enumerate(final_analysis):
-        if not analysis:
-            # Analyse avec le contexte du premier segment par défaut
-            fallback_tonic_index = get_note_index(harmonic_segments[0]["tonic"])
-            fallback_mode = harmonic_segments[0]["mode"]
-            final_analysis[i] = analyze_chord_in_context(
-                progression[i], fallback_tonic_index, fallback_mode
-            )
-
-    # The function's return signature guarantees the final type.
-    return final_analysis  # type: ignore
+    task = asyncio.ensure_future(run_in_threadpool(func, *args))
+    done, _ = await asyncio.wait(
+        {task, watcher}, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED
+    )
+    if task in done:
+        return task.result()
+    if watcher in done:
+        raise AnalysisCancelled()
+    raise DeadlineExceeded()
 
 
 @app.post("/analyze")
-def get_all_substitutions(request: ProgressionRequest):
+async def get_all_substitutions(request: ProgressionRequest, http_request: Request):
     progression_data: List[ChordItem] = request.chordsData
     model: str = request.model
     if not progression_data:
         return {"error": "Progression cannot be empty"}
 
     progression = [f"{item.root}{item.quality}" for item in progression_data]
+    deadline = Deadline(ANALYZE_TIMEOUT_SECONDS if request.timeout is None else request.timeout)
+    timer = StageTimer()
+    profiler: Optional[RequestProfiler] = None
+    token = http_request.headers.get("X-Profile-Token")
+    if token is not None:
+        if not has_admin_token(token, PROFILING_TOKEN):
+            return Response(status_code=403)
+        profiler = RequestProfiler()
+        if not profiler.start():
+            return {"error": "Un profilage est déjà en cours, réessayez plus tard"}
+        timer = profiler
+    watcher = asyncio.create_task(watch_disconnect(http_request, deadline))
     try:
-        analysis_result = detect_tonic_and_mode(progression, model)  # type: ignore
+        with timer.stage("detection"):
+            # Seul le matériau unique (sans les sections répétées) est envoyé au modèle
+            compressed = compress_progression(progression)
+            analysis_result = await run_cancellable(
+                watcher,
+                deadline,
+                profiled_call(profiler, detect_tonic_and_mode),
+                compressed.unique,
+                model,
+                deadline.remaining(),
+                request.registered_modes,
+            )
+            analysis_result["harmonic_segments"] = expand_segments(
+                analysis_result["harmonic_segments"], compressed.source_index
+            )
+        # L'analyse s'arrête d'elle-même à l'échéance et renvoie les sections déjà calculées.
+        result = await run_cancellable(
+            watcher,
+            Deadline(),
+            profiled_call(profiler, build_progression_analysis),
+            progression_data,
+            analysis_result,
+            deadline,
+            timer,
+            request.registered_modes,
+        )
+        with timer.stage("serialization"):
+            content = jsonable_encoder(result)
+            response = JSONResponse(content)
+        if profiler is not None:
+            # Le rapport couvre la sérialisation : la réponse est rendue une seconde fois
+            content["profile"] = profiler.stop()
+            response = JSONResponse(content)
+        response.headers["Server-Timing"] = timer.server_timing()
+        return response
+    except DeadlineExceeded:
+        return JSONResponse(
+            {"error": "La détection de tonalité a dépassé le délai imparti", "partial": True},
+            status_code=504,
+        )
+    except AnalysisCancelled:
+        # Le client est parti : personne ne lira la réponse.
+        return Response(status_code=499)
+    finally:
+        watcher.cancel()
+        if profiler is not None:
+            profiler.stop()
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    Réponse en flux produite pendant la lecture du corps de la requête. Starlette
+    écoute sinon la déconnexion du client sur le même canal `receive` que le corps,
+    et consommerait les morceaux du corps à la place du générateur.
+    """
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        await self.stream_response(send)
 
-        global_analysis = analysis_result["global_analysis"]
-        harmonic_segments = analysis_result["harmonic_segments"]
 
-        global_tonic = global_analysis["tonic"]
-        global_mode = global_analysis["mode"]
-        global_explanation = global_analysis["explanation"]
+@app.post("/ingest-lead-sheets")
+async def ingest_lead_sheets(
+    http_request: Request, detector: str = "gemini", model: str = DEFAULT_MODEL
+):
+    """
+    Import de fichiers ChordPro ou de grilles en texte brut (corps de la requête, en
+    UTF-8). Le corps est lu au fil de l'eau et chaque morceau est analysé dès qu'il est
+    complet : la réponse contient une ligne JSON par morceau (NDJSON).
+    """
+
+    async def analyze(songs: List[ParsedSong]) -> AsyncIterator[str]:
+        for song in songs:
+            result = await run_in_threadpool(analyze_song, song, detector, model)
+            yield json.dumps(result, ensure_ascii=False) + "\n"
 
-        # 2. Analyser la progression en utilisant les segments
-        quality_analysis: List[QualityAnalysisItem] = analyze_progression_segments(
-            progression, harmonic_segments
+    async def results() -> AsyncIterator[str]:
+        parser = LeadSheetParser()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        async for chunk in http_request.stream():
+            async for line in analyze(parser.feed(decoder.decode(chunk))):
+                yield line
+        async for line in analyze(parser.feed(decoder.decode(b"", final=True)) + parser.close()):
+            yield line
+
+    return BodyStreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.post("/key-fit")
+async def get_key_fit(request: KeyFitRequest):
+    """Ajustement de la progression à chaque tonique x mode (matrice 12 x modes)."""
+    if not request.chordsData:
+        return {"error": "Progression cannot be empty"}
+    progression = [f"{item.root}{item.quality}" for item in request.chordsData]
+    fit = await run_in_threadpool(diatonic_fit, progression)
+    return {
+        "chord_count": len(progression),
+        "modes": list(fit.mode_names),
+        "matrix": await run_in_threadpool(serialize_fit, fit),
+    }
+
+
+@app.post("/realize-numerals")
+async def realize_numerals(request: NumeralRealizationRequest):
+    try:
+        realizations = await run_in_threadpool(
+            realize_template, request.template, request.tonics, request.modes
         )
+    except ValueError as error:
+        return {"error": str(error)}
+    return {"realizations": realizations}
 
-        # Ajout des propriétés originales aux résultats d'analyse
-        for i, analyzed_chord in enumerate(quality_analysis):
-            analyzed_chord["inversion"] = progression_data[i].inversion
-            analyzed_chord["duration"] = progression_data[i].duration
 
-        detected_tonic_index: int = get_note_index(global_tonic)
+@app.post("/reharmonize")
+async def get_reharmonizations(request: ReharmonizationRequest):
+    if not request.chordsData:
+        return {"error": "Progression cannot be empty"}
+    progression = [f"{item.root}{item.quality}" for item in request.chordsData]
+    weights = CostWeights(
+        root_motion=request.root_motion_weight,
+        common_tones=request.common_tones_weight,
+        borrowing=request.borrowing_weight,
+    )
+    try:
+        reharmonizations = await run_in_threadpool(
+            reharmonize,
+            progression,
+            request.tonic,
+            request.mode,
+            request.top_k,
+            request.beam_width,
+            weights,
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    for reharmonization in reharmonizations:
+        for item, chord_data in zip(reharmonization["chords"], request.chordsData):
+            item["inversion"] = chord_data.inversion
+            item["duration"] = chord_data.duration
+    return {"reharmonizations": reharmonizations}
+
+
+@app.post("/voice-leading")
+async def get_voice_leading(request: VoiceLeadingRequest):
+    if not request.chordsData:
+        return {"error": "Progression cannot be empty"}
+    progression = [f"{item.root}{item.quality}" for item in request.chordsData]
+    try:
+        original = await run_in_threadpool(
+            optimize_voicings, progression, request.low, request.high
+        )
+        variants = await run_in_threadpool(
+            optimize_variants, request.variants or {}, request.low, request.high
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    for item, chord_data in zip(original["chords"], request.chordsData):
+        item["duration"] = chord_data.duration
+    return {"original": original, "variants": variants}
+
+
+@app.post("/substitutes")
+async def get_chord_substitutes(request: SubstitutesRequest):
+    try:
+        substitutes = await run_in_threadpool(
+            get_substitutes, request.chord, request.tonic, request.kinds
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    return {"substitutes": substitutes}
 
-        borrowed_chords = get_borrowed_chords(quality_analysis, global_mode)
-        degrees_to_borrow: List[Dict[str, Any] | None] = get_substitution_info(quality_analysis)
 
-        substitutions: Dict[str, Dict[str, Any]] = {}
-        for mode_name, (_, _, interval) in MAJOR_MODES_DATA.items():
-            relative_tonic_index = (detected_tonic_index + interval + 12) % 12
-            new_progression = get_substitutions(
-                progression,
-                relative_tonic_index,
-                degrees_to_borrow,
+@app.post("/substitution-chain")
+async def get_substitution_chain(request: SubstitutionChainRequest):
+    try:
+        chain = await run_in_threadpool(
+            find_chain, request.source, request.target, request.kinds, request.tonic
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    return {"chain": chain}
+
+
+@app.post("/approaches")
+async def get_chord_approaches(request: ApproachesRequest):
+    try:
+        approaches = await run_in_threadpool(
+            get_approaches, request.target, request.steps, request.kinds
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    return {"approaches": approaches}
+
+
+@app.post("/similarity/insert")
+async def insert_similar_progression(request: SimilarityInsertRequest):
+    if not request.chordsData:
+        return {"error": "Progression cannot be empty"}
+    progression = [f"{item.root}{item.quality}" for item in request.chordsData]
+    index = get_similarity_index()
+    try:
+        tokens = await run_in_threadpool(
+            analyze_for_index, progression, request.tonic, request.mode
+        )
+        await run_in_threadpool(index.insert, request.key, tokens)
+    except ValueError as error:
+        return {"error": str(error)}
+    return {"entries": len(index), "pending": index.pending_count}
+
+
+@app.post("/similarity/query")
+async def query_similar_progressions(request: SimilarityQueryRequest):
+    if not request.chordsData:
+        return {"error": "Progression cannot be empty"}
+    progression = [f"{item.root}{item.quality}" for item in request.chordsData]
+    try:
+        tokens = await run_in_threadpool(
+            analyze_for_index, progression, request.tonic, request.mode
+        )
+        matches = await run_in_threadpool(get_similarity_index().query, tokens, request.top_k)
+    except ValueError as error:
+        return {"error": str(error)}
+    return {"matches": matches}
+
+
+@app.post("/similarity/save")
+async def save_similarity_index():
+    index = get_similarity_index()
+    try:
+        await run_in_threadpool(index.save)
+    except (ValueError, OSError) as error:
+        return {"error": str(error)}
+    return {"entries": len(index)}
+
+
+@app.get("/presets")
+async def get_progression_presets():
+    return {"presets": {name: list(templates) for name, templates in PROGRESSION_PRESETS.items()}}
+
+
+@app.post("/generate-progressions")
+async def generate_from_preset(request: MarkovGenerationRequest):
+    try:
+        if request.corpus:
+            model = await run_in_threadpool(model_from_templates, request.corpus, request.order)
+        else:
+            model = await run_in_threadpool(preset_model, request.preset, request.order)
+        progressions = await run_in_threadpool(
+            generate_progressions,
+            model,
+            request.tonic,
+            request.mode,
+            request.length,
+            request.samples,
+            request.limit,
+            request.start_on_tonic,
+            request.cadence,
+            request.seed,
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    return {"progressions": progressions}
+
+
+@app.post("/enumerate-progressions")
+async def enumerate_progressions(request: ProgressionEnumerationRequest):
+    constraints = EnumerationConstraints(
+        length=request.length,
+        start_on_tonic=request.start_on_tonic,
+        cadence=request.cadence,
+        borrow_modes=tuple(request.borrow_modes),
+        min_borrowed=request.min_borrowed,
+        distinct=request.distinct,
+        triads=request.triads,
+        sevenths=request.sevenths,
+    )
+    try:
+        return await run_in_threadpool(
+            enumerate_page,
+            request.tonic,
+            request.mode,
+            constraints,
+            request.cursor,
+            request.limit,
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+
+
+@app.post("/harmonize-melody")
+async def harmonize_melody(request: MelodyHarmonizationRequest):
+    """Harmonisation d'une mélodie, au format de /analyze."""
+    notes = [MelodyNote(note.pitch, note.start, note.duration) for note in request.notes]
+    weights = HarmonizationWeights(
+        melody=request.melody_weight,
+        root_motion=request.root_motion_weight,
+        common_tones=request.common_tones_weight,
+        borrowing=request.borrowing_weight,
+    )
+    try:
+        return await run_in_threadpool(
+            harmonize_melody_analysis,
+            notes,
+            request.tonic,
+            request.mode,
+            request.beats_per_chord,
+            request.sevenths,
+            weights,
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+
+
+@app.post("/identify-chord")
+async def identify_chord_from_notes(request: ChordIdentificationRequest):
+    if not request.notes:
+        return {"error": "Notes cannot be empty"}
+    try:
+        matches = await run_in_threadpool(
+            identify_chord, request.notes, request.bass, request.limit
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    return {"matches": matches}
+
+
+@app.post("/identify-scale")
+async def identify_scales_from_notes(request: ScaleIdentificationRequest):
+    try:
+        matches = await run_in_threadpool(
+            identify_scales, request.notes, request.tonic, request.limit
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    return {"matches": matches}
+
+
+def describe_registry(registry: ModeRegistry) -> dict:
+    return {
+        "mode_count": len(registry),
+        "modes": [
+            {"name": name, "intervals": list(intervals), "qualities": list(qualities)}
+            for name, intervals, qualities in zip(
+                registry.names, registry.intervals, registry.qualities
             )
-            for index, item in enumerate(new_progression):
-                chord_data = progression_data[index]
-                item["inversion"] = chord_data.inversion
-                item["duration"] = chord_data.duration
-            substitutions[mode_name] = {
-                "borrowed_scale": f"{get_note_from_index(relative_tonic_index)} Major",
-                "substitution": new_progression,
-            }
-
-        # Harmonize all existing modes
-        harmonized_chords: Dict[str, List[QualityAnalysisItem]] = {}
-        for target_mode_name in MODES_DATA.keys():
-            new_progression_items = []
-
-            # 1. SUBSTITUTION SEGMENT PAR SEGMENT
-            for segment in harmonic_segments:
-                segment_start = segment["start_index"]
-                segment_end = segment["end_index"]
-
-                segment_tonic_index = get_note_index(segment["tonic"])
-                segment_progression = progression[segment_start : segment_end + 1]
-                segment_sub_info = degrees_to_borrow[segment_start : segment_end + 1]
-
-                substituted_segment = get_substitutions(
-                    segment_progression,
-                    segment_tonic_index,
-                    segment_sub_info,
-                    target_mode_name,
-                )
-                new_progression_items.extend(substituted_segment)
-
-            # 2. ANALYSE DE LA NOUVELLE PROGRESSION
-            final_analyzed_chords = []
-            for i, item in enumerate(new_progression_items):
-                current_segment = next(
-                    s for s in harmonic_segments if s["start_index"] <= i <= s["end_index"]
-                )
-                context_tonic_index = get_note_index(current_segment["tonic"])
-
-                analyzed_chord = analyze_chord_in_context(
-                    item["chord"],
-                    context_tonic_index,
-                    target_mode_name,
-                )
-                final_analyzed_chords.append(analyzed_chord)
-
-            harmonized_chords[target_mode_name] = final_analyzed_chords
-
-        # Get all secondary dominants for all major modes
-        secondary_dominants: Dict[str, List[Tuple[str, str, Dict[str, Any]]]] = {}
-        for mode_name, substitutions_data in substitutions.items():
-            secondary_dominants[mode_name] = []
-            for item in substitutions_data["substitution"]:
-                secondary_dominant, analysis = get_secondary_dominant_for_target(
-                    item["chord"], global_tonic, mode_name
-                )
-                secondary_dominants[mode_name].append((secondary_dominant, item["chord"], analysis))
-
-        tritone_substitutions: List[List[Any]] = []
-        for chord in progression:
-            substitute, analysis = get_tritone_substitute(chord)
-            tritone_substitutions.append([chord, substitute, analysis])
-
-        return {
-            "tonic": global_tonic,
-            "mode": global_mode,
-            "explanations": global_explanation,
-            "quality_analysis": quality_analysis,
-            "borrowed_chords": borrowed_chords,
-            "major_modes_substitutions": substitutions,
-            "harmonized_chords": harmonized_chords,
-            "secondary_dominants": secondary_dominants,
-            "tritone_substitutions": tritone_substitutions,
-        }
-    except Exception as e:
-        raise e
+        ],
+    }
+
+
+@app.get("/scales")
+async def list_scales():
+    return describe_registry(get_mode_registry())
+
+
+@app.post("/scales")
+async def add_scales(request: ScaleRegistrationRequest, http_request: Request):
+    """
+    Ajoute des gammes au registre du processus ; les qualités de 7e sont dérivées si
+    absentes. Réservé à l'administration (`X-Admin-Token`) ; les gammes à conserver
+    d'un démarrage à l'autre vont dans `USER_SCALES_FILE`.
+    """
+    if not has_admin_token(http_request.headers.get("X-Admin-Token"), SCALES_TOKEN):
+        return Response(status_code=403)
+    try:
+        registry = register_modes(
+            {scale.name: (scale.intervals, scale.qualities, None) for scale in request.scales}
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    return describe_registry(registry)
+
+
+@app.post("/scales/heptatonic")
+async def add_heptatonic_scales(http_request: Request):
+    """
+    Ajoute toutes les gammes de sept notes qui ne sont pas encore enregistrées.
+    Réservé à l'administration, comme POST /scales.
+    """
+    if not has_admin_token(http_request.headers.get("X-Admin-Token"), SCALES_TOKEN):
+        return Response(status_code=403)
+    return {"mode_count": len(await run_in_threadpool(register_heptatonic_scales))}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Durées des étapes de /analyze, appels au modèle et caches, au format Prometheus."""
+    return Response(
+        render_metrics(METRIC_CACHES), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,246 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, TypedDict
+
+import numpy as np
+
+from app.numeral_realization.generator import parse_numeral_template, realize_degrees
+from app.utils.chords_analyzer import QualityAnalysisItem
+from app.utils.common import get_note_index
+from app.utils.modes import get_mode_registry
+from constants import PROGRESSION_PRESETS
+
+# Un état = (degré 1-7, triade ou 7e) : état = (degré - 1) * 2 + triade
+STATE_COUNT = 14
+_START = STATE_COUNT  # Symbole de début de progression (contexte des premiers accords)
+_BASE = STATE_COUNT + 1
+MAX_ORDER = 4
+MAX_SAMPLES = 20_000
+# Contexte vu moins souvent que cela : on se replie sur l'ordre inférieur
+MIN_CONTEXT_COUNT = 1
+
+# Degrés imposés aux derniers accords (de l'avant-dernier au dernier)
+CADENCE_ENDINGS: Dict[str, Tuple[int, ...]] = {
+    "authentic": (5, 1),
+    "plagal": (4, 1),
+    "half": (5,),
+    "deceptive": (5, 6),
+}
+
+
+class MarkovModel(NamedTuple):
+    """
+    Chaîne de Markov d'ordre variable compilée en tableaux denses. Pour chaque ordre k
+    (0 à max_order), la ligne d'un contexte de k états est numérotée en base
+    STATE_COUNT + 1 (le symbole de début compris).
+    """
+
+    max_order: int
+    probabilities: Tuple[np.ndarray, ...]  # [ordre][contexte][état suivant]
+    known: Tuple[np.ndarray, ...]  # [ordre][contexte] : contexte assez observé
+
+
+class GeneratedProgression(TypedDict):
+    numerals: List[str]
+    chords: List[str]
+    log_probability: float
+
+
+def _state_of(degree: int, is_triad: bool) -> int:
+    return (degree - 1) * 2 + int(is_triad)
+
+
+def states_from_numerals(numerals: Iterable[Optional[str]]) -> List[List[int]]:
+    """
+    États d'une suite de chiffrages (ex: des `found_numeral`). Un chiffrage non
+    reconnu coupe la suite : les transitions ne l'enjambent pas.
+    """
+    sequences: List[List[int]] = [[]]
+    for numeral in numerals:
+        try:
+            (step,) = parse_numeral_template([(numeral or "").strip("()")])
+        except ValueError:
+            sequences.append([])
+            continue
+        sequences[-1].append(_state_of(step.degree, step.is_triad))
+    return [sequence for sequence in sequences if sequence]
+
+
+def states_from_analysis(quality_analysis: Sequence[QualityAnalysisItem]) -> List[List[int]]:
+    """États d'une progression analysée ; les accords non diatoniques coupent la suite."""
+    return states_from_numerals(
+        item["found_numeral"] if item["is_diatonic"] else None for item in quality_analysis
+    )
+
+
+def train_markov_model(sequences: Iterable[Sequence[int]], max_order: int = 2) -> MarkovModel:
+    """Compte les transitions de chaque ordre (de 0 à `max_order`) et les normalise."""
+    if not 1 <= max_order <= MAX_ORDER:
+        raise ValueError(f"L'ordre doit être compris entre 1 et {MAX_ORDER}.")
+    counts = [np.zeros((_BASE**order, STATE_COUNT)) for order in range(max_order + 1)]
+    for sequence in sequences:
+        padded = np.array([_START] * max_order + list(sequence), dtype=np.intp)
+        targets = padded[max_order:]
+        if not len(targets):
+            continue
+        positions = np.arange(max_order, len(padded))
+        for order in range(max_order + 1):
+            codes = np.zeros(len(targets), dtype=np.intp)
+            for offset in range(1, order + 1):
+                codes = codes * _BASE + padded[positions - offset]
+            np.add.at(counts[order], (codes, targets), 1)
+    if not counts[0].any():
+        raise ValueError("Le corpus ne contient aucun chiffrage reconnu.")
+
+    probabilities, known = [], []
+    for order_counts in counts:
+        totals = order_counts.sum(axis=1)
+        observed = totals >= MIN_CONTEXT_COUNT
+        rows = np.divide(
+            order_counts, totals[:, None], out=np.zeros_like(order_counts), where=observed[:, None]
+        )
+        for array in (rows, observed):
+            array.flags.writeable = False
+        probabilities.append(rows)
+        known.append(observed)
+    return MarkovModel(max_order, tuple(probabilities), tuple(known))
+
+
+def model_from_templates(templates: Iterable[str], max_order: int = 2) -> MarkovModel:
+    """Modèle entraîné sur des modèles de chiffrages ("I V vi IV", "ii7 V7 Imaj7"...)."""
+    sequences = [
+        sequence
+        for template in templates
+        for sequence in states_from_numerals(
+            step.numeral for step in parse_numeral_template(template)
+        )
+    ]
+    return train_markov_model(sequences, max_order)
+
+
+@lru_cache(maxsize=32)
+def preset_model(preset: str, max_order: int = 2) -> MarkovModel:
+    """Modèle entraîné sur un corpus de `PROGRESSION_PRESETS`, compilé une seule fois."""
+    if preset not in PROGRESSION_PRESETS:
+        raise ValueError(f"Preset '{preset}' inconnu.")
+    return model_from_templates(PROGRESSION_PRESETS[preset], max_order)
+
+
+def _allowed_states(
+    length: int, start_on_tonic: bool, cadence: Optional[str]
+) -> List[Optional[np.ndarray]]:
+    """États permis à chaque position (None : aucune contrainte)."""
+    degrees: List[Optional[Tuple[int, ...]]] = [None] * length
+    if start_on_tonic:
+        degrees[0] = (1,)
+    if cadence is not None:
+        if cadence not in CADENCE_ENDINGS:
+            raise ValueError(f"Cadence '{cadence}' inconnue.")
+        ending = CADENCE_ENDINGS[cadence]
+        if len(ending) > length:
+            raise ValueError("La progression est trop courte pour cette cadence.")
+        for offset, degree in enumerate(ending):
+            degrees[length - len(ending) + offset] = (degree,)
+    state_degrees = np.arange(STATE_COUNT) // 2 + 1
+    return [None if allowed is None else np.isin(state_degrees, allowed) for allowed in degrees]
+
+
+def sample_progressions(
+    model: MarkovModel,
+    length: int,
+    samples: int,
+    start_on_tonic: bool = False,
+    cadence: Optional[str] = None,
+    seed: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tire `samples` progressions de `length` états en parallèle : chaque position est
+    un seul tirage vectorisé pour toutes les progressions. Le contexte le plus long
+    déjà observé est utilisé (repli sur les ordres inférieurs). Les contraintes
+    masquent les états interdits ; si aucun état permis n'a été observé dans ce
+    contexte, le choix se fait uniformément parmi les états permis.
+
+    Renvoie les états [progression][position] et leur log-probabilité.
+    """
+    if length < 1:
+        raise ValueError("La progression doit compter au moins un accord.")
+    if not 1 <= samples <= MAX_SAMPLES:
+        raise ValueError(f"Le nombre de tirages doit être compris entre 1 et {MAX_SAMPLES}.")
+    rng = np.random.default_rng(seed)
+    constraints = _allowed_states(length, start_on_tonic, cadence)
+    order = model.max_order
+    history = np.full((samples, order), _START, dtype=np.intp)
+    states = np.empty((samples, length), dtype=np.intp)
+    log_probability = np.zeros(samples)
+    rows = np.arange(samples)
+
+    for position, allowed in enumerate(constraints):
+        probabilities = np.repeat(model.probabilities[0], samples, axis=0)
+        codes = np.zeros(samples, dtype=np.intp)
+        for context_order in range(1, order + 1):
+            codes = codes * _BASE + history[:, order - context_order]
+            observed = model.known[context_order][codes]
+            probabilities[observed] = model.probabilities[context_order][codes[observed]]
+        if allowed is not None:
+            probabilities = probabilities * allowed
+            empty = probabilities.sum(axis=1) == 0
+            probabilities[empty] = allowed
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+        # Tirage par inversion de la fonction de répartition (un état de probabilité
+        # nulle n'est jamais choisi, même avec les arrondis)
+        cumulative = probabilities.cumsum(axis=1)
+        draws = rng.random(samples) * cumulative[:, -1]
+        chosen = (cumulative < draws[:, None]).sum(axis=1)
+        log_probability += np.log(probabilities[rows, chosen])
+        states[:, position] = chosen
+        history = np.concatenate([history[:, 1:], chosen[:, None]], axis=1)
+    return states, log_probability
+
+
+def generate_progressions(
+    model: MarkovModel,
+    tonic: str,
+    mode_name: str,
+    length: int = 4,
+    samples: int = 1000,
+    limit: Optional[int] = None,
+    start_on_tonic: bool = False,
+    cadence: Optional[str] = None,
+    seed: Optional[int] = None,
+) -> List[GeneratedProgression]:
+    """
+    Génère des progressions dans une tonalité, réalisées par les constructeurs
+    diatoniques du mode : progressions distinctes, de la plus probable à la moins
+    probable.
+    """
+    registry = get_mode_registry()
+    mode_id = registry.resolve(mode_name)
+    if mode_id is None:
+        raise ValueError(f"Mode '{mode_name}' not found.")
+    if len(registry.intervals[mode_id]) < 7:
+        raise ValueError(f"Le mode '{mode_name}' n'a pas sept degrés.")
+    tonic_index = get_note_index(tonic)
+
+    states, log_probability = sample_progressions(
+        model, length, samples, start_on_tonic, cadence, seed
+    )
+    unique_states, first_index = np.unique(states, axis=0, return_index=True)
+    scores = log_probability[first_index]
+    order = np.argsort(-scores, kind="stable")[:limit]
+    unique_states, scores = unique_states[order], scores[order]
+
+    chords, numerals = realize_degrees(
+        unique_states // 2, (unique_states % 2).astype(bool), tonic_index, mode_id
+    )
+    return [
+        {
+            "numerals": progression_numerals,
+            "chords": progression_chords,
+            "log_probability": round(float(score), 6),
+        }
+        for progression_numerals, progression_chords, score in zip(numerals, chords, scores)
+    ]
+
+
+# Caches exposés par /metrics (succès, échecs, taille)
+CACHES = {"markov_preset_model": preset_model}
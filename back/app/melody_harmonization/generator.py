@@ -0,0 +1,279 @@
+import math
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple, TypedDict
+
+import numpy as np
+
+from app.modal_substitution.generator import get_diatonic_triad_chord
+from app.pipeline import build_progression_analysis
+from app.reharmonization.generator import ROOT_MOTION_COSTS
+from app.schema import ChordItem
+from app.utils.common import as_chord, get_diatonic_7th_chord, get_note_index
+from app.utils.modes import ModeRegistry, get_mode_registry
+
+# Nombre maximal de positions harmonisées (ex: 2000 mesures avec un accord par mesure)
+MAX_SLOTS = 2000
+
+
+class MelodyNote(NamedTuple):
+    """Note de la mélodie, positionnée en temps (noires)."""
+
+    pitch: int  # Note MIDI ou classe de hauteur (0-11)
+    start: float  # Début, en temps depuis le début du morceau
+    duration: float  # Durée, en temps
+
+
+class HarmonizationWeights(NamedTuple):
+    melody: float = 3.0  # Part de la mélodie hors de l'accord
+    root_motion: float = 1.0
+    common_tones: float = 1.0
+    borrowing: float = 1.0  # Distance d'emprunt (notes de gamme modifiées)
+    tonic_start: float = 1.0  # Premier accord qui n'est pas sur la tonique
+    tonic_ending: float = 1.0  # Dernier accord qui n'est pas sur la tonique
+
+
+class HarmonizationCandidates(NamedTuple):
+    """Accords proposables dans une tonalité, sous forme de tableaux."""
+
+    names: Tuple[str, ...]
+    qualities: Tuple[str, ...]
+    sources: Tuple[str, ...]  # "mode:<nom>" : mode d'où vient l'accord
+    roots: np.ndarray  # [candidat] index chromatique de la fondamentale
+    members: np.ndarray  # [candidat][classe de hauteur] note de l'accord
+    borrowing: np.ndarray  # [candidat] nombre de notes de gamme modifiées
+    transitions: np.ndarray  # [précédent][suivant] coût d'enchaînement (poids unitaires)
+
+
+class HarmonizedSlot(TypedDict):
+    chord: str
+    source: str
+    start: float
+    duration: float
+
+
+@lru_cache(maxsize=64)
+def _candidates(
+    registry: ModeRegistry,
+    tonic_index: int,
+    mode_name: str,
+    sevenths: bool,
+    weights: Tuple[float, float],
+) -> HarmonizationCandidates:
+    """
+    Triades (et 7e) de chaque degré dans chaque mode de sept notes sur la même
+    tonique, comme pour la réharmonisation. Un accord proposé par plusieurs modes
+    garde la plus petite distance d'emprunt.
+    """
+    home_mask = registry.scale_masks_by_tonic[tonic_index][registry.ids[mode_name]]
+    options: Dict[str, Tuple[str, str, int, int, int]] = {}
+    # Le mode de la tonalité d'abord : à coût égal, l'accord diatonique l'emporte
+    mode_names = [mode_name] + [name for name in registry.heptatonic_names if name != mode_name]
+    for name in mode_names:
+        distance = bin(registry.scale_masks_by_tonic[tonic_index][registry.ids[name]] ^ home_mask)
+        distance_count = distance.count("1") // 2
+        for degree in range(1, 8):
+            chords = [get_diatonic_triad_chord(degree, tonic_index, name)]
+            if sevenths:
+                chords.append(get_diatonic_7th_chord(degree, tonic_index, name))
+            for chord_name in chords:
+                chord = as_chord(chord_name)
+                if chord is None or not chord.mask:
+                    continue
+                known = options.get(chord.name)
+                if known is None or distance_count < known[4]:
+                    options[chord.name] = (
+                        chord.quality,
+                        f"mode:{name}",
+                        chord.root,
+                        chord.mask,
+                        distance_count,
+                    )
+
+    names = tuple(options)
+    qualities, sources, root_list, masks, distances = zip(*options.values())
+    roots = np.array(root_list, dtype=np.intp)
+    members = (np.array(masks, dtype=np.int64)[:, None] >> np.arange(12)) & 1
+    borrowing = np.array(distances, dtype=float)
+
+    # Même coût d'enchaînement que la réharmonisation : fondamentale et notes communes
+    root_motion = np.array(ROOT_MOTION_COSTS)[(roots[None, :] - roots[:, None]) % 12]
+    common = members @ members.T
+    sizes = members.sum(axis=1)
+    smallest = np.minimum(sizes[:, None], sizes[None, :])
+    transitions = weights[0] * root_motion + weights[1] * (1 - common / smallest)
+    for array in (roots, members, borrowing, transitions):
+        array.flags.writeable = False
+    return HarmonizationCandidates(
+        names, qualities, sources, roots, members, borrowing, transitions
+    )
+
+
+def melody_profile(notes: Sequence[MelodyNote], beats_per_chord: float) -> np.ndarray:
+    """
+    Durée de chaque classe de hauteur dans chaque position harmonisée
+    [position][classe de hauteur]. Une note à cheval sur deux positions compte
+    dans chacune pour la partie qui la recouvre.
+    """
+    if beats_per_chord <= 0:
+        raise ValueError("La durée d'un accord doit être positive.")
+    if not notes:
+        raise ValueError("La mélodie ne contient aucune note.")
+    starts = np.array([note.start for note in notes], dtype=float)
+    ends = starts + np.array([note.duration for note in notes], dtype=float)
+    if (starts < 0).any() or (ends <= starts).any():
+        raise ValueError("Chaque note doit commencer à un temps positif et durer.")
+    slot_count = math.ceil(ends.max() / beats_per_chord - 1e-9)
+    if slot_count > MAX_SLOTS:
+        raise ValueError(f"La mélodie dépasse {MAX_SLOTS} positions harmonisées.")
+
+    first = np.floor(starts / beats_per_chord).astype(np.intp)
+    last = np.maximum(np.ceil(ends / beats_per_chord - 1e-9).astype(np.intp) - 1, first)
+    spans = last - first + 1
+    note_index = np.repeat(np.arange(len(notes)), spans)
+    slots = (
+        np.repeat(first, spans)
+        + np.arange(spans.sum())
+        - np.repeat(np.cumsum(spans) - spans, spans)
+    )
+    overlap = np.minimum(ends[note_index], (slots + 1) * beats_per_chord) - np.maximum(
+        starts[note_index], slots * beats_per_chord
+    )
+    pitch_classes = np.array([note.pitch for note in notes], dtype=np.intp) % 12
+    profile = np.zeros((slot_count, 12))
+    np.add.at(profile, (slots, pitch_classes[note_index]), np.maximum(overlap, 0))
+    return profile
+
+
+def _harmonize(
+    notes: Sequence[MelodyNote],
+    tonic: str,
+    mode_name: str,
+    beats_per_chord: float,
+    sevenths: bool,
+    weights: HarmonizationWeights,
+) -> Tuple[float, HarmonizationCandidates, List[int], str]:
+    """
+    Choisit un accord par position (mesure ou temps, selon `beats_per_chord`) par
+    programmation dynamique : coût de la mélodie hors de l'accord, distance d'emprunt
+    et enchaînement avec l'accord précédent, minimisés sur tout le morceau
+    (O(positions x candidats²), vectorisé position par position).
+    Renvoie aussi le nom du mode tel qu'enregistré (la casse de `mode_name` est libre).
+    """
+    registry = get_mode_registry()
+    mode_id = registry.resolve(mode_name)
+    if mode_id is None:
+        raise ValueError(f"Mode '{mode_name}' not found.")
+    if registry.names[mode_id] not in registry.heptatonic_names:
+        raise ValueError(f"Le mode '{mode_name}' n'a pas sept degrés.")
+    tonic_index = get_note_index(tonic)
+    mode_name = registry.names[mode_id]
+    candidates = _candidates(
+        registry,
+        tonic_index,
+        mode_name,
+        sevenths,
+        (weights.root_motion, weights.common_tones),
+    )
+    profile = melody_profile(notes, beats_per_chord)
+
+    # Part de la mélodie hors de l'accord, par position [position][candidat]
+    totals = profile.sum(axis=1, keepdims=True)
+    outside = profile @ (1 - candidates.members).T
+    local = (
+        weights.melody * np.divide(outside, totals, out=np.zeros_like(outside), where=totals > 0)
+        + weights.borrowing * candidates.borrowing
+    )
+
+    slot_count = len(profile)
+    backpointers = np.zeros((slot_count, len(candidates.names)), dtype=np.intp)
+    off_tonic = candidates.roots != tonic_index
+    cost = local[0] + weights.tonic_start * off_tonic
+    for slot in range(1, slot_count):
+        total = cost[:, None] + candidates.transitions
+        backpointers[slot] = total.argmin(axis=0)
+        cost = total[backpointers[slot], np.arange(len(cost))] + local[slot]
+    cost = cost + weights.tonic_ending * off_tonic
+
+    chosen = [int(cost.argmin())]
+    for slot in range(slot_count - 1, 0, -1):
+        chosen.append(int(backpointers[slot, chosen[-1]]))
+    chosen.reverse()
+    return round(float(cost.min()), 6), candidates, chosen, mode_name
+
+
+def harmonize_melody(
+    notes: Sequence[MelodyNote],
+    tonic: str,
+    mode_name: str,
+    beats_per_chord: float = 4.0,
+    sevenths: bool = True,
+    weights: HarmonizationWeights = HarmonizationWeights(),
+) -> Tuple[float, List[HarmonizedSlot]]:
+    """Accord choisi à chaque position et coût total de l'harmonisation."""
+    cost, candidates, chosen, _ = _harmonize(
+        notes, tonic, mode_name, beats_per_chord, sevenths, weights
+    )
+    return cost, _serialize_slots(candidates, chosen, beats_per_chord)
+
+
+def _serialize_slots(
+    candidates: HarmonizationCandidates, chosen: Sequence[int], beats_per_chord: float
+) -> List[HarmonizedSlot]:
+    return [
+        {
+            "chord": candidates.names[index],
+            "source": candidates.sources[index],
+            "start": slot * beats_per_chord,
+            "duration": beats_per_chord,
+        }
+        for slot, index in enumerate(chosen)
+    ]
+
+
+def harmonize_melody_analysis(
+    notes: Sequence[MelodyNote],
+    tonic: str,
+    mode_name: str,
+    beats_per_chord: float = 4.0,
+    sevenths: bool = True,
+    weights: HarmonizationWeights = HarmonizationWeights(),
+) -> Dict[str, Any]:
+    """
+    Harmonise la mélodie, puis analyse les accords choisis comme /analyze le ferait
+    (la tonalité étant connue, sans passer par la détection).
+    """
+    cost, candidates, chosen, mode_name = _harmonize(
+        notes, tonic, mode_name, beats_per_chord, sevenths, weights
+    )
+    slots = _serialize_slots(candidates, chosen, beats_per_chord)
+    progression_data = []
+    for position, index in enumerate(chosen):
+        name, quality = candidates.names[index], candidates.qualities[index]
+        progression_data.append(
+            ChordItem(
+                id=position,
+                root=name[: len(name) - len(quality)],
+                quality=quality,
+                duration=max(1, round(beats_per_chord)),
+            )
+        )
+    explanation = f"Harmonisation de la mélodie en {tonic} {mode_name}."
+    analysis_result = {
+        "global_analysis": {"tonic": tonic, "mode": mode_name, "explanation": explanation},
+        "harmonic_segments": [
+            {
+                "start_index": 0,
+                "end_index": len(slots) - 1,
+                "tonic": tonic,
+                "mode": mode_name,
+                "explanation": explanation,
+            }
+        ],
+    }
+    result = build_progression_analysis(progression_data, analysis_result)
+    result["harmonization"] = {"cost": cost, "chords": slots}
+    return result
+
+
+# Caches exposés par /metrics (succès, échecs, taille)
+CACHES = {"harmonization_candidates": _candidates}
@@ -3,32 +3,14 @@ from typing import Any, Dict, List, Optional
 
 from app.utils.chords_analyzer import QualityAnalysisItem
 from app.utils.common import (
+    ChordLike,
+    chord_name_of,
     get_diatonic_7th_chord,
     get_note_from_index,
 )
-from constants import MODES_DATA, ROMAN_DEGREES, ROMAN_TO_DEGREE_MAP
-
-TRIAD_QUALITIES = {"", "m", "dim", "aug", "sus2", "sus4"}
-
-SEVENTH_TO_TRIAD_MAP = {
-    "maj7": "",
-    "maj9": "",
-    "maj13": "",
-    "maj7#5": "aug",
-    "m7": "m",
-    "m9": "m",
-    "m11": "m",
-    "m(maj7)": "m",
-    "m6": "m",
-    "7": "",  # La triade d'un accord de 7e de dominante est majeure
-    "9": "",
-    "13": "",
-    "7b5": "dim",  # Souvent, la base est diminuée
-    "7#5": "aug",
-    "m7b5": "dim",
-    "dim7": "dim",
-    # Ajoutez d'autres correspondances si nécessaire
-}
+from app.utils.modes import get_mode_registry
+from app.utils.qualities import QUALITY_BY_NAME, get_quality
+from constants import ROMAN_DEGREES, ROMAN_TO_DEGREE_MAP
 
 
 def get_diatonic_triad_chord(degree: int, tonic_index: int, mode_name: str) -> str:
@@ -43,13 +25,16 @@ def get_diatonic_triad_chord(degree: int, tonic_index: int, mode_name: str) -> s
     Returns:
         str: Le nom complet de l'accord de triade (ex: "Dm", "G", "Bdim").
     """
-    if mode_name not in MODES_DATA:
+    registry = get_mode_registry()
+    if mode_name not in registry.ids:
         raise ValueError(f"Le mode '{mode_name}' n'est pas reconnu.")
     if not 1 <= degree <= 7:
         raise ValueError("Le degré doit être compris entre 1 et 7.")
 
     # 1. Obtenir les données du mode
-    mode_intervals, mode_seventh_qualities, _ = MODES_DATA[mode_name]
+    mode_id = registry.ids[mode_name]
+    mode_intervals = registry.intervals[mode_id]
+    mode_seventh_qualities = registry.qualities[mode_id]
 
     # 2. Déterminer la fondamentale (root) de l'accord
     # On soustrait 1 au degré car les listes sont indexées à partir de 0
@@ -61,14 +46,11 @@ def get_diatonic_triad_chord(degree: int, tonic_index: int, mode_name: str) -> s
     # On récupère d'abord la qualité de 7e diatonique
     seventh_quality = mode_seventh_qualities[degree - 1]
     # Puis on la convertit en sa qualité de triade correspondante
-    triad_quality = SEVENTH_TO_TRIAD_MAP.get(seventh_quality, "M")  # "M" par défaut
+    # (pour les accords majeurs, la qualité est omise)
+    triad_quality = QUALITY_BY_NAME[seventh_quality].triad
 
     # 4. Construire le nom de l'accord final
-    # Pour les accords majeurs, la qualité "M" est généralement omise.
-    if triad_quality == "M":
-        return root_note_name
-    else:
-        return root_note_name + triad_quality
+    return root_note_name + triad_quality
 
 
 def get_substitution_info(
@@ -97,7 +79,8 @@ def get_substitution_info(
 
             degree_num = ROMAN_TO_DEGREE_MAP.get(base_numeral_str)
             if degree_num:
-                is_triad = found_quality in TRIAD_QUALITIES
+                found = get_quality(found_quality)
+                is_triad = found is not None and found.is_triad
                 substitution_info_list.append({"degree": degree_num, "is_triad": is_triad})
             else:
                 substitution_info_list.append(None)
@@ -108,7 +91,7 @@ def get_substitution_info(
 
 
 def get_substitutions(
-    progression: List[str],
+    progression: List[ChordLike],
     relative_tonic_index: int,
     sub_info: List[Optional[Dict[str, Any]]],
     mode_name: str = "Ionian",
@@ -117,11 +100,12 @@ def get_substitutions(
     Crée une liste d'accords de substitution en se basant sur la nature (triade ou 7e)
     de l'accord original.
     """
+    registry = get_mode_registry()
     try:
-        current_mode_qualities = MODES_DATA[mode_name][1]
+        current_mode_qualities = registry.qualities[registry.ids[mode_name]]
     except KeyError:
         # Fallback sur Ionian si le mode n'est pas trouvé, pour éviter de crasher.
-        current_mode_qualities = MODES_DATA["Ionian"][1]
+        current_mode_qualities = registry.qualities[registry.ids["Ionian"]]
 
     substituted_chords: List[dict] = []
 
@@ -129,7 +113,7 @@ def get_substitutions(
         if info is None:
             substituted_chords.append(
                 {
-                    "chord": progression[index],
+                    "chord": chord_name_of(progression[index]),
                     "roman": None,
                     "quality": None,
                 }
@@ -144,7 +128,7 @@ def get_substitutions(
 
         if is_original_chord_triad:
             # Si l'original est une triade, on substitue par une triade
-            expected_quality = SEVENTH_TO_TRIAD_MAP.get(seventh_quality, "")
+            expected_quality = QUALITY_BY_NAME[seventh_quality].triad
             # On suppose l'existence d'une fonction qui génère la triade diatonique
             chord_name = get_diatonic_triad_chord(degree, relative_tonic_index, mode_name)
         else:
@@ -154,9 +138,7 @@ def get_substitutions(
 
         # Formatage du chiffrage romain
         roman_numeral = ROMAN_DEGREES[degree - 1]
-        if (
-            expected_quality.startswith("m") and not expected_quality.startswith("maj")
-        ) or "dim" in expected_quality:
+        if QUALITY_BY_NAME[expected_quality].core in ["minor", "diminished"]:
             roman_numeral = roman_numeral.lower()
 
         substituted_chords.append(
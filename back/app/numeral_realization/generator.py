@@ -0,0 +1,244 @@
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence, Tuple, TypedDict
+
+import numpy as np
+
+from app.utils.common import format_numeral, get_note_from_index, get_note_index
+from app.utils.modes import ModeRegistry, get_mode_registry
+from app.utils.qualities import QUALITIES, QUALITY_BY_NAME, QUALITY_IDS
+from constants import NOTES, ROMAN_DEGREES, ROMAN_TO_DEGREE_MAP
+
+# Séparateurs acceptés dans un modèle (ex: "ii7–V7–Imaj7", "I vi IV V", "ii7 | V7 | I")
+_TEMPLATE_SEPARATORS = re.compile(r"[\s,|\-–—]+")
+_NUMERAL_PATTERN = re.compile(r"^([b#]?)([ivIV]+)(.*)$")
+# Chiffrages entièrement en majuscules ou en minuscules ("Ii" n'a pas de sens)
+_CASED_NUMERALS = {case(numeral) for numeral in ROMAN_DEGREES for case in (str.upper, str.lower)}
+
+# Nom de chaque accord : [fondamentale][qualité]
+_CHORD_NAMES = np.array([[note + q.name for q in QUALITIES] for note in NOTES], dtype=object)
+
+
+class NumeralStep(NamedTuple):
+    """Chiffrage romain d'un modèle, réduit au degré et à la nature de l'accord."""
+
+    numeral: str  # Tel que saisi (ex: "ii7")
+    degree: int  # Degré du mode (1-7)
+    is_triad: bool  # Triade, ou accord de 7e sinon
+    is_minor: bool  # Chiffrage en minuscules : accord mineur ou diminué
+    quality: Optional[int] = None  # Qualité imposée par le suffixe (ex: "maj7"), sinon None
+
+
+class NumeralRealization(TypedDict):
+    tonic: str
+    mode: str
+    numerals: List[str]
+    chords: List[str]
+
+
+@lru_cache(maxsize=4)
+def _degree_tables(registry: ModeRegistry) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Tables d'un registre indexées par [mode][degré] : intervalle, qualité de la triade
+    et qualité de 7e (complétées par des zéros au-delà du dernier degré du mode).
+    """
+    width = registry.quality_table.shape[1]
+    intervals = np.zeros((len(registry), width), dtype=np.int16)
+    triads = np.zeros((len(registry), width), dtype=np.int16)
+    for mode_id, (mode_intervals, qualities) in enumerate(
+        zip(registry.intervals, registry.qualities)
+    ):
+        intervals[mode_id, : len(mode_intervals)] = mode_intervals
+        triads[mode_id, : len(qualities)] = [
+            QUALITY_IDS[QUALITY_BY_NAME[quality].triad] for quality in qualities
+        ]
+    sevenths = np.maximum(registry.quality_table, 0)
+    return intervals, triads, sevenths
+
+
+# Qualités (par identifiant) notées en minuscules : mineures et diminuées
+_MINOR_QUALITIES = np.array(
+    [quality.core in ("minor", "diminished") for quality in QUALITIES], dtype=bool
+)
+
+# Suffixes qui fixent la qualité de l'accord, par (minuscules, suffixe) : "ii7" est un
+# m7, "V7" un 7, "viiø7" un m7b5... En majuscules, le nom de la qualité est aussi
+# accepté ("IIm7", "VIIm7b5"). Les autres suffixes ("9", "sus4") ne sont pas vérifiés.
+_EXPLICIT_QUALITY_NAMES = ("maj7", "m7", "7", "m7b5", "dim7", "dim", "aug")
+_EXPLICIT_QUALITIES = {
+    **{(False, name): QUALITY_IDS[name] for name in _EXPLICIT_QUALITY_NAMES},
+    **{
+        (bool(_MINOR_QUALITIES[quality.id]), quality.numeral_suffix): quality.id
+        for quality in (QUALITY_BY_NAME[name] for name in _EXPLICIT_QUALITY_NAMES)
+    },
+}
+
+
+def _agreeing_modes(steps: Sequence[NumeralStep], mode_ids: np.ndarray) -> np.ndarray:
+    """
+    Modes (masque) dont les triades sur les degrés du modèle ont la casse des
+    chiffrages : "V7" ne se réalise pas en éolien, où le 5e degré est mineur.
+    Un suffixe explicite doit aussi correspondre à l'accord du mode : "Vmaj7" ne se
+    réalise pas en ionien, où le 5e degré porte un accord de 7e de dominante.
+    """
+    _, triad_table, seventh_table = _degree_tables(get_mode_registry())
+    degrees = np.array([step.degree - 1 for step in steps], dtype=np.intp)
+    expected = np.array([step.is_minor for step in steps], dtype=bool)
+    minor = _MINOR_QUALITIES[triad_table[mode_ids[:, None], degrees]]
+    agreeing: np.ndarray = (minor == expected).all(axis=1)
+
+    explicit = np.array([step.quality is not None for step in steps], dtype=bool)
+    if explicit.any():
+        is_triad = np.array([step.is_triad for step in steps], dtype=bool)
+        qualities = np.where(
+            is_triad,
+            triad_table[mode_ids[:, None], degrees],
+            seventh_table[mode_ids[:, None], degrees],
+        )
+        required = np.array([step.quality or 0 for step in steps], dtype=qualities.dtype)
+        agreeing &= ((qualities == required) | ~explicit).all(axis=1)
+    return agreeing
+
+
+def realize_degrees(
+    degrees: np.ndarray, is_triad: np.ndarray, tonic_index: int, mode_id: int
+) -> Tuple[List[List[str]], List[List[str]]]:
+    """
+    Réalise d'un coup des suites de degrés (indices 0-6, tableaux de même forme
+    [progression][position]) dans une tonalité : noms d'accords et chiffrages.
+    """
+    registry = get_mode_registry()
+    interval_table, triad_table, seventh_table = _degree_tables(registry)
+    quality_ids = np.where(is_triad, triad_table[mode_id, degrees], seventh_table[mode_id, degrees])
+    roots = (tonic_index + interval_table[mode_id, degrees]) % 12
+    # Chiffrage de chacun des 7 degrés x (7e, triade) du mode
+    numeral_table = np.array(
+        [
+            [
+                format_numeral(ROMAN_DEGREES[degree], QUALITIES[quality_id].name)
+                for quality_id in row
+            ]
+            for degree, row in enumerate(
+                zip(seventh_table[mode_id, :7].tolist(), triad_table[mode_id, :7].tolist())
+            )
+        ],
+        dtype=object,
+    )
+    return _CHORD_NAMES[roots, quality_ids].tolist(), numeral_table[
+        degrees, is_triad.astype(np.intp)
+    ].tolist()
+
+
+def parse_numeral_template(template: str | Sequence[str]) -> List[NumeralStep]:
+    """
+    Découpe un modèle en chiffrages ("ii7–V7–Imaj7" ou ["ii7", "V7", "Imaj7"]).
+
+    Comme pour la substitution modale, seuls le degré et la nature de l'accord
+    (triade ou 7e) sont retenus : la qualité est ensuite donnée par le mode, dont
+    les accords doivent s'accorder avec la casse du chiffrage et avec son suffixe
+    quand celui-ci fixe la qualité ("maj7", "7", "ø7", "°7", "°", "+" ; voir `realize_template`).
+    Lève ValueError si un chiffrage n'est pas reconnu ou s'il est chromatique
+    (ex: "bVII") : le mode ne donne que des degrés diatoniques.
+    """
+    tokens = _TEMPLATE_SEPARATORS.split(template) if isinstance(template, str) else template
+    steps: List[NumeralStep] = []
+    for token in tokens:
+        token = token.strip()
+        if not token:
+            continue
+        match = _NUMERAL_PATTERN.match(token)
+        numeral = match.group(2) if match else ""
+        degree = ROMAN_TO_DEGREE_MAP.get(numeral.upper()) if numeral in _CASED_NUMERALS else None
+        if match is None or degree is None:
+            raise ValueError(f"Chiffrage romain invalide : '{token}'")
+        if match.group(1):
+            raise ValueError(f"Chiffrage chromatique non pris en charge : '{token}'")
+        # Les suffixes sans chiffre ("°", "+", "ø") restent des triades
+        is_triad = not any(c.isdigit() for c in match.group(3))
+        quality = _EXPLICIT_QUALITIES.get((numeral.islower(), match.group(3)))
+        is_minor = numeral.islower() if quality is None else bool(_MINOR_QUALITIES[quality])
+        steps.append(NumeralStep(token, degree, is_triad, is_minor, quality))
+    if not steps:
+        raise ValueError("Le modèle ne contient aucun chiffrage.")
+    return steps
+
+
+def realize_template(
+    template: str | Sequence[str],
+    tonics: Optional[Sequence[str]] = None,
+    modes: Optional[Sequence[str]] = None,
+) -> List[NumeralRealization]:
+    """
+    Réalise un modèle de chiffrages dans chaque tonique x mode demandé (par défaut,
+    tous les modes de sept notes du registre où le modèle est diatonique).
+
+    La casse d'un chiffrage doit correspondre à l'accord du mode sur ce degré
+    (minuscules : mineur ou diminué), de même que son suffixe s'il fixe la qualité
+    ("Vmaj7" contredit l'ionien). Un mode demandé explicitement qui les contredit
+    lève ValueError ; sans modes demandés, ces modes sont ignorés.
+
+    Toutes les réalisations sont obtenues d'un coup par lecture des tables du registre
+    des modes : [tonique][mode][position] -> fondamentale et qualité.
+    """
+    steps = parse_numeral_template(template)
+    registry = get_mode_registry()
+    tonic_indexes = list(range(12)) if tonics is None else [get_note_index(t) for t in tonics]
+    mode_ids: List[int] = []
+    if modes is None:
+        candidates = np.array(
+            [registry.ids[mode_name] for mode_name in registry.heptatonic_names], dtype=np.intp
+        )
+        mode_ids = candidates[_agreeing_modes(steps, candidates)].tolist()
+        if not mode_ids:
+            raise ValueError("Aucun mode ne contient ce modèle de chiffrages.")
+    else:
+        highest_degree = max(step.degree for step in steps)
+        for mode_name in modes:
+            mode_id = registry.resolve(mode_name)
+            if mode_id is None:
+                raise ValueError(f"Mode '{mode_name}' not found.")
+            if len(registry.intervals[mode_id]) < highest_degree:
+                raise ValueError(f"Le mode '{mode_name}' n'a pas de degré {highest_degree}.")
+            mode_ids.append(mode_id)
+        agreement = _agreeing_modes(steps, np.array(mode_ids, dtype=np.intp))
+        for mode_name, agrees in zip(modes, agreement.tolist()):
+            if not agrees:
+                raise ValueError(
+                    f"Le modèle contredit le mode '{mode_name}' (casse ou qualité des chiffrages)."
+                )
+    interval_table, triad_table, seventh_table = _degree_tables(registry)
+
+    degrees = np.array([step.degree - 1 for step in steps], dtype=np.intp)
+    is_triad = np.array([step.is_triad for step in steps], dtype=bool)
+    mode_array = np.array(mode_ids, dtype=np.intp)[:, None]
+
+    # [mode][position]
+    intervals = interval_table[mode_array, degrees]
+    quality_ids = np.where(
+        is_triad, triad_table[mode_array, degrees], seventh_table[mode_array, degrees]
+    )
+    # [tonique][mode][position]
+    roots = (np.array(tonic_indexes, dtype=np.int16)[:, None, None] + intervals[None]) % 12
+    chord_names = _CHORD_NAMES[roots, quality_ids[None]].tolist()
+
+    # Les chiffrages ne dépendent que du mode
+    numerals = [
+        [
+            format_numeral(ROMAN_DEGREES[step.degree - 1], QUALITIES[quality_id].name)
+            for step, quality_id in zip(steps, row)
+        ]
+        for row in quality_ids.tolist()
+    ]
+
+    realizations: List[NumeralRealization] = []
+    for tonic_index, chords_by_mode in zip(tonic_indexes, chord_names):
+        for mode_id, mode_numerals, chords in zip(mode_ids, numerals, chords_by_mode):
+            realizations.append(
+                {
+                    "tonic": get_note_from_index(tonic_index),
+                    "mode": registry.names[mode_id],
+                    "numerals": mode_numerals,
+                    "chords": chords,
+                }
+            )
+    return realizations
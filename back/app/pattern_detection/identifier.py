@@ -0,0 +1,183 @@
+from collections import deque
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, TypedDict
+
+from app.utils.chords_analyzer import QualityAnalysisItem
+from app.utils.common import ChordLike, as_chord, get_note_index
+from app.utils.qualities import QUALITY_BY_NAME
+from constants import CADENCE_PATTERNS, CHROMATIC_DEGREES_MAP
+
+SECONDARY_DOMINANT_CHAIN = "Secondary Dominant Chain"
+# Nombre de dominantes enchaînées par quintes descendantes pour former une chaîne
+CHAIN_LENGTH = 3
+
+# Suffixe du symbole selon la qualité de base de l'accord
+_CORE_SUFFIXES = {
+    "major": "",
+    "minor": "",
+    "dominant": "7",
+    "diminished": "°",
+    "augmented": "+",
+    "suspended": "sus",
+    "power": "5",
+}
+
+
+class Pattern(NamedTuple):
+    name: str
+    symbols: Tuple[str, ...]  # Ex: ("ii", "V7", "I")
+
+
+class PatternAutomaton(NamedTuple):
+    """
+    Automate d'Aho-Corasick compilé d'une bibliothèque de motifs. Les transitions
+    sont complétées (échecs déjà résolus) : un seul accès par accord analysé.
+    """
+
+    patterns: Tuple[Pattern, ...]
+    transitions: Tuple[Mapping[str, int], ...]  # État -> symbole -> état suivant
+    outputs: Tuple[Tuple[int, ...], ...]  # État -> motifs qui se terminent ici
+
+
+class PatternMatch(TypedDict):
+    name: str
+    start_index: int
+    end_index: int  # Inclus, comme pour les segments harmoniques
+    numerals: List[Optional[str]]  # `found_numeral` des accords concernés
+    chords: List[str]
+
+
+def numeral_symbol(chord: ChordLike, tonic_index: int) -> Optional[str]:
+    """
+    Symbole d'un accord pour la recherche de motifs : degré chromatique par rapport
+    à la tonique, casse selon la tierce, et famille de l'accord (ex: "ii", "V7", "bVII7").
+    """
+    parsed = as_chord(chord)
+    if parsed is None:
+        return None
+    core = QUALITY_BY_NAME[parsed.quality].core
+    degree = CHROMATIC_DEGREES_MAP[(parsed.root - tonic_index) % 12]
+    if core in ("minor", "diminished"):
+        degree = degree.lower()
+    return degree + _CORE_SUFFIXES.get(core, "")
+
+
+def secondary_dominant_chains(length: int = CHAIN_LENGTH) -> Tuple[str, ...]:
+    """Dominantes enchaînées par quintes descendantes, depuis chaque degré chromatique."""
+    return tuple(
+        " ".join(f"{CHROMATIC_DEGREES_MAP[(start + 5 * step) % 12]}7" for step in range(length))
+        for start in range(12)
+    )
+
+
+def compile_patterns(library: Mapping[str, Sequence[str]]) -> PatternAutomaton:
+    """Compile une bibliothèque {nom: motifs ("ii V7 I", ...)} en automate."""
+    patterns = tuple(
+        Pattern(name, tuple(pattern.split()))
+        for name, variants in library.items()
+        for pattern in variants
+        if pattern.split()
+    )
+
+    # 1. Trie des motifs
+    goto: List[Dict[str, int]] = [{}]
+    outputs: List[List[int]] = [[]]
+    for pattern_id, pattern in enumerate(patterns):
+        state = 0
+        for symbol in pattern.symbols:
+            if symbol not in goto[state]:
+                goto.append({})
+                outputs.append([])
+                goto[state][symbol] = len(goto) - 1
+            state = goto[state][symbol]
+        outputs[state].append(pattern_id)
+
+    # 2. Liens d'échec, en largeur, et transitions complétées
+    alphabet = {symbol for pattern in patterns for symbol in pattern.symbols}
+    transitions: List[Dict[str, int]] = [dict() for _ in goto]
+    fail = [0] * len(goto)
+    transitions[0] = {symbol: goto[0].get(symbol, 0) for symbol in alphabet}
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        outputs[state].extend(outputs[fail[state]])
+        for symbol in alphabet:
+            child = goto[state].get(symbol)
+            if child is None:
+                transitions[state][symbol] = transitions[fail[state]][symbol]
+            else:
+                transitions[state][symbol] = child
+                fail[child] = transitions[fail[state]][symbol]
+                queue.append(child)
+
+    return PatternAutomaton(
+        patterns,
+        tuple(transitions),
+        tuple(tuple(state_outputs) for state_outputs in outputs),
+    )
+
+
+PATTERN_AUTOMATON = compile_patterns(
+    {**CADENCE_PATTERNS, SECONDARY_DOMINANT_CHAIN: secondary_dominant_chains()}
+)
+
+
+def find_patterns(
+    symbols: Sequence[Optional[str]], automaton: PatternAutomaton = PATTERN_AUTOMATON
+) -> List[Tuple[int, int, int]]:
+    """
+    Occurrences (motif, début, fin incluse) de tous les motifs dans une suite de
+    symboles, en un seul passage : temps linéaire en la longueur de la progression,
+    quel que soit le nombre de motifs. Un symbole inconnu (None) ne fait partie
+    d'aucun motif.
+    """
+    occurrences: List[Tuple[int, int, int]] = []
+    state = 0
+    for index, symbol in enumerate(symbols):
+        state = automaton.transitions[state].get(symbol, 0) if symbol is not None else 0
+        for pattern_id in automaton.outputs[state]:
+            length = len(automaton.patterns[pattern_id].symbols)
+            occurrences.append((pattern_id, index - length + 1, index))
+    return occurrences
+
+
+def detect_patterns(
+    quality_analysis: Sequence[QualityAnalysisItem],
+    tonic: str,
+    automaton: PatternAutomaton = PATTERN_AUTOMATON,
+) -> List[PatternMatch]:
+    """
+    Repère les cadences et enchaînements connus dans une progression analysée.
+
+    Chaque accord est lu dans la tonalité de son segment (à défaut, la tonique
+    globale). Les occurrences d'un même motif qui se chevauchent (chaîne de
+    dominantes, boucle répétée) sont fusionnées.
+    """
+    default_tonic = get_note_index(tonic)
+    symbols: List[Optional[str]] = []
+    for item in quality_analysis:
+        context = item.get("segment_context")
+        tonic_index = get_note_index(context["tonic"]) if context else default_tonic
+        symbols.append(numeral_symbol(item["chord"], tonic_index))
+
+    # Fusion des occurrences chevauchantes d'un même motif
+    spans: Dict[str, List[Tuple[int, int]]] = {}
+    for pattern_id, start, end in find_patterns(symbols, automaton):
+        name_spans = spans.setdefault(automaton.patterns[pattern_id].name, [])
+        while name_spans and start <= name_spans[-1][1]:
+            previous_start, previous_end = name_spans.pop()
+            start, end = min(start, previous_start), max(end, previous_end)
+        name_spans.append((start, end))
+
+    matches: List[PatternMatch] = [
+        {
+            "name": name,
+            "start_index": start,
+            "end_index": end,
+            "numerals": [item["found_numeral"] for item in quality_analysis[start : end + 1]],
+            "chords": [item["chord"] for item in quality_analysis[start : end + 1]],
+        }
+        for name, name_spans in spans.items()
+        for start, end in name_spans
+    ]
+    matches.sort(key=lambda match: (match["start_index"], -match["end_index"]))
+    return matches
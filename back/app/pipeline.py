@@ -0,0 +1,307 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.modal_substitution.generator import get_substitution_info, get_substitutions
+from app.pattern_detection.identifier import detect_patterns
+from app.schema import ChordItem
+from app.secondary_dominant.generator import get_secondary_dominant_for_target
+from app.tritone_substitution.generator import get_tritone_substitute
+from app.utils.borrowed_modes import get_borrowed_chords
+from app.utils.chords_analyzer import QualityAnalysisItem
+from app.utils.common import (
+    Chord,
+    ChordLike,
+    chord_name_of,
+    get_note_from_index,
+    get_note_index,
+)
+from app.utils.deadline import Deadline, DeadlineExceeded
+from app.utils.metrics import StageTimer
+from app.utils.mode_detection_gemini import detect_tonic_and_mode
+from app.utils.modes import MODE_REGISTRY, get_mode_registry
+from app.utils.progression_kernel import analyze_progression, detect_tonic_and_mode_locally
+from app.utils.repetition import compress_progression, expand_segments
+from constants import MAJOR_MODES_DATA
+
+# Détection de la tonalité : Gemini, ou ajustement diatonique hors ligne
+DETECTORS = ("gemini", "local")
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Sections de la réponse de /analyze, dans l'ordre où elles sont calculées.
+ANALYSIS_SECTIONS = [
+    "quality_analysis",
+    "harmonic_patterns",
+    "borrowed_chords",
+    "major_modes_substitutions",
+    "harmonized_chords",
+    "secondary_dominants",
+    "tritone_substitutions",
+]
+
+
+class AnalysisMemo:
+    """
+    Mémoïsation, le temps d'une requête, des substitutions déjà calculées.
+
+    Les morceaux complets répètent leurs couplets et refrains : chaque segment répété
+    n'est harmonisé qu'une fois par mode. Les résultats sont copiés car ils sont
+    enrichis ensuite (renversement, durée).
+    """
+
+    def __init__(self) -> None:
+        self._substitutions: Dict[Tuple[Any, ...], List[dict]] = {}
+
+    def substitute(
+        self,
+        progression: List[ChordLike],
+        tonic_index: int,
+        sub_info: List[Optional[Dict[str, Any]]],
+        mode_name: str,
+    ) -> List[dict]:
+        key = (
+            tuple(progression),
+            tonic_index,
+            tuple(
+                None if info is None else (info["degree"], info["is_triad"]) for info in sub_info
+            ),
+            mode_name,
+        )
+        if key not in self._substitutions:
+            self._substitutions[key] = get_substitutions(
+                progression, tonic_index, sub_info, mode_name
+            )
+        return [item.copy() for item in self._substitutions[key]]
+
+
+def analyze_progression_segments(
+    progression: List[ChordLike], harmonic_segments: List[Dict[str, Any]]
+) -> List[QualityAnalysisItem]:
+    """
+    Analyse chaque accord de la progression en utilisant le contexte
+    tonal de son segment harmonique assigné.
+
+    Les contextes sont d'abord résolus pour chaque accord, puis toute la progression
+    est analysée en un seul passage vectorisé (voir `progression_kernel`).
+    """
+    size = len(progression)
+    tonics: List[Optional[int]] = [None] * size
+    modes: List[Optional[str]] = [None] * size
+    contexts: List[Optional[Dict[str, Any]]] = [None] * size
+
+    for segment in harmonic_segments:
+        segment_tonic_index = get_note_index(segment["tonic"])
+        # Contexte du segment, ajouté à chaque accord pour référence future
+        context = {
+            "tonic": segment["tonic"],
+            "mode": segment["mode"],
+            "explanation": segment["explanation"],
+        }
+        for i in range(segment["start_index"], min(segment["end_index"] + 1, size)):
+            tonics[i] = segment_tonic_index
+            modes[i] = segment["mode"]
+            contexts[i] = context
+
+    # S'assure qu'il n'y a pas de trou si l'IA a manqué un accord
+    # (ceci est une sécurité) : contexte du premier segment par défaut
+    fallback_tonic_index = get_note_index(harmonic_segments[0]["tonic"])
+    fallback_mode = harmonic_segments[0]["mode"]
+    final_analysis = analyze_progression(
+        progression,
+        [fallback_tonic_index if tonic is None else tonic for tonic in tonics],
+        [mode or fallback_mode for mode in modes],
+    )
+
+    for analyzed_chord, segment_context in zip(final_analysis, contexts):
+        if segment_context is not None:
+            analyzed_chord["segment_context"] = dict(segment_context)
+
+    return final_analysis
+
+
+def detect_key(
+    progression: List[str], detector: str = "gemini", model: str = DEFAULT_MODEL
+) -> Dict[str, Any]:
+    """
+    Tonalité et segments harmoniques d'une progression, hors de /analyze (traitement
+    par lots, import de grilles). Comme /analyze, seul le matériau unique (sans les
+    sections répétées) est envoyé à Gemini.
+    """
+    if detector == "local":
+        return detect_tonic_and_mode_locally(progression)
+    if detector != "gemini":
+        raise ValueError(f"Détecteur '{detector}' inconnu ({', '.join(DETECTORS)}).")
+    compressed = compress_progression(progression)
+    analysis_result = detect_tonic_and_mode(compressed.unique, model)
+    analysis_result["harmonic_segments"] = expand_segments(
+        analysis_result["harmonic_segments"], compressed.source_index
+    )
+    return analysis_result
+
+
+def build_progression_analysis(
+    progression_data: List[ChordItem],
+    analysis_result: Dict[str, Any],
+    deadline: Optional[Deadline] = None,
+    timer: Optional[StageTimer] = None,
+    registered_modes: bool = False,
+) -> Dict[str, Any]:
+    """
+    Construit la réponse complète de /analyze à partir de la détection de tonalité.
+
+    Les sections sont calculées dans l'ordre de `ANALYSIS_SECTIONS`. Si l'échéance
+    est dépassée en cours de route, seules les sections déjà terminées sont renvoyées
+    et la réponse est marquée `partial`. Une annulation (AnalysisCancelled) est propagée.
+    La durée de chaque étape est relevée par `timer` (pour l'en-tête Server-Timing).
+    L'harmonisation et la recherche des emprunts se limitent aux modes intégrés
+    (MODES_DATA), sauf `registered_modes` qui y ajoute les gammes enregistrées.
+    """
+    deadline = deadline or Deadline()
+    timer = timer or StageTimer(None)
+    memo = AnalysisMemo()
+    # Modes d'harmonisation et d'emprunt
+    mode_registry = get_mode_registry() if registered_modes else MODE_REGISTRY
+    # Chaque accord est analysé une seule fois, puis transmis tel quel à toutes les étapes
+    progression: List[ChordLike] = [
+        Chord.from_item(item) or f"{item.root}{item.quality}" for item in progression_data
+    ]
+
+    global_analysis = analysis_result["global_analysis"]
+    harmonic_segments = analysis_result["harmonic_segments"]
+
+    global_tonic = global_analysis["tonic"]
+    global_mode = global_analysis["mode"]
+
+    result: Dict[str, Any] = {
+        "tonic": global_tonic,
+        "mode": global_mode,
+        "explanations": global_analysis["explanation"],
+    }
+
+    try:
+        timer.restart()
+        # 1. Analyser la progression en utilisant les segments
+        deadline.check()
+        quality_analysis: List[QualityAnalysisItem] = analyze_progression_segments(
+            progression, harmonic_segments
+        )
+
+        # Ajout des propriétés originales aux résultats d'analyse
+        for i, analyzed_chord in enumerate(quality_analysis):
+            analyzed_chord["inversion"] = progression_data[i].inversion
+            analyzed_chord["duration"] = progression_data[i].duration
+        result["quality_analysis"] = quality_analysis
+        timer.lap("segment_analysis")
+
+        # Cadences et enchaînements connus (ii-V-I, backdoor, turnarounds...)
+        deadline.check()
+        result["harmonic_patterns"] = detect_patterns(quality_analysis, global_tonic)
+        timer.lap("harmonic_patterns")
+
+        deadline.check()
+        result["borrowed_chords"] = get_borrowed_chords(
+            quality_analysis, global_mode, mode_registry
+        )
+        timer.lap("borrowed_chords")
+
+        detected_tonic_index: int = get_note_index(global_tonic)
+        degrees_to_borrow: List[Dict[str, Any] | None] = get_substitution_info(quality_analysis)
+
+        substitutions: Dict[str, Dict[str, Any]] = {}
+        for mode_name, (_, _, interval) in MAJOR_MODES_DATA.items():
+            deadline.check()
+            relative_tonic_index = (detected_tonic_index + interval + 12) % 12
+            new_progression = get_substitutions(
+                progression,
+                relative_tonic_index,
+                degrees_to_borrow,
+            )
+            for index, item in enumerate(new_progression):
+                chord_data = progression_data[index]
+                item["inversion"] = chord_data.inversion
+                item["duration"] = chord_data.duration
+            substitutions[mode_name] = {
+                "borrowed_scale": f"{get_note_from_index(relative_tonic_index)} Major",
+                "substitution": new_progression,
+            }
+        result["major_modes_substitutions"] = substitutions
+        timer.lap("major_modes_substitutions")
+
+        # Index -> segment, pour éviter de reparcourir les segments à chaque accord
+        segment_by_index: List[Optional[Dict[str, Any]]] = [None] * len(progression)
+        for segment in harmonic_segments:
+            for i in range(segment["start_index"], min(segment["end_index"] + 1, len(progression))):
+                segment_by_index[i] = segment_by_index[i] or segment
+
+        # Harmonize all existing modes
+        # Les progressions harmonisées de tous les modes de sept notes du registre sont
+        # analysées en un seul lot
+        batch_chords: List[ChordLike] = []
+        batch_tonics: List[int] = []
+        batch_modes: List[str] = []
+        for target_mode_name in mode_registry.heptatonic_names:
+            deadline.check()
+            new_progression_items = []
+
+            # 1. SUBSTITUTION SEGMENT PAR SEGMENT
+            for segment in harmonic_segments:
+                segment_start = segment["start_index"]
+                segment_end = segment["end_index"]
+
+                segment_tonic_index = get_note_index(segment["tonic"])
+                segment_progression = progression[segment_start : segment_end + 1]
+                segment_sub_info = degrees_to_borrow[segment_start : segment_end + 1]
+
+                substituted_segment = memo.substitute(
+                    segment_progression,
+                    segment_tonic_index,
+                    segment_sub_info,
+                    target_mode_name,
+                )
+                new_progression_items.extend(substituted_segment)
+
+            # 2. CONTEXTE DE LA NOUVELLE PROGRESSION
+            for i, item in enumerate(new_progression_items):
+                current_segment = (
+                    segment_by_index[i] if i < len(segment_by_index) else None
+                ) or harmonic_segments[0]
+                batch_chords.append(item["chord"])
+                batch_tonics.append(get_note_index(current_segment["tonic"]))
+                batch_modes.append(target_mode_name)
+
+        # 3. ANALYSE DE TOUTES LES PROGRESSIONS HARMONISÉES
+        deadline.check()
+        batch_analysis = analyze_progression(batch_chords, batch_tonics, batch_modes)
+        harmonized_chords: Dict[str, List[QualityAnalysisItem]] = {}
+        for analyzed_chord, mode_name in zip(batch_analysis, batch_modes):
+            harmonized_chords.setdefault(mode_name, []).append(analyzed_chord)
+        result["harmonized_chords"] = harmonized_chords
+        timer.lap("harmonization")
+
+        # Get all secondary dominants for all major modes
+        secondary_dominants: Dict[str, List[Tuple[str, str, Dict[str, Any]]]] = {}
+        for mode_name, substitutions_data in substitutions.items():
+            deadline.check()
+            secondary_dominants[mode_name] = []
+            targets: Dict[str, Tuple[str, Any]] = {}
+            for item in substitutions_data["substitution"]:
+                if item["chord"] not in targets:
+                    targets[item["chord"]] = get_secondary_dominant_for_target(
+                        item["chord"], global_tonic, mode_name
+                    )
+                secondary_dominant, analysis = targets[item["chord"]]
+                secondary_dominants[mode_name].append((secondary_dominant, item["chord"], analysis))
+        result["secondary_dominants"] = secondary_dominants
+        timer.lap("secondary_dominants")
+
+        deadline.check()
+        tritone_by_chord = {chord: get_tritone_substitute(chord) for chord in set(progression)}
+        tritone_substitutions: List[List[Any]] = []
+        for chord in progression:
+            substitute, analysis = tritone_by_chord[chord]
+            tritone_substitutions.append([chord_name_of(chord), substitute, analysis])
+        result["tritone_substitutions"] = tritone_substitutions
+        timer.lap("tritone_substitutions")
+    except DeadlineExceeded:
+        result["partial"] = True
+        result["missing_sections"] = [s for s in ANALYSIS_SECTIONS if s not in result]
+
+    return result
@@ -0,0 +1,292 @@
+from itertools import islice
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple, TypedDict
+
+from app.markov_generation.generator import CADENCE_ENDINGS
+from app.utils.common import as_chord, get_note_index
+from app.utils.modes import get_mode_registry
+from app.utils.progression_kernel import degree_numeral, expected_chord_name
+from app.utils.qualities import QUALITY_BY_NAME, QUALITY_IDS
+
+MAX_LENGTH = 12
+MAX_PAGE_SIZE = 500
+
+
+class ChordCandidate(NamedTuple):
+    """Accord qu'une position de la progression peut recevoir."""
+
+    chord: str  # Nom de l'accord (ex: "Dm7", "Ab")
+    numeral: str  # Chiffrage dans la tonalité d'origine (ex: "ii7", "bVI")
+    degree: int  # Degré dans son mode (1-7), utilisé par les cadences
+    mode: str  # Mode d'où vient l'accord
+    borrowed: bool  # Emprunté à un autre mode que celui de la tonalité
+
+
+class EnumerationConstraints(NamedTuple):
+    """Contraintes strictes que doit respecter chaque progression énumérée."""
+
+    length: int = 4
+    start_on_tonic: bool = False
+    cadence: Optional[str] = None  # Voir CADENCE_ENDINGS (ex: "authentic" : V-I)
+    borrow_modes: Tuple[str, ...] = ()  # Modes parallèles où emprunter des accords
+    min_borrowed: int = 0  # Nombre minimal d'accords empruntés
+    distinct: bool = True  # Jamais deux fois le même accord
+    triads: bool = True  # Accords de trois sons permis
+    sevenths: bool = True  # Accords de 7e permis
+
+
+class EnumeratedProgression(TypedDict):
+    numerals: List[str]
+    chords: List[str]
+    borrowed: List[bool]
+
+
+class ProgressionPage(TypedDict):
+    progressions: List[EnumeratedProgression]
+    next_cursor: Optional[List[int]]  # None : plus aucune progression
+
+
+def chord_candidates(
+    tonic: str, mode_name: str, constraints: EnumerationConstraints
+) -> List[ChordCandidate]:
+    """
+    Accords possibles : triades et 7e de chaque degré du mode (tables de `MODES_DATA`),
+    puis ceux des modes d'emprunt qui ne sont pas diatoniques à la tonalité.
+    """
+    registry = get_mode_registry()
+    tonic_index = get_note_index(tonic)
+    mode_ids = []
+    for name in (mode_name, *constraints.borrow_modes):
+        mode_id = registry.resolve(name)
+        if mode_id is None:
+            raise ValueError(f"Mode '{name}' not found.")
+        mode_ids.append(mode_id)
+    scale_mask = registry.scale_masks_by_tonic[tonic_index][mode_ids[0]]
+
+    candidates: List[ChordCandidate] = []
+    seen = set()
+    for position, mode_id in enumerate(mode_ids):
+        borrowed = position > 0
+        for degree, (interval, quality) in enumerate(
+            zip(registry.intervals[mode_id], registry.qualities[mode_id]), start=1
+        ):
+            qualities = []
+            if constraints.triads:
+                qualities.append(QUALITY_BY_NAME[quality].triad)
+            if constraints.sevenths:
+                qualities.append(quality)
+            for name in qualities:
+                quality_id = QUALITY_IDS[name]
+                chord = expected_chord_name(tonic_index, interval, quality_id)
+                parsed = as_chord(chord)
+                if chord in seen or parsed is None:
+                    continue
+                # Un accord "emprunté" dont toutes les notes sont dans la gamme n'en est pas un
+                if borrowed and parsed.mask & ~scale_mask == 0:
+                    continue
+                seen.add(chord)
+                candidates.append(
+                    ChordCandidate(
+                        chord,
+                        degree_numeral(interval, quality_id),
+                        degree,
+                        registry.names[mode_id],
+                        borrowed,
+                    )
+                )
+    return candidates
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """Indices des bits à 1, par ordre croissant."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def _propagate(
+    domains: List[int], depth: int, used: int, needed: int, borrowed_mask: int, distinct: bool
+) -> Optional[List[int]]:
+    """
+    Réduit les domaines des positions libres (à partir de `depth`). Renvoie None dès
+    qu'une contrainte ne peut plus être satisfaite.
+
+    - `distinct` : les accords déjà placés (`used`) et ceux imposés à une position
+      (domaine réduit à un seul accord) sont retirés des autres domaines, jusqu'à
+      stabilité ; il faut en outre au moins autant d'accords que de positions libres.
+    - emprunts : il reste au moins `needed` positions pouvant recevoir un accord emprunté.
+    """
+    if distinct:
+        changed = True
+        while changed:
+            changed = False
+            forced = 0
+            for domain in domains[depth:]:
+                if domain & (domain - 1) == 0:
+                    if domain & (forced | used):
+                        return None
+                    forced |= domain
+            excluded = used | forced
+            for position in range(depth, len(domains)):
+                domain = domains[position]
+                if domain & (domain - 1) == 0:
+                    continue
+                reduced = domain & ~excluded
+                if not reduced:
+                    return None
+                if reduced != domain:
+                    domains[position] = reduced
+                    changed = True
+        union = 0
+        for domain in domains[depth:]:
+            union |= domain
+        if union.bit_count() < len(domains) - depth:
+            return None
+    if needed > sum(1 for domain in domains[depth:] if domain & borrowed_mask):
+        return None
+    return domains
+
+
+def _initial_domains(
+    candidates: Sequence[ChordCandidate], constraints: EnumerationConstraints
+) -> List[int]:
+    """
+    Domaine de chaque position (bit i = candidat i), contraintes de position appliquées.
+    Les degrés imposés valent aussi pour les emprunts (ex: cadence plagale mineure iv-I).
+    """
+    length = constraints.length
+
+    def by_degree(degree: int) -> int:
+        return sum(1 << i for i, candidate in enumerate(candidates) if candidate.degree == degree)
+
+    domains = [(1 << len(candidates)) - 1] * length
+    if constraints.start_on_tonic:
+        domains[0] &= by_degree(1)
+    if constraints.cadence is not None:
+        if constraints.cadence not in CADENCE_ENDINGS:
+            raise ValueError(f"Cadence '{constraints.cadence}' inconnue.")
+        ending = CADENCE_ENDINGS[constraints.cadence]
+        if len(ending) > length:
+            raise ValueError("La progression est trop courte pour cette cadence.")
+        for offset, degree in enumerate(ending):
+            domains[length - len(ending) + offset] &= by_degree(degree)
+    return domains
+
+
+def iter_solutions(
+    candidates: Sequence[ChordCandidate],
+    constraints: EnumerationConstraints,
+    after: Optional[Sequence[int]] = None,
+) -> Iterator[Tuple[int, ...]]:
+    """
+    Énumère paresseusement les progressions (indices dans `candidates`) par
+    backtracking, dans l'ordre lexicographique des indices. Chaque choix est suivi
+    d'une propagation des contraintes qui élague les branches sans solution.
+
+    `after` reprend l'énumération juste après cette solution (pagination sans
+    réexplorer les solutions déjà renvoyées).
+    """
+    length = constraints.length
+    if not 1 <= length <= MAX_LENGTH:
+        raise ValueError(f"La longueur doit être comprise entre 1 et {MAX_LENGTH}.")
+    if constraints.min_borrowed < 0:
+        raise ValueError("Le nombre minimal d'emprunts ne peut pas être négatif.")
+    if after is not None and (
+        len(after) != length or not all(0 <= index < len(candidates) for index in after)
+    ):
+        raise ValueError("Curseur invalide pour ces contraintes.")
+    borrowed_mask = sum(1 << i for i, candidate in enumerate(candidates) if candidate.borrowed)
+    distinct = constraints.distinct
+
+    domains = _propagate(
+        _initial_domains(candidates, constraints),
+        0,
+        0,
+        constraints.min_borrowed,
+        borrowed_mask,
+        distinct,
+    )
+    if domains is None:
+        return
+    path: List[int] = []
+
+    def search(
+        depth: int, domains: List[int], used: int, needed: int, tight: bool
+    ) -> Iterator[Tuple[int, ...]]:
+        if depth == length:
+            yield tuple(path)
+            return
+        for index in _bits(domains[depth]):
+            # Tant que le préfixe est celui du curseur, on saute ce qui le précède
+            still_tight = False
+            if tight and after is not None:
+                if index < after[depth] or (index == after[depth] and depth == length - 1):
+                    continue
+                still_tight = index == after[depth]
+            bit = 1 << index
+            child = list(domains)
+            child[depth] = bit
+            child_needed = needed - 1 if bit & borrowed_mask else needed
+            reduced = _propagate(
+                child,
+                depth + 1,
+                used | bit if distinct else 0,
+                child_needed,
+                borrowed_mask,
+                distinct,
+            )
+            if reduced is None:
+                continue
+            path.append(index)
+            yield from search(depth + 1, reduced, used | bit, child_needed, still_tight)
+            path.pop()
+
+    yield from search(0, domains, 0, constraints.min_borrowed, after is not None)
+
+
+def _serialize(
+    candidates: Sequence[ChordCandidate], solution: Sequence[int]
+) -> EnumeratedProgression:
+    chosen = [candidates[index] for index in solution]
+    return {
+        "numerals": [candidate.numeral for candidate in chosen],
+        "chords": [candidate.chord for candidate in chosen],
+        "borrowed": [candidate.borrowed for candidate in chosen],
+    }
+
+
+def enumerate_progressions(
+    tonic: str,
+    mode_name: str,
+    constraints: EnumerationConstraints,
+    after: Optional[Sequence[int]] = None,
+) -> Iterator[EnumeratedProgression]:
+    """
+    Toutes les progressions de la tonalité qui respectent les contraintes, produites
+    une à une : l'espace des solutions n'est jamais construit en mémoire.
+    """
+    candidates = chord_candidates(tonic, mode_name, constraints)
+    for solution in iter_solutions(candidates, constraints, after):
+        yield _serialize(candidates, solution)
+
+
+def enumerate_page(
+    tonic: str,
+    mode_name: str,
+    constraints: EnumerationConstraints,
+    cursor: Optional[Sequence[int]] = None,
+    limit: int = 100,
+) -> ProgressionPage:
+    """
+    Une page d'au plus `limit` progressions (plafonné à MAX_PAGE_SIZE). `next_cursor`
+    se passe tel quel à l'appel suivant pour obtenir la page d'après.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"La taille de page doit être comprise entre 1 et {MAX_PAGE_SIZE}.")
+    candidates = chord_candidates(tonic, mode_name, constraints)
+    solutions = list(islice(iter_solutions(candidates, constraints, cursor), limit + 1))
+    next_cursor = list(solutions[limit - 1]) if len(solutions) > limit else None
+    return {
+        "progressions": [_serialize(candidates, solution) for solution in solutions[:limit]],
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,236 @@
+import heapq
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    NotRequired,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+)
+
+from app.modal_substitution.generator import get_diatonic_triad_chord, get_substitution_info
+from app.tritone_substitution.generator import get_tritone_substitute
+from app.utils.common import (
+    Chord,
+    ChordLike,
+    as_chord,
+    chord_name_of,
+    get_diatonic_7th_chord,
+    get_note_from_index,
+    get_note_index,
+    is_dominant_chord,
+)
+from app.utils.modes import get_mode_registry
+from app.utils.progression_kernel import analyze_progression
+
+# Coût de base des candidats qui ne viennent pas d'un mode parallèle
+TRITONE_SUBSTITUTION_COST = 1.5
+SECONDARY_DOMINANT_COST = 1.0
+
+# Coût d'un mouvement de fondamentale, selon l'intervalle ascendant (en demi-tons) :
+# enchaînement par quintes descendantes privilégié, triton et accord répété pénalisés.
+ROOT_MOTION_COSTS = (0.5, 0.5, 0.5, 0.75, 0.75, 0.0, 1.0, 0.25, 0.75, 0.75, 0.5, 0.5)
+
+
+class Candidate(NamedTuple):
+    """Accord proposé à une position de la progression."""
+
+    chord: Chord
+    source: str  # "original", "mode:<nom>", "tritone" ou "secondary_dominant"
+    cost: float  # Coût propre de l'accord (distance d'emprunt)
+
+
+class CostWeights(NamedTuple):
+    root_motion: float = 1.0
+    common_tones: float = 1.0
+    borrowing: float = 1.0
+
+
+# Coût d'enchaînement entre deux candidats consécutifs
+TransitionCost = Callable[[Candidate, Candidate], float]
+
+# Chemin partagé entre états de la recherche : (index du candidat, chemin précédent)
+_Path = Optional[Tuple[int, Any]]
+
+
+class ReharmonizedChord(TypedDict):
+    chord: str
+    source: str
+    found_numeral: Optional[str]
+    inversion: NotRequired[int]
+    duration: NotRequired[int]
+
+
+class Reharmonization(TypedDict):
+    cost: float
+    chords: List[ReharmonizedChord]
+
+
+def make_transition_cost(weights: CostWeights = CostWeights()) -> TransitionCost:
+    """Coût par défaut : mouvement de fondamentale et notes communes."""
+
+    def transition_cost(previous: Candidate, current: Candidate) -> float:
+        motion = ROOT_MOTION_COSTS[(current.chord.root - previous.chord.root) % 12]
+        smallest = min(bin(previous.chord.mask).count("1"), bin(current.chord.mask).count("1"))
+        common = bin(previous.chord.mask & current.chord.mask).count("1")
+        return weights.root_motion * motion + weights.common_tones * (
+            1 - common / smallest if smallest else 1
+        )
+
+    return transition_cost
+
+
+def build_candidates(
+    progression: Sequence[ChordLike],
+    tonic: str,
+    mode_name: str,
+    weights: CostWeights = CostWeights(),
+) -> List[List[Candidate]]:
+    """
+    Candidats de chaque position : l'accord d'origine, l'accord du même degré dans
+    chaque mode de sept notes sur la même tonique (emprunt), le substitut tritonique
+    des dominantes et la dominante secondaire de l'accord suivant.
+
+    Un même accord n'est proposé qu'une fois par position, avec son coût le plus bas.
+    """
+    registry = get_mode_registry()
+    tonic_index = get_note_index(tonic)
+    home_mask = registry.scale_masks_by_tonic[tonic_index][registry.ids[mode_name]]
+    chords = [as_chord(chord) for chord in progression]
+    sub_info = get_substitution_info(analyze_progression(progression, tonic_index, mode_name))
+
+    # Distance d'emprunt : nombre de notes de la gamme modifiées par rapport au mode d'origine
+    borrowing_costs = {
+        name: weights.borrowing
+        * bin(registry.scale_masks_by_tonic[tonic_index][mode_id] ^ home_mask).count("1")
+        / 2
+        for name, mode_id in ((name, registry.ids[name]) for name in registry.heptatonic_names)
+    }
+
+    lattice: List[List[Candidate]] = []
+    for index, chord in enumerate(chords):
+        options: Dict[str, Candidate] = {}
+
+        def propose(name: Optional[str], source: str, cost: float) -> None:
+            candidate = as_chord(name) if name else None
+            if candidate is None or not candidate.mask:
+                return
+            known = options.get(candidate.name)
+            if known is None or cost < known.cost:
+                options[candidate.name] = Candidate(candidate, source, cost)
+
+        if chord is not None:
+            propose(chord.name, "original", 0.0)
+        info = sub_info[index]
+        if info is not None:
+            for target_mode, cost in borrowing_costs.items():
+                if info["is_triad"]:
+                    name = get_diatonic_triad_chord(info["degree"], tonic_index, target_mode)
+                else:
+                    name = get_diatonic_7th_chord(info["degree"], tonic_index, target_mode)
+                propose(name, f"mode:{target_mode}", cost)
+        if chord is not None and is_dominant_chord(chord):
+            substitute, _ = get_tritone_substitute(chord)
+            propose(substitute, "tritone", TRITONE_SUBSTITUTION_COST)
+        following = chords[index + 1] if index + 1 < len(chords) else None
+        if following is not None:
+            dominant = f"{get_note_from_index(following.root + 7)}7"
+            propose(dominant, "secondary_dominant", SECONDARY_DOMINANT_COST)
+
+        if not options:
+            raise ValueError(f"Accord non reconnu : '{chord_name_of(progression[index])}'")
+        lattice.append(list(options.values()))
+    return lattice
+
+
+def search_lattice(
+    lattice: Sequence[Sequence[Candidate]],
+    transition_cost: TransitionCost,
+    top_k: int = 5,
+    beam_width: Optional[int] = 256,
+) -> List[Tuple[float, List[int]]]:
+    """
+    Recherche en faisceau des `top_k` chemins de coût minimal dans le treillis.
+
+    Le coût ne dépend que de l'accord précédent : à chaque position, seuls les `top_k`
+    meilleurs chemins aboutissant à chaque candidat peuvent encore mener au résultat,
+    le reste est écarté. `beam_width` borne en plus le nombre total de chemins gardés
+    (None : recherche exacte, en O(n · k · c²) pour c candidats par position).
+    """
+    if not lattice:
+        return []
+    # Les chemins sont partagés entre états : rien n'est recopié
+    beam: List[Tuple[float, int, _Path]] = [
+        (candidate.cost, index, (index, None)) for index, candidate in enumerate(lattice[0])
+    ]
+
+    for previous_options, options in zip(lattice, lattice[1:]):
+        costs = [
+            [transition_cost(previous, current) + current.cost for current in options]
+            for previous in previous_options
+        ]
+        by_candidate: List[List[Tuple[float, int, _Path]]] = [[] for _ in options]
+        for cost, last, path in beam:
+            for index, step_cost in enumerate(costs[last]):
+                by_candidate[index].append((cost + step_cost, index, (index, path)))
+        beam = [
+            state
+            for states in by_candidate
+            for state in heapq.nsmallest(top_k, states, key=lambda state: state[0])
+        ]
+        if beam_width is not None and len(beam) > beam_width:
+            beam = heapq.nsmallest(beam_width, beam, key=lambda state: state[0])
+
+    results: List[Tuple[float, List[int]]] = []
+    for cost, _, path in heapq.nsmallest(top_k, beam, key=lambda state: state[0]):
+        indexes: List[int] = []
+        while path is not None:
+            indexes.append(path[0])
+            path = path[1]
+        results.append((round(cost, 6), indexes[::-1]))
+    return results
+
+
+def reharmonize(
+    progression: Sequence[ChordLike],
+    tonic: str,
+    mode_name: str,
+    top_k: int = 5,
+    beam_width: Optional[int] = 256,
+    weights: CostWeights = CostWeights(),
+    transition_cost: Optional[TransitionCost] = None,
+) -> List[Reharmonization]:
+    """
+    Propose les `top_k` réharmonisations complètes de moindre coût, en mélangeant
+    emprunts à tous les modes, substituts tritoniques et dominantes secondaires.
+    Lève ValueError si la tonique, le mode ou un accord n'est pas reconnu.
+    """
+    if get_mode_registry().ids.get(mode_name) is None:
+        raise ValueError(f"Mode '{mode_name}' not found.")
+    lattice = build_candidates(progression, tonic, mode_name, weights)
+    cost_function = transition_cost or make_transition_cost(weights)
+
+    reharmonizations: List[Reharmonization] = []
+    for cost, indexes in search_lattice(lattice, cost_function, top_k, beam_width):
+        chosen = [lattice[position][index] for position, index in enumerate(indexes)]
+        analysis = analyze_progression(
+            [candidate.chord for candidate in chosen], get_note_index(tonic), mode_name
+        )
+        reharmonizations.append(
+            {
+                "cost": cost,
+                "chords": [
+                    {
+                        "chord": candidate.chord.name,
+                        "source": candidate.source,
+                        "found_numeral": analyzed["found_numeral"],
+                    }
+                    for candidate, analyzed in zip(chosen, analysis)
+                ],
+            }
+        )
+    return reharmonizations
@@ -0,0 +1,94 @@
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, TypedDict
+
+import numpy as np
+
+from app.chord_identification.identifier import pitch_set_of
+from app.utils.common import get_note_from_index
+from app.utils.modes import ModeRegistry, get_mode_registry
+
+# Pénalités du classement (plus le score est bas, meilleur est l'ajustement)
+UNPLAYED_NOTE_PENALTY = 10  # Note de la gamme absente des notes jouées
+UNPLAYED_TONIC_PENALTY = 5  # Tonique de la gamme absente des notes jouées
+
+_PITCH_SETS = 1 << 12
+_POPCOUNT = np.array([bin(mask).count("1") for mask in range(_PITCH_SETS)], dtype=np.int16)
+
+
+class ScaleIdentification(TypedDict):
+    tonic: str
+    mode: str
+    score: int
+    scale_notes: List[str]
+    unplayed_notes: List[str]
+
+
+@lru_cache(maxsize=4)
+def _context_index(registry: ModeRegistry) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Masque et tonique de chaque contexte (tonique, mode) d'un registre. Un contexte
+    est numéroté `tonique * nombre de modes + mode`.
+    """
+    masks = registry.context_mask_table.reshape(-1)
+    tonics = np.repeat(np.arange(12, dtype=np.int32), len(registry))
+    return masks, tonics
+
+
+@lru_cache(maxsize=8192)
+def _ranked_contexts(registry: ModeRegistry, pitch_set: int) -> Tuple[Tuple[int, int], ...]:
+    """
+    Contextes qui contiennent un ensemble de notes, du plus serré au plus lâche, avec
+    leur score. Calculé une fois par ensemble de notes (4096 au plus) et par registre.
+    """
+    masks, tonics = _context_index(registry)
+    candidates = np.flatnonzero((pitch_set & ~masks) == 0)
+    scores = UNPLAYED_NOTE_PENALTY * _POPCOUNT[
+        masks[candidates] & ~pitch_set
+    ] + UNPLAYED_TONIC_PENALTY * ((pitch_set >> tonics[candidates]) & 1 == 0)
+    # Tri stable : à score égal, l'ordre des toniques puis du registre est conservé
+    order = np.argsort(scores, kind="stable")
+    return tuple(zip(candidates[order].tolist(), scores[order].tolist()))
+
+
+def _note_names(mask: int) -> List[str]:
+    return [get_note_from_index(note) for note in range(12) if mask >> note & 1]
+
+
+def identify_scales(
+    notes: Iterable[int], tonic: Optional[int] = None, limit: Optional[int] = None
+) -> List[ScaleIdentification]:
+    """
+    Renvoie toutes les gammes (tonique, mode du registre) qui contiennent les notes
+    jouées, de la plus serrée à la plus lâche.
+
+    Les notes sont des classes de hauteur (0-11) ou des notes MIDI. Une tonique
+    supposée, si elle est donnée, fait passer ses gammes en premier. Le classement
+    est mis en cache par ensemble de notes : il peut être redemandé à chaque note.
+    """
+    pitch_set = pitch_set_of(notes)
+    registry = get_mode_registry()
+    mode_count = len(registry)
+    rows = list(_ranked_contexts(registry, pitch_set))
+    if tonic is not None:
+        # Tri stable : le classement est conservé à l'intérieur des deux groupes
+        rows.sort(key=lambda row: row[0] // mode_count != tonic % 12)
+    if limit is not None:
+        rows = rows[:limit]
+
+    matches: List[ScaleIdentification] = []
+    for context, score in rows:
+        scale_tonic, mode_id = divmod(context, mode_count)
+        scale_mask = registry.scale_masks_by_tonic[scale_tonic][mode_id]
+        matches.append(
+            {
+                "tonic": get_note_from_index(scale_tonic),
+                "mode": registry.names[mode_id],
+                "score": score,
+                "scale_notes": [
+                    get_note_from_index(scale_tonic + interval)
+                    for interval in registry.intervals[mode_id]
+                ],
+                "unplayed_notes": _note_names(scale_mask & ~pitch_set),
+            }
+        )
+    return matches
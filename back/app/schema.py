@@ -1,6 +1,8 @@
-from typing import List
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.chord_identification.identifier import MAX_MATCHES
 
 
 class ChordItem(BaseModel):
@@ -14,3 +16,138 @@ class ChordItem(BaseModel):
 class ProgressionRequest(BaseModel):
     chordsData: List[ChordItem]
     model: str
+    # Délai maximal en secondes, strictement positif (défaut: ANALYZE_TIMEOUT_SECONDS)
+    timeout: Optional[float] = Field(None, gt=0)
+    # Harmonise aussi dans les gammes ajoutées (POST /scales), pas seulement MODES_DATA
+    registered_modes: bool = False
+
+
+class KeyFitRequest(BaseModel):
+    chordsData: List[ChordItem]
+
+
+class ChordIdentificationRequest(BaseModel):
+    notes: List[int]  # Classes de hauteur (0-11) ou notes MIDI
+    bass: Optional[int] = None  # Note de basse, pour reconnaître les renversements
+    limit: int = Field(5, ge=1, le=MAX_MATCHES)
+
+
+class ScaleIdentificationRequest(BaseModel):
+    notes: List[int]  # Classes de hauteur (0-11) ou notes MIDI
+    tonic: Optional[int] = None  # Tonique supposée (classe de hauteur), classée en premier
+    limit: Optional[int] = Field(None, ge=1)
+
+
+class NumeralRealizationRequest(BaseModel):
+    template: str | List[str]  # ex: "ii7–V7–Imaj7" ou ["ii7", "V7", "Imaj7"]
+    tonics: Optional[List[str]] = None  # Toutes les toniques par défaut
+    modes: Optional[List[str]] = None  # Tous les modes par défaut
+
+
+class ScaleDefinition(BaseModel):
+    name: str
+    intervals: List[int]  # Demi-tons depuis la tonique, croissants, en commençant par 0
+    qualities: Optional[List[str]] = None  # Qualités de 7e par degré (dérivées si absentes)
+
+
+class ScaleRegistrationRequest(BaseModel):
+    scales: List[ScaleDefinition]
+
+
+class ReharmonizationRequest(BaseModel):
+    chordsData: List[ChordItem]
+    tonic: str
+    mode: str
+    top_k: int = 5
+    beam_width: Optional[int] = 256  # None : recherche exacte
+    root_motion_weight: float = 1.0
+    common_tones_weight: float = 1.0
+    borrowing_weight: float = 1.0
+
+
+class VoiceLeadingRequest(BaseModel):
+    chordsData: List[ChordItem]
+    # Autres progressions à traiter (ex: les `harmonized_chords` de /analyze)
+    variants: Optional[Dict[str, List[str]]] = None
+    low: str = "C3"  # Note la plus grave autorisée
+    high: str = "C6"  # Note la plus aiguë autorisée
+
+
+class SubstitutesRequest(BaseModel):
+    chord: str
+    tonic: Optional[str] = None  # Limite les emprunts à cette tonalité
+    kinds: Optional[List[str]] = None  # Relations retenues (substitutions par défaut)
+
+
+class SubstitutionChainRequest(BaseModel):
+    source: str
+    target: str
+    tonic: Optional[str] = None
+    kinds: Optional[List[str]] = None  # Toutes les relations par défaut
+
+
+class ApproachesRequest(BaseModel):
+    target: str
+    steps: int = 2
+    kinds: Optional[List[str]] = None  # Préparations par défaut
+
+
+class SimilarityInsertRequest(BaseModel):
+    key: str  # Identifiant du morceau dans le catalogue
+    chordsData: List[ChordItem]
+    tonic: str
+    mode: str
+
+
+class SimilarityQueryRequest(BaseModel):
+    chordsData: List[ChordItem]
+    tonic: str
+    mode: str
+    top_k: int = 10
+
+
+class MarkovGenerationRequest(BaseModel):
+    tonic: str
+    mode: str
+    preset: str = "pop"
+    corpus: Optional[List[str]] = None  # Chiffrages d'entraînement, à la place du preset
+    order: int = 2
+    length: int = 4
+    samples: int = 1000  # Nombre de tirages
+    limit: Optional[int] = Field(100, ge=1)  # Nombre de progressions distinctes renvoyées
+    start_on_tonic: bool = False
+    cadence: Optional[str] = None  # "authentic", "plagal", "half" ou "deceptive"
+    seed: Optional[int] = None
+
+
+class ProgressionEnumerationRequest(BaseModel):
+    tonic: str
+    mode: str
+    length: int = 4
+    start_on_tonic: bool = False
+    cadence: Optional[str] = None  # "authentic", "plagal", "half" ou "deceptive"
+    borrow_modes: List[str] = []  # Modes parallèles où emprunter des accords
+    min_borrowed: int = 0
+    distinct: bool = True  # Jamais deux fois le même accord
+    triads: bool = True
+    sevenths: bool = True
+    cursor: Optional[List[int]] = None  # `next_cursor` de la page précédente
+    limit: int = 100
+
+
+class MelodyNoteItem(BaseModel):
+    pitch: int  # Note MIDI ou classe de hauteur (0-11)
+    start: float  # En temps depuis le début du morceau
+    duration: float  # En temps
+
+
+class MelodyHarmonizationRequest(BaseModel):
+    notes: List[MelodyNoteItem]
+    tonic: str
+    mode: str
+    beats_per_chord: float = 4.0  # 4 : un accord par mesure en 4/4, 1 : un par temps
+    sevenths: bool = True
+    melody_weight: float = 3.0
+    root_motion_weight: float = 1.0
+    common_tones_weight: float = 1.0
+    borrowing_weight: float = 1.0
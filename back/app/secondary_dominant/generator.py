@@ -1,82 +1,69 @@
 from app.utils.common import (
+    ChordLike,
+    as_chord,
+    chord_name_of,
     format_numeral,
-    get_chord_notes,
     get_note_from_index,
     get_note_index,
-    get_scale_notes,
-    parse_chord,
+    is_chord_diatonic,
 )
-from constants import CORE_QUALITIES, MODES_DATA, ROMAN_DEGREES
+from app.utils.modes import get_mode_registry
+from app.utils.qualities import QUALITY_BY_NAME
+from constants import ROMAN_DEGREES
 
 
-def is_chord_diatonic(chord_name, tonic_name, mode_name):
-    """
-    Vérifie si toutes les notes d'un accord appartiennent à une gamme donnée.
-    C'est la nouvelle fonction de base pour la compatibilité.
-    """
-    try:
-        scale_notes = get_scale_notes(tonic_name, mode_name)
-        chord_notes = get_chord_notes(chord_name)
-
-        # Si l'accord ou la gamme n'est pas valide, il n'est pas diatonique.
-        if not scale_notes or not chord_notes:
-            return False
-
-        # Vérifie si l'ensemble des notes de l'accord est un sous-ensemble des notes de la gamme.
-        return set(chord_notes).issubset(set(scale_notes))
-    except (ValueError, TypeError):
-        # En cas d'erreur (ex: nom de mode invalide), on considère l'accord non diatonique.
-        return False
-
-
-def get_roman_numeral(chord_name, tonic_index, mode_name):
+def get_roman_numeral(chord_name: ChordLike, tonic_index, mode_name):
     """
     Analyse un accord et retourne un tuple contenant le chiffrage attendu (diatonique)
     et le chiffrage réel (joué), en utilisant une analyse par les notes.
     """
-    parsed_chord = parse_chord(chord_name)
-    if not parsed_chord:
-        return (f"({chord_name})", f"({chord_name})")
+    chord = as_chord(chord_name)
+    if chord is None:
+        name = chord_name_of(chord_name)
+        return (f"({name})", f"({name})")
 
-    chord_index, found_quality = parsed_chord
+    chord_name = chord.name
+    chord_index, found_quality = chord.root, chord.quality
     interval = (chord_index - tonic_index + 12) % 12
 
-    mode_intervals, mode_qualities, _ = MODES_DATA[mode_name]
+    registry = get_mode_registry()
+    mode_id = registry.ids[mode_name]
+    degree_index = registry.degree_by_interval[mode_id][interval]
 
-    if interval not in mode_intervals:
+    # Hors du mode, ou au-delà du VIIe degré (gammes de plus de sept notes)
+    if not 0 <= degree_index < len(ROMAN_DEGREES):
         return (f"({chord_name})", f"({chord_name})")
 
-    degree_index = mode_intervals.index(interval)
     base_numeral = ROMAN_DEGREES[degree_index]
-    expected_quality = mode_qualities[degree_index]
+    expected_quality = registry.qualities[mode_id][degree_index]
 
     expected_numeral = format_numeral(base_numeral, expected_quality)
     found_numeral = format_numeral(base_numeral, found_quality)
 
     # La logique de compatibilité est remplacée par un appel direct à is_chord_diatonic.
     tonic_name = get_note_from_index(tonic_index)
-    if is_chord_diatonic(chord_name, tonic_name, mode_name):
+    if is_chord_diatonic(chord, tonic_name, mode_name):
         return (expected_numeral, found_numeral)
     else:
         # Si l'accord n'est pas diatonique, on met son chiffrage entre parenthèses.
         return (expected_numeral, f"({found_numeral})")
 
 
-def get_secondary_dominant_for_target(target_chord_name, tonic_name, mode_name):
+def get_secondary_dominant_for_target(target_chord_name: ChordLike, tonic_name, mode_name):
     """
     Calcule la dominante (primaire ou secondaire) qui cible un accord donné.
     Retourne la dominante et son analyse fonctionnelle dans la tonalité.
     """
     if not target_chord_name:
         return "N/A", "Pas d'accord d'origine"
-    parsed_target = parse_chord(target_chord_name)
-    if not parsed_target:
+    target = as_chord(target_chord_name)
+    if target is None:
         return "N/A", "Accord non reconnu"
 
-    target_root_index, target_quality = parsed_target
+    target_root_index, target_quality = target.root, target.quality
 
     # On ne crée généralement pas de dominante pour une cible diminuée.
-    if CORE_QUALITIES.get(target_quality) == "diminished":
+    if QUALITY_BY_NAME[target_quality].core == "diminished":
         return "N/A", "(Cible diminuée)"
 
     # 1. Trouver la fondamentale de la dominante (une quinte juste au-dessus de la cible)
@@ -86,7 +73,7 @@ def get_secondary_dominant_for_target(target_chord_name, tonic_name, mode_name):
 
     # 2. Analyser la fonction de cette dominante dans la tonalité
     tonic_index = get_note_index(tonic_name)
-    _, target_numeral = get_roman_numeral(target_chord_name, tonic_index, mode_name)
+    _, target_numeral = get_roman_numeral(target, tonic_index, mode_name)
 
     # Cas spécial : si la cible est la tonique (I), c'est la dominante primaire.
     # On vérifie si le chiffrage (sans parenthèses) commence par 'I'.
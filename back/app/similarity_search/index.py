@@ -0,0 +1,479 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TypedDict
+
+import numpy as np
+
+from app.utils.chords_analyzer import QualityAnalysisItem
+from app.utils.common import ChordLike, as_chord, get_note_index
+from app.utils.modes import get_mode_registry
+from app.utils.progression_kernel import analyze_progression
+from constants import CHROMATIC_DEGREES_MAP
+
+# Tailles des n-grammes de chiffrages indexés (unigrammes pour les progressions d'un accord)
+NGRAM_SIZES = (2, 3)
+# Signature MinHash : NUM_HASHES = LSH_BANDS x LSH_ROWS
+NUM_HASHES = 32
+LSH_BANDS = 8
+LSH_ROWS = 4
+# Listes inversées trop longues (n-grammes très courants, ex: "V7 I") ignorées à la requête
+MAX_POSTING_LENGTH = 1_000
+# Nombre d'insertions gardées en mémoire avant leur écriture (en arrière-plan) dans un segment
+FLUSH_THRESHOLD = 1_000
+# Clés stockées en UTF-8 sur une largeur fixe, pour rester mappables en mémoire
+MAX_KEY_BYTES = 64
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_HASH_A = np.random.default_rng(20240611).integers(1, _MERSENNE_PRIME, NUM_HASHES, dtype=np.uint64)
+_HASH_B = np.random.default_rng(20240612).integers(0, _MERSENNE_PRIME, NUM_HASHES, dtype=np.uint64)
+_BAND_MULTIPLIERS = np.random.default_rng(20240613).integers(
+    1, 1 << 63, LSH_ROWS, dtype=np.uint64
+) | np.uint64(1)
+_ROMAN_NUMERAL = re.compile(r"^[b#]?[ivIV]+")
+_MANIFEST = "manifest.json"
+
+
+class SimilarityMatch(TypedDict):
+    key: str
+    score: float  # Similarité de Jaccard estimée des n-grammes (0 à 1)
+
+
+class IndexArrays(NamedTuple):
+    """
+    Index figé, tel qu'écrit sur disque (un fichier .npy par tableau, ouvert en
+    mémoire partagée) : les workers le chargent sans rien analyser.
+    """
+
+    keys: np.ndarray  # [entrée] (octets UTF-8)
+    signatures: np.ndarray  # [entrée][NUM_HASHES] (uint32)
+    band_keys: np.ndarray  # [bande][entrée], trié par bande (uint64)
+    band_entries: np.ndarray  # [bande][entrée] : entrée de chaque clé de bande
+    ngram_keys: np.ndarray  # N-grammes distincts, triés (uint64)
+    ngram_offsets: np.ndarray  # Liste inversée de ngram_keys[i] : [offsets[i], offsets[i + 1])
+    ngram_entries: np.ndarray
+
+
+def progression_tokens(
+    quality_analysis: Sequence[QualityAnalysisItem], tonic_index: int
+) -> List[str]:
+    """
+    Suite de symboles indépendante de la transposition : `found_numeral` et
+    `found_quality` de chaque accord. Un accord hors du mode (chiffrage remplacé par
+    son nom) est repéré par son degré chromatique par rapport à la tonique.
+    """
+    tokens: List[str] = []
+    for item in quality_analysis:
+        numeral = item["found_numeral"] or ""
+        if not _ROMAN_NUMERAL.match(numeral.strip("()")):
+            chord = as_chord(item["chord"])
+            numeral = (
+                f"({CHROMATIC_DEGREES_MAP[(chord.root - tonic_index) % 12]})" if chord else "?"
+            )
+        tokens.append(f"{numeral}:{item['found_quality'] or ''}")
+    return tokens
+
+
+def analyze_for_index(progression: Sequence[ChordLike], tonic: str, mode_name: str) -> List[str]:
+    """Analyse une progression dans une tonalité donnée et renvoie ses symboles indexés."""
+    if get_mode_registry().ids.get(mode_name) is None:
+        raise ValueError(f"Mode '{mode_name}' not found.")
+    tonic_index = get_note_index(tonic)
+    return progression_tokens(analyze_progression(progression, tonic_index, mode_name), tonic_index)
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def progression_ngrams(tokens: Sequence[str]) -> np.ndarray:
+    """Empreintes (uint64) distinctes des n-grammes d'une progression."""
+    sizes = NGRAM_SIZES if len(tokens) >= min(NGRAM_SIZES) else (1,)
+    hashes = {
+        _hash(" ".join(tokens[start : start + size]))
+        for size in sizes
+        for start in range(len(tokens) - size + 1)
+    }
+    return np.array(sorted(hashes), dtype=np.uint64)
+
+
+def minhash_signature(ngrams: np.ndarray) -> np.ndarray:
+    """Signature MinHash : minimum de NUM_HASHES permutations universelles des n-grammes."""
+    if not len(ngrams):
+        raise ValueError("La progression est vide.")
+    values = (ngrams[:, None] & np.uint64(0xFFFFFFFF)) % np.uint64(_MERSENNE_PRIME)
+    permuted = (values * _HASH_A[None, :] + _HASH_B[None, :]) % np.uint64(_MERSENNE_PRIME)
+    signature: np.ndarray = permuted.min(axis=0).astype(np.uint32)
+    return signature
+
+
+def lsh_band_keys(signatures: np.ndarray) -> np.ndarray:
+    """Clé de chaque bande de LSH_ROWS valeurs : [entrée][bande] (uint64)."""
+    rows = signatures.reshape(len(signatures), LSH_BANDS, LSH_ROWS).astype(np.uint64)
+    keys: np.ndarray = (rows * _BAND_MULTIPLIERS).sum(axis=2, dtype=np.uint64)
+    return keys
+
+
+def _empty_arrays() -> IndexArrays:
+    return IndexArrays(
+        keys=np.zeros(0, dtype=f"S{MAX_KEY_BYTES}"),
+        signatures=np.zeros((0, NUM_HASHES), dtype=np.uint32),
+        band_keys=np.zeros((LSH_BANDS, 0), dtype=np.uint64),
+        band_entries=np.zeros((LSH_BANDS, 0), dtype=np.uint32),
+        ngram_keys=np.zeros(0, dtype=np.uint64),
+        ngram_offsets=np.zeros(1, dtype=np.int64),
+        ngram_entries=np.zeros(0, dtype=np.uint32),
+    )
+
+
+def build_index_arrays(
+    keys: Sequence[str], signatures: np.ndarray, ngrams: Sequence[np.ndarray]
+) -> IndexArrays:
+    """Construit les tableaux triés de l'index (bandes LSH et listes inversées)."""
+    if not len(keys):
+        return _empty_arrays()
+    bands = lsh_band_keys(signatures).T
+    band_order = np.argsort(bands, axis=1, kind="stable")
+
+    entries = np.repeat(np.arange(len(keys), dtype=np.uint32), [len(grams) for grams in ngrams])
+    all_ngrams = np.concatenate(ngrams)
+    order = np.lexsort((entries, all_ngrams))
+    ngram_keys, counts = np.unique(all_ngrams[order], return_counts=True)
+
+    return IndexArrays(
+        keys=np.array([key.encode() for key in keys], dtype=f"S{MAX_KEY_BYTES}"),
+        signatures=np.ascontiguousarray(signatures, dtype=np.uint32),
+        band_keys=np.take_along_axis(bands, band_order, axis=1),
+        band_entries=band_order.astype(np.uint32),
+        ngram_keys=ngram_keys,
+        ngram_offsets=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        ngram_entries=entries[order],
+    )
+
+
+class Segment(NamedTuple):
+    """Segment publié : dossier (dans le répertoire de l'index) et tableaux mappés."""
+
+    folder: str
+    arrays: IndexArrays
+
+
+def merge_start(sizes: Sequence[int]) -> int:
+    """
+    Début des derniers segments à fusionner (`len(sizes)` si aucun) : ils le sont dès
+    qu'ensemble ils comptent au moins autant d'entrées que le segment qui les précède.
+    Chaque segment compte alors plus d'entrées que tous les suivants réunis : il reste
+    O(log n) segments et chaque entrée n'est réécrite que O(log n) fois.
+    """
+    start = len(sizes) - 1
+    while start > 0 and sum(sizes[start:]) >= sizes[start - 1]:
+        start -= 1
+    return start if start < len(sizes) - 1 else len(sizes)
+
+
+def merge_index_arrays(parts: Sequence[IndexArrays]) -> IndexArrays:
+    """Un seul jeu de tableaux pour les entrées de plusieurs segments, dans l'ordre."""
+    keys = [key.decode() for part in parts for key in part.keys.tolist()]
+    signatures = np.concatenate([part.signatures for part in parts])
+    ngrams = [grams for part in parts for grams in _stored_ngrams(part)]
+    return build_index_arrays(keys, signatures, ngrams)
+
+
+class SimilarityIndex:
+    """
+    Index de recherche de progressions similaires.
+
+    Les entrées enregistrées sont figées dans des segments : des tableaux triés,
+    mappés en mémoire depuis le disque, jamais modifiés. Les insertions sont gardées
+    en mémoire puis écrites dans un nouveau segment (`save`, ou en arrière-plan tous
+    les FLUSH_THRESHOLD ajouts) ; une requête interroge tous les segments. Les derniers
+    segments sont fusionnés en arrière-plan (voir `merge_start`). La liste des segments
+    est publiée atomiquement par le manifeste : un worker qui recharge voit l'ancienne
+    ou la nouvelle, jamais un mélange. Les clés ne sont pas dédoublonnées.
+
+    Plusieurs processus peuvent écrire dans le même répertoire : chaque publication
+    le verrouille (flock) et relit le manifeste, sans perdre les segments des autres.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._segments: List[Segment] = []
+        # Identité du manifeste chargé (inode, date de modification) : voir `refresh`
+        self._stamp: Optional[Tuple[int, int]] = None
+        # Insertions pas encore écrites : clé, signature, n-grammes
+        self._pending: List[Tuple[str, np.ndarray, np.ndarray]] = []
+        self._background: Optional[threading.Thread] = None
+        if directory is not None and os.path.exists(os.path.join(directory, _MANIFEST)):
+            self.load()
+
+    def __len__(self) -> int:
+        return sum(len(segment.arrays.keys) for segment in self._segments) + len(self._pending)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def _directory(self) -> str:
+        if self.directory is None:
+            raise ValueError("Aucun répertoire d'index n'est configuré.")
+        return self.directory
+
+    @contextmanager
+    def _directory_lock(self, shared: bool = False) -> Iterator[None]:
+        """Verrou du répertoire, partagé avec les autres processus."""
+        directory = self._directory()
+        os.makedirs(directory, exist_ok=True)
+        descriptor = os.open(directory, os.O_RDONLY)
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(descriptor)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        path = os.path.join(self._directory(), _MANIFEST)
+        if not os.path.exists(path):
+            return {"generation": 0, "segments": []}
+        with open(path) as manifest_file:
+            manifest: Dict[str, Any] = json.load(manifest_file)
+        return manifest
+
+    def _manifest_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            status = os.stat(os.path.join(self._directory(), _MANIFEST))
+        except FileNotFoundError:
+            return None
+        return status.st_ino, status.st_mtime_ns
+
+    def _open_segments(self) -> Tuple[Optional[Tuple[int, int]], List[Segment]]:
+        """
+        Segments du manifeste, ouverts en mémoire partagée, et identité du manifeste
+        lu (verrou du répertoire tenu).
+        """
+        stamp = self._manifest_stamp()
+        manifest = self._read_manifest()
+        segments = []
+        for entry in manifest["segments"]:
+            folder = os.path.join(self._directory(), entry["folder"])
+            arrays = IndexArrays(
+                *(
+                    np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r")
+                    for name in IndexArrays._fields
+                )
+            )
+            segments.append(Segment(entry["folder"], arrays))
+        return stamp, segments
+
+    def load(self) -> None:
+        """(Re)charge les segments publiés de l'index, en mémoire partagée."""
+        with self._directory_lock(shared=True):
+            stamp, segments = self._open_segments()
+        with self._lock:
+            self._stamp, self._segments = stamp, segments
+
+    def refresh(self) -> None:
+        """Recharge les segments si un autre processus a publié un manifeste depuis."""
+        if self.directory is not None and self._manifest_stamp() != self._stamp:
+            self.load()
+
+    def _publish(
+        self, manifest: Dict[str, Any], position: int, replaced: int, arrays: IndexArrays
+    ) -> Tuple[Optional[Tuple[int, int]], List[Segment]]:
+        """
+        Écrit `arrays` dans un nouveau segment, qui remplace les `replaced` segments du
+        manifeste à partir de `position`, publie la nouvelle liste et renvoie les
+        segments publiés. Verrou du répertoire tenu.
+        """
+        directory = self._directory()
+        generation = manifest["generation"] + 1
+        folder = f"segment-{generation:06d}"
+        os.makedirs(os.path.join(directory, folder), exist_ok=True)
+        for name, array in zip(IndexArrays._fields, arrays):
+            np.save(os.path.join(directory, folder, f"{name}.npy"), array)
+        entries = list(manifest["segments"])
+        entries[position : position + replaced] = [{"folder": folder, "entries": len(arrays.keys)}]
+        manifest_path = os.path.join(directory, _MANIFEST)
+        with open(manifest_path + ".tmp", "w") as manifest_file:
+            json.dump({"generation": generation, "segments": entries}, manifest_file)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        # Les segments du manifeste précédent restent lisibles par les workers qui ne
+        # l'ont pas quitté ; les autres ne sont plus référencés par personne.
+        kept = {entry["folder"] for entry in entries + manifest["segments"]}
+        for name in os.listdir(directory):
+            if name.startswith("segment-") and name not in kept:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        return self._open_segments()
+
+    def insert(self, key: str, tokens: Sequence[str]) -> None:
+        if not key or len(key.encode()) > MAX_KEY_BYTES:
+            raise ValueError(f"La clé doit compter entre 1 et {MAX_KEY_BYTES} octets.")
+        ngrams = progression_ngrams(tokens)
+        signature = minhash_signature(ngrams)
+        with self._lock:
+            self._pending.append((key, signature, ngrams))
+            should_flush = self.directory is not None and len(self._pending) >= FLUSH_THRESHOLD
+        if should_flush:
+            self._start_background()
+
+    def save(self) -> None:
+        """
+        Écrit les insertions dans un nouveau segment, puis lance la fusion des segments
+        en arrière-plan si besoin. Les insertions restent visibles en mémoire jusqu'à la
+        publication du segment. Le manifeste est relu sous le verrou du répertoire : les
+        segments publiés entre-temps par un autre processus sont conservés.
+        """
+        self._flush()
+        with self._lock:
+            sizes = [len(segment.arrays.keys) for segment in self._segments]
+        if merge_start(sizes) < len(sizes):
+            self._start_background()
+
+    def _flush(self) -> None:
+        self._directory()
+        with self._save_lock:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                return
+            arrays = build_index_arrays(
+                [key for key, _, _ in pending],
+                np.stack([signature for _, signature, _ in pending]),
+                [grams for _, _, grams in pending],
+            )
+            with self._directory_lock():
+                manifest = self._read_manifest()
+                position = len(manifest["segments"])
+                stamp, segments = self._publish(manifest, position, 0, arrays)
+            with self._lock:
+                self._stamp, self._segments = stamp, segments
+                self._pending = self._pending[len(pending) :]
+
+    def merge(self) -> bool:
+        """
+        Fusionne les derniers segments en un seul si `merge_start` le demande ; False
+        s'il n'y avait rien à fusionner. La fusion est calculée hors des verrous : si
+        un autre processus a déjà remplacé ces segments, elle est abandonnée.
+        """
+        with self._lock:
+            segments = list(self._segments)
+        start = merge_start([len(segment.arrays.keys) for segment in segments])
+        if start >= len(segments):
+            return False
+        merged = merge_index_arrays([segment.arrays for segment in segments[start:]])
+        folders = [segment.folder for segment in segments[start:]]
+        with self._save_lock, self._directory_lock():
+            manifest = self._read_manifest()
+            published = [entry["folder"] for entry in manifest["segments"]]
+            runs = [
+                position
+                for position in range(len(published) - len(folders) + 1)
+                if published[position : position + len(folders)] == folders
+            ]
+            if runs:
+                stamp, segments = self._publish(manifest, runs[0], len(folders), merged)
+            else:
+                stamp, segments = self._open_segments()
+        with self._lock:
+            self._stamp, self._segments = stamp, segments
+        return True
+
+    def _start_background(self) -> None:
+        """Écrit les insertions et fusionne les segments dans un thread, hors des requêtes."""
+        with self._lock:
+            if self._background is not None and self._background.is_alive():
+                return
+            self._background = threading.Thread(target=self._flush_and_merge, daemon=True)
+            self._background.start()
+
+    def _flush_and_merge(self) -> None:
+        try:
+            self._flush()
+            while self.merge():
+                pass
+        except (ValueError, OSError) as error:
+            print(f"Écriture de l'index de similarité impossible : {error}")
+
+    def join(self) -> None:
+        """Attend la fin de l'écriture ou de la fusion en arrière-plan."""
+        background = self._background
+        if background is not None:
+            background.join()
+
+    def _candidates(
+        self, arrays: IndexArrays, signature: np.ndarray, ngrams: np.ndarray
+    ) -> np.ndarray:
+        """Entrées d'un segment qui partagent une bande LSH ou un n-gramme peu courant."""
+        found: List[np.ndarray] = []
+        for band, band_key in enumerate(lsh_band_keys(signature[None])[0]):
+            keys = arrays.band_keys[band]
+            start = np.searchsorted(keys, band_key, side="left")
+            end = np.searchsorted(keys, band_key, side="right")
+            found.append(arrays.band_entries[band, start:end])
+        positions = np.searchsorted(arrays.ngram_keys, ngrams)
+        for position, ngram in zip(positions.tolist(), ngrams):
+            if position < len(arrays.ngram_keys) and arrays.ngram_keys[position] == ngram:
+                start, end = arrays.ngram_offsets[position], arrays.ngram_offsets[position + 1]
+                if end - start <= MAX_POSTING_LENGTH:
+                    found.append(arrays.ngram_entries[start:end])
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.uint32)
+
+    def query(self, tokens: Sequence[str], top_k: int = 10) -> List[SimilarityMatch]:
+        """
+        Les `top_k` progressions les plus proches, par similarité de Jaccard estimée.
+        Les segments publiés par d'autres processus sont rechargés au besoin.
+        """
+        ngrams = progression_ngrams(tokens)
+        signature = minhash_signature(ngrams)
+        self.refresh()
+        with self._lock:
+            segments, pending = list(self._segments), list(self._pending)
+
+        keys: List[str] = []
+        signatures = [np.zeros((0, NUM_HASHES), dtype=np.uint32)]
+        for segment in segments:
+            candidates = self._candidates(segment.arrays, signature, ngrams)
+            keys += [key.decode() for key in segment.arrays.keys[candidates].tolist()]
+            signatures.append(segment.arrays.signatures[candidates])
+        keys += [key for key, _, _ in pending]
+        signatures += [pending_signature[None] for _, pending_signature, _ in pending]
+        if not keys:
+            return []
+        scores = (np.concatenate(signatures) == signature[None, :]).mean(axis=1)
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [{"key": keys[index], "score": round(float(scores[index]), 4)} for index in top]
+
+
+def _stored_ngrams(arrays: IndexArrays) -> List[np.ndarray]:
+    """N-grammes de chaque entrée figée, reconstruits depuis les listes inversées."""
+    counts = np.diff(arrays.ngram_offsets)
+    owners = np.repeat(arrays.ngram_keys, counts)
+    order = np.argsort(arrays.ngram_entries, kind="stable")
+    per_entry = np.bincount(arrays.ngram_entries, minlength=len(arrays.keys))
+    return np.split(owners[order], np.cumsum(per_entry)[:-1]) if len(arrays.keys) else []
+
+
+_index: Optional[SimilarityIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """
+    Index partagé du processus, ouvert dans SIMILARITY_INDEX_DIR au premier appel ; les
+    segments publiés par les autres workers sont rechargés à la requête suivante.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex(os.getenv("SIMILARITY_INDEX_DIR", "data/similarity_index"))
+        return _index
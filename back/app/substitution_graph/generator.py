@@ -0,0 +1,276 @@
+from collections import deque
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple, TypedDict
+
+import numpy as np
+
+from app.utils.common import ChordLike, as_chord, chord_name_of, get_note_from_index, get_note_index
+from app.utils.modes import ModeRegistry, get_mode_registry
+from app.utils.qualities import QUALITIES, QUALITY_BY_NAME, QUALITY_IDS
+
+# Relations portées par les arêtes. Les substitutions relient deux accords
+# interchangeables ; les préparations vont de l'accord d'approche vers sa cible.
+EDGE_KINDS = ("tritone", "borrowing", "secondary_dominant", "related_ii", "backdoor")
+SUBSTITUTION_KINDS = ("tritone", "borrowing")
+PREPARATION_KINDS = ("secondary_dominant", "related_ii", "backdoor")
+MAX_APPROACH_STEPS = 4
+
+# Arête valable dans toutes les tonalités (seuls les emprunts dépendent de la tonique)
+_ANY_TONIC = -1
+_KIND_IDS = {kind: kind_id for kind_id, kind in enumerate(EDGE_KINDS)}
+_QUALITY_COUNT = len(QUALITIES)
+_DOMINANT_SEVENTH = QUALITY_IDS["7"]
+_MINOR_SEVENTH = QUALITY_IDS["m7"]
+
+# Les alias ("M", "min", "d", "+"...) sont ramenés à la première qualité de même formule
+_CANONICAL_QUALITY: Tuple[int, ...] = tuple(
+    next(other.id for other in QUALITIES if other.mask == quality.mask) for quality in QUALITIES
+)
+
+
+class Adjacency(NamedTuple):
+    """Liste d'adjacence compacte (CSR) : arêtes de `node` = [offsets[node], offsets[node + 1])."""
+
+    offsets: np.ndarray
+    neighbors: np.ndarray
+    kinds: np.ndarray  # Indice dans EDGE_KINDS
+    tonics: np.ndarray  # Tonique de l'emprunt, -1 pour les autres relations
+
+
+class SubstitutionGraph(NamedTuple):
+    """
+    Graphe des 12 fondamentales x qualités d'accord. Un nœud est numéroté
+    `fondamentale * nombre de qualités + qualité`.
+    """
+
+    registry: ModeRegistry
+    forward: Adjacency  # Arêtes sortantes
+    backward: Adjacency  # Arêtes entrantes (recherche des approches d'une cible)
+
+
+class GraphNeighbor(TypedDict):
+    chord: str
+    relation: str
+    tonic: Optional[str]  # Tonalité de l'emprunt, None pour les autres relations
+
+
+class ChainStep(TypedDict):
+    chord: str
+    relation: Optional[str]  # Relation qui mène à cet accord (None pour le premier)
+
+
+def _node(root: int, quality_id: int) -> int:
+    return (root % 12) * _QUALITY_COUNT + quality_id
+
+
+def _node_name(node: int) -> str:
+    root, quality_id = divmod(node, _QUALITY_COUNT)
+    return get_note_from_index(root) + QUALITIES[quality_id].name
+
+
+def _node_of(chord: ChordLike) -> int:
+    parsed = as_chord(chord)
+    if parsed is None:
+        raise ValueError(f"Accord non reconnu : '{chord_name_of(chord)}'")
+    return _node(parsed.root, _CANONICAL_QUALITY[parsed.quality_id])
+
+
+def _kind_mask(kinds: Optional[Iterable[str]], default: Sequence[str]) -> int:
+    mask = 0
+    for kind in default if kinds is None else kinds:
+        if kind not in _KIND_IDS:
+            raise ValueError(f"Relation inconnue : '{kind}'")
+        mask |= 1 << _KIND_IDS[kind]
+    return mask
+
+
+def _edges(registry: ModeRegistry) -> np.ndarray:
+    """Toutes les arêtes du graphe, une ligne (source, cible, relation, tonique) par arête."""
+    edges: List[Tuple[int, int, int, int]] = []
+
+    def add(source: int, target: int, kind: str, tonic: int = _ANY_TONIC) -> None:
+        if source != target:
+            edges.append((source, target, _KIND_IDS[kind], tonic))
+
+    for root in range(12):
+        for quality in QUALITIES:
+            if _CANONICAL_QUALITY[quality.id] != quality.id:
+                continue
+            node = _node(root, quality.id)
+            # Substitut tritonique, comme `get_tritone_substitute`
+            if quality.is_dominant:
+                add(node, _node(root + 6, _DOMINANT_SEVENTH), "tritone")
+            # V7/x, comme `get_secondary_dominant_for_target` (pas de cible diminuée)
+            if quality.core != "diminished":
+                add(_node(root + 7, _DOMINANT_SEVENTH), node, "secondary_dominant")
+            # ii relatif d'une dominante (ii7 -> V7)
+            if quality.core == "dominant":
+                add(_node(root + 7, _MINOR_SEVENTH), node, "related_ii")
+            # Dominante backdoor (bVII7 -> I)
+            if quality.core == "major":
+                add(_node(root + 10, _DOMINANT_SEVENTH), node, "backdoor")
+
+    # Emprunt au mode parallèle : accords d'un même degré dans deux modes de sept notes
+    mode_ids = [registry.ids[name] for name in registry.heptatonic_names]
+    for tonic in range(12):
+        for degree in range(7):
+            sevenths, triads = set(), set()
+            for mode_id in mode_ids:
+                root = tonic + registry.intervals[mode_id][degree]
+                quality = QUALITY_BY_NAME[registry.qualities[mode_id][degree]]
+                sevenths.add(_node(root, _CANONICAL_QUALITY[quality.id]))
+                triads.add(_node(root, _CANONICAL_QUALITY[QUALITY_IDS[quality.triad]]))
+            for group in (sevenths, triads):
+                for source in group:
+                    for target in group:
+                        add(source, target, "borrowing", tonic)
+
+    return np.unique(np.array(edges, dtype=np.int32), axis=0)
+
+
+def _adjacency(sources: np.ndarray, edges: np.ndarray, neighbors: np.ndarray) -> Adjacency:
+    order = np.argsort(sources, kind="stable")
+    counts = np.bincount(sources, minlength=12 * _QUALITY_COUNT)
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int32)
+    arrays = (
+        offsets,
+        neighbors[order],
+        edges[order, 2].astype(np.int8),
+        edges[order, 3].astype(np.int8),
+    )
+    for array in arrays:
+        array.flags.writeable = False
+    return Adjacency(*arrays)
+
+
+@lru_cache(maxsize=4)
+def _build_graph(registry: ModeRegistry) -> SubstitutionGraph:
+    edges = _edges(registry)
+    return SubstitutionGraph(
+        registry,
+        forward=_adjacency(edges[:, 0], edges, edges[:, 1]),
+        backward=_adjacency(edges[:, 1], edges, edges[:, 0]),
+    )
+
+
+def get_substitution_graph() -> SubstitutionGraph:
+    """Graphe du registre des modes courant, construit une seule fois par registre."""
+    return _build_graph(get_mode_registry())
+
+
+def _edges_of(
+    adjacency: Adjacency, node: int, kind_mask: int, tonic: Optional[int]
+) -> List[Tuple[int, int, int]]:
+    """Arêtes (voisin, relation, tonique) d'un nœud, filtrées par relation et tonalité."""
+    start, end = adjacency.offsets[node], adjacency.offsets[node + 1]
+    kinds = adjacency.kinds[start:end]
+    tonics = adjacency.tonics[start:end]
+    keep = ((kind_mask >> kinds) & 1).astype(bool)
+    if tonic is not None:
+        keep &= (tonics == _ANY_TONIC) | (tonics == tonic)
+    return list(
+        zip(
+            adjacency.neighbors[start:end][keep].tolist(),
+            kinds[keep].tolist(),
+            tonics[keep].tolist(),
+        )
+    )
+
+
+def get_substitutes(
+    chord: ChordLike, tonic: Optional[str] = None, kinds: Optional[Sequence[str]] = None
+) -> List[GraphNeighbor]:
+    """
+    Substituts d'un accord (par défaut : substitut tritonique et emprunts). Les emprunts
+    sont limités à la tonalité donnée, ou proposés pour toutes les tonalités sinon.
+    """
+    graph = get_substitution_graph()
+    tonic_index = get_note_index(tonic) if tonic is not None else None
+    return [
+        {
+            "chord": _node_name(neighbor),
+            "relation": EDGE_KINDS[kind],
+            "tonic": get_note_from_index(edge_tonic) if edge_tonic != _ANY_TONIC else None,
+        }
+        for neighbor, kind, edge_tonic in _edges_of(
+            graph.forward, _node_of(chord), _kind_mask(kinds, SUBSTITUTION_KINDS), tonic_index
+        )
+    ]
+
+
+def find_chain(
+    source: ChordLike,
+    target: ChordLike,
+    kinds: Optional[Sequence[str]] = None,
+    tonic: Optional[str] = None,
+) -> Optional[List[ChainStep]]:
+    """
+    Plus courte chaîne de relations d'un accord à un autre (parcours en largeur),
+    ou None si la cible est inaccessible.
+    """
+    graph = get_substitution_graph()
+    start, goal = _node_of(source), _node_of(target)
+    kind_mask = _kind_mask(kinds, EDGE_KINDS)
+    tonic_index = get_note_index(tonic) if tonic is not None else None
+
+    # Prédécesseur et relation de chaque nœud atteint
+    reached = {start: (-1, -1)}
+    queue = deque([start])
+    while queue and goal not in reached:
+        node = queue.popleft()
+        for neighbor, kind, _ in _edges_of(graph.forward, node, kind_mask, tonic_index):
+            if neighbor not in reached:
+                reached[neighbor] = (node, kind)
+                queue.append(neighbor)
+    if goal not in reached:
+        return None
+
+    chain: List[ChainStep] = []
+    node = goal
+    while node != -1:
+        previous, kind = reached[node]
+        chain.append(
+            {"chord": _node_name(node), "relation": EDGE_KINDS[kind] if kind >= 0 else None}
+        )
+        node = previous
+    return chain[::-1]
+
+
+def get_approaches(
+    target: ChordLike, steps: int = 2, kinds: Optional[Sequence[str]] = None
+) -> List[List[ChainStep]]:
+    """
+    Toutes les approches d'une cible en `steps` préparations (ex: ii7 -> V7 -> I pour
+    deux étapes), en remontant les arêtes entrantes.
+    """
+    if not 1 <= steps <= MAX_APPROACH_STEPS:
+        raise ValueError(f"Le nombre d'étapes doit être compris entre 1 et {MAX_APPROACH_STEPS}.")
+    graph = get_substitution_graph()
+    kind_mask = _kind_mask(kinds, PREPARATION_KINDS)
+
+    # Chemins partiels, de la cible vers l'accord le plus éloigné : (nœud, relation)
+    paths: List[List[Tuple[int, int]]] = [[(_node_of(target), -1)]]
+    for _ in range(steps):
+        paths = [
+            path + [(neighbor, kind)]
+            for path in paths
+            for neighbor, kind, _ in _edges_of(graph.backward, path[-1][0], kind_mask, None)
+            if all(neighbor != node for node, _ in path)
+        ]
+
+    approaches: List[List[ChainStep]] = []
+    for path in paths:
+        # La relation d'une arête est portée par l'accord qu'elle atteint
+        nodes = [node for node, _ in reversed(path)]
+        relations = [None] + [EDGE_KINDS[kind] for _, kind in reversed(path[1:])]
+        approaches.append(
+            [
+                {"chord": _node_name(node), "relation": relation}
+                for node, relation in zip(nodes, relations)
+            ]
+        )
+    return approaches
+
+
+# Caches exposés par /metrics (succès, échecs, taille)
+CACHES = {"substitution_graph": _build_graph}
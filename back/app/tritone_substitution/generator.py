@@ -1,20 +1,20 @@
-from app.utils.common import get_note_from_index, is_dominant_chord, parse_chord
+from app.utils.common import ChordLike, as_chord, get_note_from_index, is_dominant_chord
 
 
-def get_tritone_substitute(chord_name):
+def get_tritone_substitute(chord_name: ChordLike):
     """
-    Calcule le substitut tritonique pour un accord donné.
+    Calcule le substitut tritonique pour un accord donné (nom ou Chord).
     Retourne le substitut et une note explicative.
     """
-    parsed_chord = parse_chord(chord_name)
-    if not parsed_chord:
+    chord = as_chord(chord_name)
+    if chord is None:
         return " ", " - "
 
     # La substitution tritonique ne s'applique qu'aux accords de dominante.
-    if not is_dominant_chord(chord_name, parsed_chord):
+    if not is_dominant_chord(chord):
         return "", "Non dominant"
 
-    root_index, _ = parsed_chord
+    root_index = chord.root
 
     # Calculer la nouvelle fondamentale (à +6 demi-tons)
     sub_root_index = (root_index + 6) % 12
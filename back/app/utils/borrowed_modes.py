@@ -1,71 +1,83 @@
-from typing import List
+from typing import List, Optional
 
 from app.utils.chords_analyzer import QualityAnalysisItem
 from app.utils.common import (
+    Chord,
+    ChordLike,
     get_chord_notes,
-    get_scale_notes,
-)
-from constants import (
-    CORE_QUALITIES,
-    MODES_DATA,
+    get_tonic_index,
 )
+from app.utils.modes import ModeRegistry, get_mode_registry
+from app.utils.qualities import get_quality
+from constants import NOTES
 
 
-def find_possible_modes_for_chord(borrowed_chord_name: str, tonic_name: str) -> list[str]:
+def find_possible_modes_for_chord(
+    borrowed_chord_name: ChordLike, tonic_name: str, registry: Optional[ModeRegistry] = None
+) -> list[str]:
     """
     Analyse un accord et retourne la liste des modes parallèles auxquels il
     appartient diatoniquement, en se basant sur les notes.
 
     Args:
-        borrowed_chord_name (str): Le nom de l'accord à analyser (ex: "Emaj7").
+        borrowed_chord_name (str | Chord): L'accord à analyser (ex: "Emaj7").
         tonic_name (str): La tonique de référence (ex: "C").
+        registry (ModeRegistry): Modes candidats (par défaut, le registre courant).
 
     Returns:
         list: Une liste de noms de modes où l'accord est diatonique.
     """
     # 1. Obtenir les notes de l'accord à tester.
-    try:
-        chord_notes = get_chord_notes(borrowed_chord_name)
-        if not chord_notes:
+    if isinstance(borrowed_chord_name, Chord):
+        chord_mask = borrowed_chord_name.mask
+    else:
+        try:
+            chord_notes = get_chord_notes(borrowed_chord_name)
+        except (ValueError, TypeError):
             return []
-    except (ValueError, TypeError):
+        chord_mask = sum(1 << NOTES.index(note) for note in chord_notes or [])
+    if not chord_mask:
         return []
 
-    possible_modes = []
-    chord_notes_set = set(chord_notes)
-
-    # 2. Tester chaque mode défini dans nos données.
-    for mode_name in MODES_DATA:
-        try:
-            # 3. Obtenir les notes de la gamme pour le mode en cours.
-            scale_notes = get_scale_notes(tonic_name, mode_name)
-            scale_notes_set = set(scale_notes)
-
-            # 4. Vérifier si l'ensemble des notes de l'accord est un sous-ensemble
-            #    des notes de la gamme. C'est la définition d'un accord diatonique.
-            if chord_notes_set.issubset(scale_notes_set):
-                possible_modes.append(mode_name)
+    # 2. Valider la tonique de référence.
+    try:
+        tonic_index = get_tonic_index(tonic_name)
+    except (ValueError, TypeError):
+        return []
 
-        except (ValueError, TypeError):
-            # Ignore les modes ou toniques qui pourraient être invalides.
-            continue
+    # 3. L'accord est diatonique à un mode si ses notes sont un sous-ensemble de la
+    #    gamme, c'est-à-dire si aucun de ses bits n'est en dehors du masque du mode.
+    registry = registry or get_mode_registry()
+    scale_masks = registry.scale_masks_by_tonic[tonic_index]
+    possible_modes = [
+        mode_name
+        for mode_name, scale_mask in zip(registry.names, scale_masks)
+        if chord_mask & ~scale_mask == 0
+    ]
 
     return possible_modes
 
 
-def get_borrowed_chords(quality_analysis: List[QualityAnalysisItem], original_mode: str) -> dict:
+def get_borrowed_chords(
+    quality_analysis: List[QualityAnalysisItem],
+    original_mode: str,
+    registry: Optional[ModeRegistry] = None,
+) -> dict:
     """
-    Identifie les accords empruntés à partir d'une analyse de progression.
+    Identifie les accords empruntés à partir d'une analyse de progression, parmi les
+    modes de `registry` (par défaut, le registre courant).
     """
     borrowed_chords = {}
 
     # Détermine si le mode d'origine est majeur ou mineur.
-    mode_info = MODES_DATA.get(original_mode)
-    if not mode_info:
+    current_registry = get_mode_registry()
+    mode_id = current_registry.ids.get(original_mode)
+    if mode_id is None:
         return {}  # Mode d'origine inconnu, on ne peut rien faire.
 
-    original_mode_first_quality = mode_info[1][0]
-    original_mode_core_quality = CORE_QUALITIES.get(original_mode_first_quality)
+    original_mode_first_quality = current_registry.qualities[mode_id][0]
+    original_quality = get_quality(original_mode_first_quality)
+    original_mode_core_quality = original_quality.core if original_quality else None
 
     for analysis_item in quality_analysis:
         # On ne traite que les accords non-diatoniques au mode d'origine.
@@ -90,7 +102,7 @@ def get_borrowed_chords(quality_analysis: List[QualityAnalysisItem], original_mo
             segment_context = analysis_item.get("segment_context", {})
             if "tonic" in segment_context:
                 tonic_name = segment_context["tonic"]
-                possible_modes = find_possible_modes_for_chord(chord_name, tonic_name)
+                possible_modes = find_possible_modes_for_chord(chord_name, tonic_name, registry)
 
                 # Filtrer pour ne garder que les modes qui ne sont pas le mode original.
                 if possible_modes:
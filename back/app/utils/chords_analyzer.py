@@ -1,12 +1,14 @@
 from typing import Any, Dict, NotRequired, Optional, TypedDict
 
 from app.utils.common import (
+    ChordLike,
+    as_chord,
+    chord_name_of,
     format_numeral,
     get_note_from_index,
-    is_chord_diatonic,
-    parse_chord,
 )
-from constants import CHROMATIC_DEGREES_MAP, MODES_DATA
+from app.utils.modes import get_mode_registry
+from constants import CHROMATIC_DEGREES_MAP
 
 # Defines the parallel mode for borrowing chords
 PARALLEL_MODES = {
@@ -32,17 +34,19 @@ class QualityAnalysisItem(TypedDict):
     duration: NotRequired[int]
 
 
-def analyze_chord_in_context(chord_name, tonic_index, mode_name) -> QualityAnalysisItem:
+def analyze_chord_in_context(
+    chord_name: ChordLike, tonic_index: int, mode_name: str
+) -> QualityAnalysisItem:
     """
-    Analyse un accord dans un contexte tonal/modal, en gérant les accords
-    diatoniques et les emprunts courants.
+    Analyse un accord (nom ou Chord déjà analysé) dans un contexte tonal/modal,
+    en gérant les accords diatoniques et les emprunts courants.
     """
 
     # --- Analyse principale ---
-    parsed_chord = parse_chord(chord_name)
-    if not parsed_chord:
+    chord = as_chord(chord_name)
+    if chord is None:
         return {
-            "chord": chord_name,
+            "chord": chord_name_of(chord_name),
             "found_numeral": None,
             "expected_numeral": None,
             "found_quality": None,
@@ -51,7 +55,8 @@ def analyze_chord_in_context(chord_name, tonic_index, mode_name) -> QualityAnaly
             "is_diatonic": None,
         }
 
-    chord_index, found_quality = parsed_chord
+    chord_name = chord.name
+    chord_index, found_quality = chord.root, chord.quality
     interval = (chord_index - tonic_index + 12) % 12
 
     base_numeral = CHROMATIC_DEGREES_MAP.get(interval)
@@ -68,18 +73,20 @@ def analyze_chord_in_context(chord_name, tonic_index, mode_name) -> QualityAnaly
         }
 
     found_numeral = format_numeral(base_numeral, found_quality)
-    is_diatonic_flag = is_chord_diatonic(chord_name, get_note_from_index(tonic_index), mode_name)
+    registry = get_mode_registry()
+    mode_id = registry.ids[mode_name]
+    scale_mask = registry.scale_masks_by_tonic[tonic_index % 12][mode_id]
+    is_diatonic_flag = chord.mask != 0 and chord.mask & ~scale_mask == 0
 
     expected_quality = None
     expected_numeral = None
     expected_chord_name = None
 
-    mode_intervals, mode_qualities, _ = MODES_DATA[mode_name]
+    degree_index = registry.degree_by_interval[mode_id][interval]
 
-    if interval in mode_intervals:
+    if degree_index >= 0:
         # La fondamentale de l'accord est diatonique au mode
-        degree_index = mode_intervals.index(interval)
-        expected_quality = mode_qualities[degree_index]
+        expected_quality = registry.qualities[mode_id][degree_index]
 
         # On utilise le `base_numeral` déjà calculé pour formater le chiffrage attendu
         expected_numeral = format_numeral(base_numeral, expected_quality)
@@ -89,16 +96,13 @@ def analyze_chord_in_context(chord_name, tonic_index, mode_name) -> QualityAnaly
             expected_quality = "7" if found_quality == "7" else "M"
             expected_numeral = format_numeral(base_numeral, expected_quality)
     else:
-        # La fondamentale est chromatique (emprunt)
-        # La logique existante pour trouver des correspondances dans d'autres modes est correcte.
-        for mode, data in MODES_DATA.items():
-            if mode:
-                p_intervals, p_qualities = data[0], data[1]
-                if interval in p_intervals:
-                    degree_index = p_intervals.index(interval)
-                    expected_quality = p_qualities[degree_index]
-                    expected_numeral = format_numeral(base_numeral, expected_quality)
-                    break  # On a trouvé une correspondance
+        # La fondamentale est chromatique (emprunt) : on reprend la qualité du
+        # premier mode qui contient ce degré.
+        borrowed = registry.borrowed_degree[interval]
+        if borrowed is not None:
+            borrowed_mode_id, borrowed_degree = borrowed
+            expected_quality = registry.qualities[borrowed_mode_id][borrowed_degree]
+            expected_numeral = format_numeral(base_numeral, expected_quality)
 
     # Calcul du nom de l'accord attendu
     if expected_quality is not None:
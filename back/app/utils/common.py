@@ -1,12 +1,61 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING, NamedTuple, Optional, Tuple, Union
+
+from app.utils.modes import ModeRegistry, get_mode_registry
+from app.utils.qualities import QUALITY_BY_NAME, QUALITY_IDS, QUALITY_PARSE_ORDER
 from constants import (
-    CORE_QUALITIES,
-    MODES_DATA,
     NOTE_INDEX_MAP,
     NOTES,
 )
 
+if TYPE_CHECKING:
+    from app.schema import ChordItem
+
+
+class Chord(NamedTuple):
+    """
+    Accord analysé une seule fois, puis transmis tel quel à toutes les étapes
+    de l'analyse (au lieu de re-parser son nom à chaque appel).
+    """
+
+    name: str  # Nom tel que saisi (ex: "F#m7")
+    root: int  # Index chromatique de la fondamentale (0-11)
+    quality: str  # Qualité normalisée (ex: "m7")
+    quality_id: int  # Index de la qualité dans qualities.QUALITY_NAMES
+    mask: int  # Classes de hauteur de l'accord (bit i = note i), 0 si notes inconnues
+
+    @classmethod
+    def from_item(cls, item: "ChordItem") -> Optional["Chord"]:
+        return as_chord(f"{item.root}{item.quality}")
+
+
+ChordLike = Union[str, Chord]
+
+
+@lru_cache(maxsize=4096)
+def _parse_chord_name(chord_name: str) -> Optional[Chord]:
+    parsed = _parse_root_and_quality(chord_name)
+    if parsed is None:
+        return None
+    root_index, quality = parsed
+    chord_notes = _get_chord_note_indexes(chord_name)
+    mask = sum(1 << note for note in set(chord_notes)) if chord_notes else 0
+    return Chord(chord_name, root_index, quality, QUALITY_IDS[quality], mask)
+
+
+def as_chord(chord: ChordLike) -> Optional[Chord]:
+    """Renvoie l'accord analysé (mis en cache), ou None si le nom est invalide."""
+    if isinstance(chord, Chord):
+        return chord
+    return _parse_chord_name(chord)
+
+
+def chord_name_of(chord: ChordLike) -> str:
+    return chord.name if isinstance(chord, Chord) else chord
+
 
 # Returns the chromatic index (0–11) for a given note string
+@lru_cache(maxsize=1024)
 def get_note_index(note_str: str) -> int:
     """
     Converts a note string (e.g., "C#", "Gb") into its chromatic index (0-11).
@@ -53,18 +102,23 @@ def get_note_index(note_str: str) -> int:
 
 
 # Returns note name from chromatic index (0–11)
-def get_note_from_index(index):
+def get_note_from_index(index: int) -> str:
     return NOTES[index % 12]
 
 
 # Parses a chord name and returns its root index and a normalized quality string
-def parse_chord(chord_name):
-    chord_name = chord_name.strip()
+def parse_chord(chord_name: ChordLike) -> Optional[Tuple[int, str]]:
+    chord = as_chord(chord_name)
+    if chord is None:
+        return None
+    return chord.root, chord.quality
+
 
-    # Utilisation des qualités reconnues depuis CORE_QUALITIES
-    KNOWN_QUALITIES = sorted(CORE_QUALITIES.keys(), key=lambda q: -len(q))
+def _parse_root_and_quality(chord_name: str) -> Optional[Tuple[int, str]]:
+    chord_name = chord_name.strip()
 
-    for quality in KNOWN_QUALITIES:
+    # Qualités reconnues, de la plus longue à la plus courte
+    for quality in QUALITY_PARSE_ORDER:
         if chord_name.endswith(quality):
             root = chord_name[: -len(quality)] if len(quality) > 0 else chord_name
             try:
@@ -87,28 +141,21 @@ def is_dominant_chord(chord_name, parsed_chord=None):
     Un accord est considéré comme dominant si sa qualité de base est 'dominant',
     ou s'il s'agit d'une triade majeure simple (qui peut fonctionner comme un dominant).
     """
-    if not parsed_chord:
-        # Note: Assurez-vous que les fonctions parse_chord et _get_core_quality
-        # sont disponibles dans le même scope.
-        parsed_chord = parse_chord(chord_name)
-    if not parsed_chord:
-        return False
-
-    _, quality = parsed_chord
-    core_quality = _get_core_quality(quality)
-
-    # 1. Les accords dont la qualité de base est 'dominant' le sont toujours.
-    if core_quality == "dominant":
-        return True
-
-    # 2. Une triade majeure simple (sans extensions comme 6, 9, maj7) peut
-    # fonctionner comme un accord de dominante. Nous acceptons les qualités
-    # qui représentent une triade majeure simple.
-    if core_quality == "major" and quality in ["", "M", "maj"]:
-        return True
+    if isinstance(chord_name, Chord):
+        quality = chord_name.quality
+    else:
+        if not parsed_chord:
+            parsed_chord = parse_chord(chord_name)
+        if not parsed_chord:
+            return False
+        _, quality = parsed_chord
 
-    # 3. Tous les autres types d'accords ne sont pas considérés comme dominants.
-    return False
+    # Les accords dont la qualité de base est 'dominant' le sont toujours, ainsi que
+    # les triades majeures simples (sans extensions comme 6, 9, maj7).
+    registered = QUALITY_BY_NAME.get(quality)
+    if registered is not None:
+        return registered.is_dominant
+    return _get_core_quality(quality) == "dominant"
 
 
 # Returns a diatonic 7th chord for a degree and tonic, with optional simplification
@@ -120,18 +167,19 @@ def get_diatonic_7th_chord(degree, key_tonic_index, mode_name="Ionian"):
     if degree is None or not (1 <= degree <= 7):
         return None
 
-    mode_intervals, mode_qualities, _ = MODES_DATA[mode_name]
+    registry = get_mode_registry()
+    mode_id = registry.ids[mode_name]
 
-    chord_root_index = (key_tonic_index + mode_intervals[degree - 1]) % 12
-    quality = mode_qualities[degree - 1]
+    chord_root_index = (key_tonic_index + registry.intervals[mode_id][degree - 1]) % 12
+    quality = registry.qualities[mode_id][degree - 1]
     name = get_note_from_index(chord_root_index)
 
     return name + quality
 
 
 def _get_core_quality(quality):
-    if quality in CORE_QUALITIES:
-        return CORE_QUALITIES[quality]
+    if quality in QUALITY_BY_NAME:
+        return QUALITY_BY_NAME[quality].core
     # Cas non reconnu : essayer de simplifier
     if quality.startswith("maj"):
         return "major"
@@ -148,17 +196,20 @@ def _get_core_quality(quality):
     return "major"  # fallback
 
 
-def get_scale_notes(key_tonic_str: str, mode_name: str) -> list[str]:
+def get_tonic_index(key_tonic_str: str) -> int:
     """
-    Génère la liste des notes d'une gamme à partir d'une tonique et d'un mode.
+    Index chromatique (0-11) d'une tonique telle qu'écrite dans une analyse.
+
+    Seules les écritures "C", "C#" et "Cb" sont acceptées : un bémol est ramené à
+    la note diésée équivalente (ex: "Bb" -> index de A#). Lève ValueError si la
+    tonique n'est pas reconnue.
     """
-    # 1. Valider et normaliser la tonique
     root_note = key_tonic_str[0].upper()
     accidental = key_tonic_str[1:]
 
     # Gère les bémols en cherchant l'équivalent diésé (ex: Bb -> A#)
     # Ne touche pas à la note "B" seule.
-    if accidental == "b":
+    if accidental == "b" and root_note in NOTE_INDEX_MAP:
         # On calcule l'index de la note bémolisée et on prend la note diésée correspondante
         flat_index = (NOTE_INDEX_MAP[root_note] - 1 + 12) % 12
         tonic_normalized = NOTES[flat_index]
@@ -169,135 +220,60 @@ def get_scale_notes(key_tonic_str: str, mode_name: str) -> list[str]:
     if tonic_normalized not in NOTE_INDEX_MAP:
         raise ValueError(f"Tonic '{key_tonic_str}' could not be normalized or is invalid.")
 
-    tonic_index = NOTE_INDEX_MAP[tonic_normalized]
+    return NOTE_INDEX_MAP[tonic_normalized]
 
-    # 2. Valider le mode
-    found_mode_key = next((key for key in MODES_DATA if key.lower() == mode_name.lower()), None)
-    if not found_mode_key:
+
+def _get_mode_id(mode_name: str) -> int:
+    mode_id = get_mode_registry().resolve(mode_name)
+    if mode_id is None:
         raise ValueError(f"Mode '{mode_name}' not found.")
+    return mode_id
+
+
+def get_scale_notes(key_tonic_str: str, mode_name: str) -> list[str]:
+    """
+    Génère la liste des notes d'une gamme à partir d'une tonique et d'un mode.
+    """
+    # 1. Valider et normaliser la tonique
+    tonic_index = get_tonic_index(key_tonic_str)
+
+    # 2. Valider le mode
+    mode_id = _get_mode_id(mode_name)
 
     # 3. Récupérer les intervalles et construire la gamme
-    intervals = MODES_DATA[found_mode_key][0]
-    scale_notes = [(NOTES[(tonic_index + i) % 12]) for i in intervals]
-
-    return scale_notes
-
-
-def format_numeral(base_numeral, quality):
-    core_quality = CORE_QUALITIES.get(quality, "major")
-    numeral = base_numeral.lower() if core_quality in ["minor", "diminished"] else base_numeral
-    suffix_map = {
-        "maj7": "maj7",
-        "m7": "7",
-        "7": "7",
-        "m7b5": "ø7",
-        "dim7": "°7",
-        "dim": "°",
-        "aug": "+",
-        "sus4": "sus4",
-        "sus2": "sus2",
-        "add9": "add9",
-        "m(maj7)": "m(maj7)",
-        "m6": "m6",
-        "m9": "m9",
-        "m11": "m11",
-        "m13": "m13",
-        "9": "9",
-        "11": "11",
-        "13": "13",
-    }
-    suffix = suffix_map.get(quality, "")
-    return numeral + suffix
+    return [NOTES[(tonic_index + i) % 12] for i in get_mode_registry().intervals[mode_id]]
+
 
+def format_numeral(base_numeral: str, quality: str) -> str:
+    registered = QUALITY_BY_NAME.get(quality)
+    if registered is None:
+        return base_numeral
+    numeral = base_numeral.lower() if registered.core in ["minor", "diminished"] else base_numeral
+    return numeral + registered.numeral_suffix
 
-def get_chord_notes(chord_name: str) -> list[str] | None:
+
+def get_chord_notes(chord_name: ChordLike) -> list[str] | None:
     """
     Analyse un nom d'accord et renvoie ses notes constitutives.
-    Cette version est autonome et définit ses propres constantes pour éviter
-    les problèmes d'environnement.
 
     Args:
-        chord_name (str): Le nom de l'accord (ex: "C6", "F#m7", "Bb").
+        chord_name (str | Chord): Le nom de l'accord (ex: "C6", "F#m7", "Bb").
 
     Returns:
         list[str] | None: Une liste de notes ou None si l'accord est invalide.
     """
+    note_indexes = _get_chord_note_indexes(chord_name_of(chord_name))
+    if note_indexes is None:
+        return None
+    return [NOTES[note_index] for note_index in note_indexes]
 
-    CHORD_FORMULAS = {
-        # --- Triades de base ---
-        "": [0, 4, 7],
-        "M": [0, 4, 7],
-        "maj": [0, 4, 7],
-        "m": [0, 3, 7],
-        "min": [0, 3, 7],
-        "dim": [0, 3, 6],
-        "d": [0, 3, 6],
-        "aug": [0, 4, 8],
-        "+": [0, 4, 8],
-        "5": [0, 7],
-        # --- Accords suspendus ---
-        "sus2": [0, 2, 7],
-        "sus4": [0, 5, 7],
-        "7sus2": [0, 2, 7, 10],
-        "7sus4": [0, 5, 7, 10],
-        "9sus4": [0, 5, 7, 10, 14],
-        "13sus4": [0, 5, 7, 10, 14, 21],
-        # --- Accords "add" ---
-        "add9": [0, 4, 7, 14],
-        "m(add9)": [0, 3, 7, 14],
-        # --- Accords de 6ème ---
-        "6": [0, 4, 7, 9],
-        "m6": [0, 3, 7, 9],
-        "6/9": [0, 4, 7, 9, 14],
-        # --- Accords de 7ème ---
-        "7": [0, 4, 7, 10],
-        "maj7": [0, 4, 7, 11],
-        "m7": [0, 3, 7, 10],
-        "dim7": [0, 3, 6, 9],
-        "m7b5": [0, 3, 6, 10],
-        "m(maj7)": [0, 3, 7, 11],
-        "maj7b5": [0, 4, 6, 11],
-        "maj7#5": [0, 4, 8, 11],
-        "maj7#11": [0, 4, 7, 11, 18],
-        # --- Accords de dominante altérés ---
-        "7b5": [0, 4, 6, 10],
-        "7#5": [0, 4, 8, 10],
-        "7b9": [0, 4, 7, 10, 13],
-        "7b13": [0, 4, 7, 10, 20],
-        "7#9": [0, 4, 7, 10, 15],
-        "7#11": [0, 4, 7, 10, 18],
-        "7alt": [0, 4, 10, 13, 18],  # Altéré générique : b9 et #11
-        "7b9b5": [0, 4, 6, 10, 13],
-        "7b9#5": [0, 4, 8, 10, 13],
-        "7#9b5": [0, 4, 6, 10, 15],
-        "7#9#5": [0, 4, 8, 10, 15],
-        "7b9#9": [0, 4, 7, 10, 13, 15],  # double altération de la 9e
-        "7b9#11": [0, 4, 7, 10, 13, 18],
-        "7#9#11": [0, 4, 7, 10, 15, 18],
-        "7b9b13": [0, 4, 7, 10, 13, 20],  # b13 = A# = +20 demi-tons
-        "7#9b13": [0, 4, 7, 10, 15, 20],
-        # --- Accords de 9ème ---
-        "9": [0, 4, 7, 10, 14],
-        "maj9": [0, 4, 7, 11, 14],
-        "m9": [0, 3, 7, 10, 14],
-        # --- Accords de 11ème ---
-        "11": [0, 4, 7, 10, 14, 17],
-        "m11": [0, 3, 7, 10, 14, 17],
-        # --- Accords de 13ème ---
-        "13": [0, 4, 7, 10, 14, 21],
-        "13#11": [0, 4, 7, 10, 14, 18, 21],
-        "m13": [0, 3, 7, 10, 14, 21],
-        "maj13": [0, 4, 7, 11, 14, 21],
-    }
-
-    # Trier les qualités de la plus longue à la plus courte pour une analyse correcte
-    KNOWN_QUALITIES = sorted(CHORD_FORMULAS.keys(), key=len, reverse=True)
 
-    # --- Logique de la fonction ---
+@lru_cache(maxsize=4096)
+def _get_chord_note_indexes(chord_name: str) -> Optional[Tuple[int, ...]]:
     chord_name = chord_name.strip()
 
     # 1. Itérer sur les qualités connues pour trouver la bonne correspondance
-    for quality in KNOWN_QUALITIES:
+    for quality in QUALITY_PARSE_ORDER:
         if chord_name.endswith(quality):
             # Extraire la partie racine potentielle
             root_str = chord_name[: -len(quality)] if quality else chord_name
@@ -305,23 +281,37 @@ def get_chord_notes(chord_name: str) -> list[str] | None:
                 root_index = NOTE_INDEX_MAP[root_str]
 
                 # Construire les notes de l'accord
-                intervals = CHORD_FORMULAS[quality]
-                chord_notes = []
-                for interval in intervals:
-                    note_index = (root_index + interval) % 12
-                    chord_notes.append(NOTES[note_index])
-                return chord_notes
+                intervals = QUALITY_BY_NAME[quality].intervals
+                return tuple((root_index + interval) % 12 for interval in intervals)
 
     # Si aucune correspondance n'est trouvée après la boucle, l'accord est invalide
     return None
 
 
-def is_chord_diatonic(chord_name: str, key_tonic_str: str, mode_name: str) -> bool:
+def get_scale_mask(key_tonic_str: str, mode_name: str) -> int:
+    """
+    Renvoie les classes de hauteur d'une gamme sous forme de masque (bit i = note i).
+    Lève ValueError si la tonique ou le mode est invalide (voir get_scale_notes).
+    """
+    return _get_scale_mask(get_mode_registry(), key_tonic_str, mode_name)
+
+
+# Mis en cache par registre : un mode ajouté ou retiré ne laisse pas de masque périmé
+@lru_cache(maxsize=1024)
+def _get_scale_mask(registry: ModeRegistry, key_tonic_str: str, mode_name: str) -> int:
+    tonic_index = get_tonic_index(key_tonic_str)
+    mode_id = registry.resolve(mode_name)
+    if mode_id is None:
+        raise ValueError(f"Mode '{mode_name}' not found.")
+    return registry.scale_masks_by_tonic[tonic_index][mode_id]
+
+
+def is_chord_diatonic(chord_name: ChordLike, key_tonic_str: str, mode_name: str) -> bool:
     """
     Vérifie si toutes les notes d'un accord appartiennent à une gamme donnée.
 
     Args:
-        chord_name (str): Le nom de l'accord à vérifier (ex: "Am7", "Csus2").
+        chord_name (str | Chord): L'accord à vérifier (ex: "Am7", "Csus2").
         key_tonic_str (str): La note tonique de la gamme (ex: "C", "F#").
         mode_name (str): Le nom du mode (ex: "Ionian", "Dorian").
 
@@ -330,24 +320,30 @@ def is_chord_diatonic(chord_name: str, key_tonic_str: str, mode_name: str) -> bo
     """
     try:
         # 1. Obtenir les notes de la gamme de la tonalité.
-        scale_notes = get_scale_notes(key_tonic_str, mode_name)
-
-        # 2. Obtenir les notes constitutives de l'accord
-        chord_notes = get_chord_notes(chord_name)
-
-        # Gérer les cas où l'accord ou la gamme est invalide.
-        if not scale_notes or not chord_notes:
-            return False
-
+        scale_mask = get_scale_mask(key_tonic_str, mode_name)
     except ValueError:
         # Si get_scale_notes lève une erreur, l'accord n'est pas diatonique.
         return False
 
-    # 3. Vérifier si chaque note de l'accord est dans la gamme.
-    scale_notes_set = set(scale_notes)
-    for note in chord_notes:
-        if note not in scale_notes_set:
-            return False  # Au moins une note est en dehors de la gamme.
+    # 2. Obtenir les notes constitutives de l'accord
+    if isinstance(chord_name, Chord):
+        chord_mask = chord_name.mask
+    else:
+        chord_notes = _get_chord_note_indexes(chord_name)
+        chord_mask = sum(1 << note for note in chord_notes) if chord_notes else 0
+
+    # Gérer les cas où l'accord est invalide.
+    if not chord_mask:
+        return False
+
+    # 3. L'accord est diatonique si aucune de ses notes n'est en dehors de la gamme.
+    return chord_mask & ~scale_mask == 0
+
 
-    # 4. Si toutes les notes sont dans la gamme, l'accord est diatonique.
-    return True
+# Caches exposés par /metrics (succès, échecs, taille)
+CACHES = {
+    "parse_chord_name": _parse_chord_name,
+    "note_index": get_note_index,
+    "chord_note_indexes": _get_chord_note_indexes,
+    "scale_mask": _get_scale_mask,
+}
@@ -0,0 +1,51 @@
+import threading
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """Levée quand le délai alloué à une requête est dépassé."""
+
+
+class AnalysisCancelled(Exception):
+    """Levée quand l'analyse a été annulée (ex: le client s'est déconnecté)."""
+
+
+class Deadline:
+    """
+    Échéance d'une requête, partagée entre la boucle asynchrone et les threads
+    de calcul. Les étapes longues appellent `check()` entre deux sections pour
+    s'arrêter dès que le délai est dépassé ou que la requête a été annulée.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self._expires_at = time.monotonic() + timeout if timeout else None
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Temps restant en secondes, ou None si la requête n'a pas d'échéance."""
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def check(self) -> None:
+        """
+        Raises:
+            AnalysisCancelled: si la requête a été annulée.
+            DeadlineExceeded: si l'échéance est dépassée.
+        """
+        if self.cancelled:
+            raise AnalysisCancelled()
+        if self.expired():
+            raise DeadlineExceeded()
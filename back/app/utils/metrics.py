@@ -0,0 +1,184 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+# Bornes (en secondes) des histogrammes de durée
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    """Compteur étiqueté, au format texte de Prometheus."""
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """
+    Histogramme étiqueté à bornes fixes : une observation coûte une recherche
+    dichotomique et un verrou, assez peu pour rester actif en production.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        # [étiquettes] -> (effectif de chaque intervalle, +Inf compris ; somme)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(
+                label_values, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(c), t[0])) for key, (c, t) in self._series.items())
+        for label_values, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}"
+                )
+            labels = _labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "chords_analyze_stage_seconds", "Durée de chaque étape de /analyze.", ("stage",)
+)
+LLM_CALLS = Counter(
+    "chords_llm_calls_total", "Appels au modèle de détection, par issue.", ("model", "outcome")
+)
+LLM_SECONDS = Histogram("chords_llm_call_seconds", "Durée des appels au modèle.", ("model",))
+
+# Modèles étiquetés tels quels dans les métriques ; le nom vient du client, les autres
+# sont regroupés sous "other" pour que le nombre de séries reste borné.
+KNOWN_MODELS = frozenset({"gemini-2.5-flash", "gemini-2.5-flash-lite", "gemini-2.5-pro"})
+
+
+def model_label(model: str) -> str:
+    """Étiquette `model` des métriques : le nom du modèle s'il est connu, sinon "other"."""
+    return model if model in KNOWN_MODELS else "other"
+
+
+class StageTimer:
+    """
+    Chronomètre des étapes d'une requête : chaque durée est gardée pour l'en-tête
+    `Server-Timing` et, si un histogramme est fourni, ajoutée aux métriques.
+    """
+
+    def __init__(self, histogram: Optional[Histogram] = STAGE_SECONDS):
+        self.histogram = histogram
+        self.durations: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def record(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        if self.histogram is not None:
+            self.histogram.observe(seconds, name)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+            self._last = time.perf_counter()
+
+    def restart(self) -> None:
+        """Repart de maintenant pour le prochain `lap`."""
+        self._last = time.perf_counter()
+
+    def lap(self, name: str) -> None:
+        """Attribue à l'étape `name` le temps écoulé depuis la précédente."""
+        now = time.perf_counter()
+        self.record(name, now - self._last)
+        self._last = now
+
+    def server_timing(self) -> str:
+        """Valeur de l'en-tête `Server-Timing` (durées en millisecondes)."""
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.durations.items()
+        )
+
+
+def render_cache_metrics(caches: Mapping[str, Any]) -> List[str]:
+    """Succès, échecs, taille et taux de succès des caches `lru_cache` donnés."""
+    rows = [(name, function.cache_info()) for name, function in caches.items()]
+    lines = []
+    for metric, kind, description, read in (
+        ("chords_cache_hits_total", "counter", "Succès du cache.", lambda info: info.hits),
+        ("chords_cache_misses_total", "counter", "Échecs du cache.", lambda info: info.misses),
+        ("chords_cache_size", "gauge", "Entrées du cache.", lambda info: info.currsize),
+        (
+            "chords_cache_hit_ratio",
+            "gauge",
+            "Part des appels servis par le cache.",
+            lambda info: info.hits / (info.hits + info.misses) if info.hits + info.misses else 0,
+        ),
+    ):
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{cache="{name}"}} {read(info):g}' for name, info in rows]
+    return lines
+
+
+def render_metrics(caches: Mapping[str, Any]) -> str:
+    """Toutes les métriques, au format texte d'exposition de Prometheus."""
+    lines = STAGE_SECONDS.render() + LLM_CALLS.render() + LLM_SECONDS.render()
+    lines += render_cache_metrics(caches)
+    return "\n".join(lines) + "\n"
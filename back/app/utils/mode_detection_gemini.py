@@ -1,9 +1,12 @@
 import json
 import os
+import time
+from typing import Optional
 
 import google.generativeai as genai
 
-from constants import MODES_DATA
+from app.utils.metrics import LLM_CALLS, LLM_SECONDS, model_label
+from app.utils.modes import MODE_REGISTRY, get_mode_registry
 
 
 def extract_json_from_response(text: str) -> str:
@@ -18,20 +21,38 @@ def extract_json_from_response(text: str) -> str:
         raise ValueError("Aucun objet JSON valide n'a été trouvé dans la réponse de l'IA.")
 
 
-def detect_tonic_and_mode(progression: list[str], model) -> dict:
+def detect_tonic_and_mode(
+    progression: list[str], model, timeout: Optional[float] = None, registered_modes: bool = False
+) -> dict:
     """
     Détermine la tonique, le mode et les explications d'une progression
     en utilisant l'API Google Gemini pour une analyse plus fiable et performante.
+
+    `timeout` (en secondes) est transmis à l'appel Gemini pour que l'échéance
+    de la requête s'applique aussi à l'appel réseau. La variable d'environnement
+    `GEMINI_API_ENDPOINT` redirige les appels (API REST) vers un autre serveur.
+    Le prompt ne propose que les modes intégrés, sauf `registered_modes` qui y
+    ajoute les gammes enregistrées.
     """
 
     try:
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        endpoint = os.getenv("GEMINI_API_ENDPOINT")
+        if endpoint:
+            # Serveur compatible (ex: `benchmarks.fake_gemini` pour les tests de charge)
+            genai.configure(
+                api_key=os.getenv("GEMINI_API_KEY"),
+                transport="rest",
+                client_options={"api_endpoint": endpoint},
+            )
+        else:
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
     except Exception:
         raise ValueError(
             "Clé API Gemini non trouvée. Veuillez la définir dans vos variables d'environnement."
         )
 
     # --- Initialisation du modèle ---
+    model_name = model_label(str(model))
     model = genai.GenerativeModel(model)
 
     # --- Création du prompt ---
@@ -97,17 +118,23 @@ def detect_tonic_and_mode(progression: list[str], model) -> dict:
         "**Contraintes sur les valeurs :**\n"
         "- Les indices `start_index` et `end_index` sont basés sur 0.\n"
         f"- Le `mode` doit **obligatoirement** appartenir à la liste suivante : "
-        f"{list(MODES_DATA.keys())}.\n"
+        f"{list((get_mode_registry() if registered_modes else MODE_REGISTRY).names)}.\n"
         "--- \n"
         f"Progression à analyser : {' - '.join(progression)}"
     )
 
+    started = time.perf_counter()
     try:
-        response = model.generate_content(prompt)
+        request_options = {"timeout": timeout} if timeout else None
+        response = model.generate_content(prompt, request_options=request_options)
         raw_text = response.text.strip()
         json_string = extract_json_from_response(raw_text)
         analysis_data = json.loads(json_string)
+        LLM_CALLS.inc(model_name, "ok")
         return analysis_data
     except Exception as e:
+        LLM_CALLS.inc(model_name, "error")
         print(f"Une erreur est survenue: {e}")
         raise
+    finally:
+        LLM_SECONDS.observe(time.perf_counter() - started, model_name)
@@ -0,0 +1,268 @@
+import json
+import threading
+from itertools import combinations
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.qualities import QUALITIES, QUALITY_BY_NAME, QUALITY_IDS
+from constants import MODES_DATA
+
+# Définition d'un mode : (intervalles, qualités de 7e par degré ou None, décalage du relatif)
+ModeDefinition = Tuple[Sequence[int], Optional[Sequence[str]], Optional[int]]
+
+# Nombre minimal de notes pour empiler des tierces (quatre sons distincts)
+MIN_SCALE_SIZE = 5
+HEPTATONIC_SIZE = 7
+
+# Qualités de quatre sons, reconnues par leur masque (première qualité du registre)
+_SEVENTH_QUALITY_BY_MASK: Dict[int, str] = {}
+for _quality in QUALITIES:
+    if len(set(_quality.intervals)) == 4:
+        _SEVENTH_QUALITY_BY_MASK.setdefault(_quality.mask, _quality.name)
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+def _rotate(mask: int, tonic: int) -> int:
+    return ((mask << tonic) | (mask >> (12 - tonic))) & 0xFFF
+
+
+def derive_seventh_qualities(intervals: Sequence[int]) -> Tuple[str, ...]:
+    """
+    Qualités des accords de 7e diatoniques d'une gamme, obtenues en empilant les
+    tierces de la gamme (un degré sur deux) sur chaque degré.
+
+    Si l'empilement ne correspond à aucune qualité connue (gammes non heptatoniques),
+    la qualité la plus proche (le moins de notes différentes) est retenue.
+    """
+    size = len(intervals)
+    qualities = []
+    for degree in range(size):
+        root = intervals[degree]
+        mask = sum(1 << ((intervals[(degree + step) % size] - root) % 12) for step in (0, 2, 4, 6))
+        quality = _SEVENTH_QUALITY_BY_MASK.get(mask)
+        if quality is None:
+            quality = min(QUALITIES, key=lambda q: bin(q.mask ^ mask).count("1")).name
+        qualities.append(quality)
+    return tuple(qualities)
+
+
+def _validate_mode(name: str, intervals: Sequence[int], qualities: Optional[Sequence[str]]) -> None:
+    if not name:
+        raise ValueError("Le nom du mode ne peut pas être vide.")
+    if list(intervals) != sorted(set(intervals)) or not intervals or intervals[0] != 0:
+        raise ValueError(f"Mode '{name}' : intervalles croissants, sans doublon, depuis 0.")
+    if intervals[-1] > 11 or len(intervals) < MIN_SCALE_SIZE:
+        raise ValueError(f"Mode '{name}' : {MIN_SCALE_SIZE} à 12 notes comprises entre 0 et 11.")
+    if qualities is not None:
+        if len(qualities) != len(intervals):
+            raise ValueError(f"Mode '{name}' : une qualité par degré est attendue.")
+        unknown = [quality for quality in qualities if quality not in QUALITY_BY_NAME]
+        if unknown:
+            raise ValueError(f"Mode '{name}' : qualités inconnues {unknown}.")
+
+
+class ModeRegistry:
+    """
+    Registre compilé des modes (MODES_DATA, puis les gammes ajoutées).
+
+    Chaque mode reçoit un identifiant entier (son rang dans le registre). Les tables
+    sont exposées sous deux formes : des tuples pour les appels accord par accord,
+    et des tableaux NumPy en lecture seule pour les noyaux vectorisés. Rien n'est
+    modifié après la construction : le registre peut être partagé entre threads
+    et processus. Ajouter des modes construit un nouveau registre (voir `with_modes`).
+
+    Les qualités de 7e de chaque degré sont dérivées des intervalles lorsqu'elles
+    ne sont pas fournies.
+    """
+
+    def __init__(self, modes_data: Mapping[str, ModeDefinition]):
+        for name, (intervals, qualities, _) in modes_data.items():
+            _validate_mode(name, intervals, qualities)
+
+        self.definitions: Mapping[str, ModeDefinition] = MappingProxyType(dict(modes_data))
+        self.names: Tuple[str, ...] = tuple(modes_data)
+        self.ids = MappingProxyType({name: mode_id for mode_id, name in enumerate(self.names)})
+        # Index insensible à la casse (ex: "dorian" -> Dorian)
+        self.folded_ids = MappingProxyType(
+            {name.casefold(): mode_id for mode_id, name in enumerate(self.names)}
+        )
+
+        self.intervals: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(intervals) for intervals, _, _ in modes_data.values()
+        )
+        self.qualities: Tuple[Tuple[str, ...], ...] = tuple(
+            tuple(qualities) if qualities is not None else derive_seventh_qualities(intervals)
+            for intervals, qualities, _ in modes_data.values()
+        )
+        # Modes de sept notes : les seuls harmonisés degré par degré (I à VII)
+        self.heptatonic_names: Tuple[str, ...] = tuple(
+            name
+            for name, intervals in zip(self.names, self.intervals)
+            if len(intervals) == HEPTATONIC_SIZE
+        )
+
+        # Inverse intervalle -> degré, -1 si l'intervalle est chromatique au mode
+        degree_by_interval = [[-1] * 12 for _ in self.names]
+        for mode_id, intervals in enumerate(self.intervals):
+            for degree, interval in enumerate(intervals):
+                degree_by_interval[mode_id][interval] = degree
+        self.degree_by_interval: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(row) for row in degree_by_interval
+        )
+
+        # Masque de la gamme de chaque mode sur la tonique Do (bit i = note i)
+        self.scale_masks: Tuple[int, ...] = tuple(
+            sum(1 << interval for interval in intervals) for intervals in self.intervals
+        )
+        # Masque de chaque mode sur chacune des 12 toniques : [tonique][mode]
+        self.scale_masks_by_tonic: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(_rotate(mask, tonic) for mask in self.scale_masks) for tonic in range(12)
+        )
+        # Index des modes par masque de gamme (sur Do)
+        by_mask: Dict[int, List[int]] = {}
+        for mode_id, mask in enumerate(self.scale_masks):
+            by_mask.setdefault(mask, []).append(mode_id)
+        self.by_mask: Mapping[int, Tuple[int, ...]] = MappingProxyType(
+            {mask: tuple(mode_ids) for mask, mode_ids in by_mask.items()}
+        )
+
+        # Degré chromatique : premier mode (dans l'ordre du registre) qui le contient
+        borrowed: List[Optional[Tuple[int, int]]] = [None] * 12
+        for interval in range(12):
+            for mode_id, row in enumerate(self.degree_by_interval):
+                if row[interval] >= 0:
+                    borrowed[interval] = (mode_id, row[interval])
+                    break
+        self.borrowed_degree: Tuple[Optional[Tuple[int, int]], ...] = tuple(borrowed)
+
+        # --- Vues NumPy pour les noyaux vectorisés ---
+        self.degree_table = _read_only(np.array(self.degree_by_interval, dtype=np.int8))
+        # [mode][degré], complété par -1 au-delà du dernier degré du mode
+        max_degrees = max((len(intervals) for intervals in self.intervals), default=0)
+        self.quality_table = _read_only(
+            np.array(
+                [
+                    [QUALITY_IDS[quality] for quality in row] + [-1] * (max_degrees - len(row))
+                    for row in self.qualities
+                ],
+                dtype=np.int16,
+            ).reshape(len(self.names), max_degrees)
+        )
+        self.scale_mask_table = _read_only(np.array(self.scale_masks, dtype=np.int32))
+        # [tonique][mode]
+        self.context_mask_table = _read_only(
+            np.array(self.scale_masks_by_tonic, dtype=np.int32).reshape(12, len(self.names))
+        )
+        self.borrowed_quality_table = _read_only(
+            np.array(
+                [
+                    -1 if item is None else QUALITY_IDS[self.qualities[item[0]][item[1]]]
+                    for item in self.borrowed_degree
+                ],
+                dtype=np.int16,
+            )
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def resolve(self, mode_name: str) -> Optional[int]:
+        """Identifiant du mode, sans tenir compte de la casse (None si inconnu)."""
+        return self.folded_ids.get(mode_name.casefold())
+
+    def degree(self, mode_name: str, interval: int) -> int:
+        """Degré d'un intervalle dans un mode (0 = tonique), -1 s'il est chromatique."""
+        return self.degree_by_interval[self.ids[mode_name]][interval % 12]
+
+    def with_modes(self, modes_data: Mapping[str, ModeDefinition]) -> "ModeRegistry":
+        """Nouveau registre contenant ces modes en plus (les noms doivent être nouveaux)."""
+        duplicates = [name for name in modes_data if name.casefold() in self.folded_ids]
+        if duplicates:
+            raise ValueError(f"Modes déjà enregistrés : {duplicates}")
+        return ModeRegistry({**self.definitions, **modes_data})
+
+
+def generate_heptatonic_scales(registry: "ModeRegistry") -> Dict[str, ModeDefinition]:
+    """
+    Toutes les gammes de sept notes (462 ensembles contenant la tonique) absentes du
+    registre, nommées par leurs intervalles (ex: "Heptatonic 0-1-2-3-4-5-6").
+    """
+    generated: Dict[str, ModeDefinition] = {}
+    for others in combinations(range(1, 12), HEPTATONIC_SIZE - 1):
+        intervals = (0, *others)
+        if sum(1 << interval for interval in intervals) in registry.by_mask:
+            continue
+        name = "Heptatonic " + "-".join(str(interval) for interval in intervals)
+        generated[name] = (intervals, None, None)
+    return generated
+
+
+# --- Registre des modes intégrés (MODES_DATA) ---
+MODE_REGISTRY = ModeRegistry(MODES_DATA)
+
+# Registre courant : remplacé d'un bloc (jamais modifié) quand des modes sont ajoutés,
+# si bien qu'une analyse en cours garde un registre cohérent.
+_current_registry = MODE_REGISTRY
+_registry_lock = threading.Lock()
+
+
+def get_mode_registry() -> ModeRegistry:
+    """Registre courant : modes intégrés et gammes enregistrées depuis."""
+    return _current_registry
+
+
+def register_modes(modes_data: Mapping[str, ModeDefinition]) -> ModeRegistry:
+    """Ajoute des modes au registre courant et renvoie le nouveau registre."""
+    global _current_registry
+    with _registry_lock:
+        _current_registry = _current_registry.with_modes(modes_data)
+        return _current_registry
+
+
+def register_heptatonic_scales() -> ModeRegistry:
+    """Ajoute au registre toutes les gammes heptatoniques qui n'y sont pas encore."""
+    global _current_registry
+    with _registry_lock:
+        generated = generate_heptatonic_scales(_current_registry)
+        _current_registry = _current_registry.with_modes(generated)
+        return _current_registry
+
+
+def load_modes_file(path: str) -> ModeRegistry:
+    """
+    Enregistre les gammes d'un fichier de configuration JSON, au format de
+    POST /scales : {"scales": [{"name", "intervals", "qualities"?}], "heptatonic"?: bool}.
+    Avec `heptatonic`, toutes les gammes de sept notes sont ajoutées ensuite.
+    """
+    with open(path, encoding="utf-8") as file:
+        try:
+            config = json.load(file)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"Configuration des gammes invalide ({path}) : {error}")
+    if not isinstance(config, dict):
+        raise ValueError(f"Configuration des gammes invalide ({path}) : objet JSON attendu.")
+    try:
+        modes_data: Dict[str, ModeDefinition] = {
+            scale["name"]: (scale["intervals"], scale.get("qualities"), None)
+            for scale in config.get("scales", [])
+        }
+    except (KeyError, TypeError) as error:
+        raise ValueError(f"Gamme invalide dans {path} : {error!r}")
+    registry = register_modes(modes_data) if modes_data else get_mode_registry()
+    if config.get("heptatonic"):
+        registry = register_heptatonic_scales()
+    return registry
+
+
+def reset_mode_registry() -> ModeRegistry:
+    """Revient aux seuls modes intégrés (MODES_DATA)."""
+    global _current_registry
+    with _registry_lock:
+        _current_registry = MODE_REGISTRY
+        return _current_registry
@@ -0,0 +1,172 @@
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from app.utils.metrics import StageTimer
+
+T = TypeVar("T")
+
+# Un seul profilage à la fois : tracemalloc trace tout le processus
+_profiling_lock = threading.Lock()
+
+# Racine du backend, retirée des chemins du rapport
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _location(filename: str, lineno: int) -> str:
+    if filename.startswith(_ROOT):
+        filename = os.path.relpath(filename, _ROOT)
+    return f"{filename}:{lineno}"
+
+
+def _function(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({_location(code.co_filename, code.co_firstlineno)})"
+
+
+class RequestProfiler(StageTimer):
+    """
+    Profilage d'une seule requête : mémoire allouée par étape (tracemalloc) et
+    échantillonnage de la pile des threads qui exécutent la requête.
+
+    Les fonctions exécutées pour la requête sont enveloppées par `traced`, ce qui
+    désigne le thread à échantillonner. tracemalloc trace tout le processus : les
+    allocations des requêtes concurrentes sont comptées aussi. Les durées ne sont
+    pas ajoutées aux histogrammes de /metrics, un profilage ralentissant la requête.
+    """
+
+    def __init__(self, interval: float = 0.001, top: int = 20):
+        super().__init__(None)
+        self.interval = interval
+        self.top = top
+        self.memory: Dict[str, Dict[str, int]] = {}
+        self._thread_id: Optional[int] = None
+        self._line_samples: Counter[str] = Counter()
+        self._self_samples: Counter[str] = Counter()
+        self._total_samples: Counter[str] = Counter()
+        self._sample_count = 0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started_tracing = False
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._memory_mark = 0
+        self._report: Optional[Dict[str, Any]] = None
+
+    def start(self) -> bool:
+        """Démarre le profilage ; False si un autre est déjà en cours."""
+        if not _profiling_lock.acquire(blocking=False):
+            return False
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        self._baseline = tracemalloc.take_snapshot()
+        self.restart()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        return True
+
+    def traced(self, func: Callable[..., T]) -> Callable[..., T]:
+        """Enveloppe `func` pour que le thread qui l'exécute soit échantillonné."""
+
+        def run(*args: Any) -> T:
+            self._thread_id = threading.get_ident()
+            try:
+                return func(*args)
+            finally:
+                self._thread_id = None
+
+        return run
+
+    def restart(self) -> None:
+        super().restart()
+        tracemalloc.reset_peak()
+        self._memory_mark = tracemalloc.get_traced_memory()[0]
+
+    def record(self, name: str, seconds: float) -> None:
+        super().record(name, seconds)
+        current, peak = tracemalloc.get_traced_memory()
+        stage = self.memory.setdefault(name, {"allocated_bytes": 0, "peak_bytes": 0})
+        stage["allocated_bytes"] += current - self._memory_mark
+        stage["peak_bytes"] = max(stage["peak_bytes"], peak - self._memory_mark)
+        tracemalloc.reset_peak()
+        self._memory_mark = current
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            thread_id = self._thread_id
+            frame = sys._current_frames().get(thread_id) if thread_id is not None else None
+            if frame is None:
+                continue
+            self._sample_count += 1
+            self._line_samples[_location(frame.f_code.co_filename, frame.f_lineno)] += 1
+            self._self_samples[_function(frame)] += 1
+            # Temps inclusif : chaque fonction de la pile, comptée une fois
+            seen = set()
+            while frame is not None:
+                seen.add(_function(frame))
+                frame = frame.f_back
+            self._total_samples.update(seen)
+
+    def stop(self) -> Dict[str, Any]:
+        """Arrête le profilage (une seule fois) et renvoie le rapport."""
+        if self._report is not None:
+            return self._report
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        retained: List[Dict[str, Any]] = []
+        if self._baseline is not None:
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)]
+            )
+            for stat in snapshot.compare_to(self._baseline, "lineno")[: self.top]:
+                frame = stat.traceback[0]
+                retained.append(
+                    {
+                        "location": _location(frame.filename, frame.lineno),
+                        "size_diff_bytes": stat.size_diff,
+                        "count_diff": stat.count_diff,
+                    }
+                )
+        if self._started_tracing:
+            tracemalloc.stop()
+        if self._sampler is not None:
+            # Le verrou n'est détenu que si `start` a réussi
+            _profiling_lock.release()
+
+        self._report = {
+            "stages": {
+                name: {"ms": round(seconds * 1000, 3), **self.memory.get(name, {})}
+                for name, seconds in self.durations.items()
+            },
+            "retained_allocations": retained,
+            "sample_interval_ms": self.interval * 1000,
+            "samples": self._sample_count,
+            "hottest_lines": [
+                {"location": location, "samples": count}
+                for location, count in self._line_samples.most_common(self.top)
+            ],
+            # Temps propre d'abord, puis temps inclusif (fonctions appelantes)
+            "hottest_functions": [
+                {
+                    "function": function,
+                    "self_samples": self._self_samples[function],
+                    "total_samples": self._total_samples[function],
+                }
+                for function in sorted(
+                    self._total_samples,
+                    key=lambda name: (self._self_samples[name], self._total_samples[name]),
+                    reverse=True,
+                )[: self.top]
+            ],
+        }
+        return self._report
+
+
+def profiled_call(profiler: Optional[RequestProfiler], func: Callable[..., T]) -> Callable[..., T]:
+    """`func`, échantillonnée si la requête est profilée."""
+    return profiler.traced(func) if profiler is not None else func
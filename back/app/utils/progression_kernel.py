@@ -0,0 +1,303 @@
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, TypedDict, Union
+
+import numpy as np
+
+from app.utils.chords_analyzer import QualityAnalysisItem
+from app.utils.common import (
+    ChordLike,
+    as_chord,
+    chord_name_of,
+    format_numeral,
+    get_note_from_index,
+)
+from app.utils.modes import MODE_REGISTRY, ModeRegistry, get_mode_registry
+from app.utils.qualities import QUALITY_IDS, QUALITY_NAMES
+from constants import CHROMATIC_DEGREES_MAP
+
+# Les tables sont lues dans le registre courant (voir `get_mode_registry`) ; les modes
+# intégrés gardent le même identifiant dans tous les registres.
+
+# Gestion spécifique de la sensible en mode mineur (V7)
+_AEOLIAN_ID = MODE_REGISTRY.ids["Aeolian"]
+_LEADING_TONE_QUALITIES = np.array([QUALITY_IDS["7"], QUALITY_IDS["M"]], dtype=np.int16)
+
+
+class EncodedProgression(NamedTuple):
+    """Progression encodée en tableaux d'entiers (un élément par accord)."""
+
+    chords: List[ChordLike]
+    valid: np.ndarray  # bool : l'accord a pu être analysé
+    roots: np.ndarray  # index chromatique de la fondamentale
+    quality_ids: np.ndarray  # index dans QUALITY_NAMES
+    masks: np.ndarray  # classes de hauteur de l'accord
+    tonics: np.ndarray  # tonique du contexte (segment)
+    mode_ids: np.ndarray  # mode du contexte
+    registry: ModeRegistry  # registre auquel renvoient les identifiants de mode
+
+
+class ProgressionAnalysis(NamedTuple):
+    """Résultat vectorisé de l'analyse, converti en dictionnaires à la sérialisation."""
+
+    intervals: np.ndarray  # intervalle fondamentale / tonique (0-11)
+    degrees: np.ndarray  # degré diatonique (0-6), -1 si chromatique
+    expected_quality_ids: np.ndarray  # qualité attendue, -1 si aucune
+    is_diatonic: np.ndarray  # bool
+
+
+class DiatonicFit(NamedTuple):
+    """Ajustement d'une progression à tous les contextes, tableaux [tonique (12)][mode]."""
+
+    diatonic_counts: np.ndarray  # nombre d'accords diatoniques
+    out_of_key_masks: np.ndarray  # classes de hauteur hors de la gamme (bit i = note i)
+    first_non_diatonic: np.ndarray  # index du premier accord non diatonique, -1 si aucun
+    mode_names: Tuple[str, ...]  # nom de chaque colonne
+
+
+class DiatonicFitItem(TypedDict):
+    tonic: str
+    mode: str
+    diatonic_count: int
+    out_of_key_notes: List[str]
+    first_non_diatonic_index: Optional[int]
+
+
+def encode_progression(
+    progression: Sequence[ChordLike],
+    tonics: Union[int, Sequence[int]],
+    modes: Union[str, Sequence[str]],
+) -> EncodedProgression:
+    """
+    Encode une progression et ses contextes tonals (un par accord, ou un seul pour
+    toute la progression).
+    """
+    chords = [as_chord(chord) for chord in progression]
+    size = len(chords)
+    registry = get_mode_registry()
+    mode_ids = registry.ids
+    if isinstance(modes, str):
+        mode_id_list = [mode_ids[modes]] * size
+    else:
+        mode_id_list = [mode_ids[mode_name] for mode_name in modes]
+
+    return EncodedProgression(
+        chords=list(progression),
+        valid=np.array([chord is not None for chord in chords], dtype=bool),
+        roots=np.array([chord.root if chord else 0 for chord in chords], dtype=np.int16),
+        quality_ids=np.array(
+            [chord.quality_id if chord else 0 for chord in chords], dtype=np.int16
+        ),
+        masks=np.array([chord.mask if chord else 0 for chord in chords], dtype=np.int32),
+        tonics=np.broadcast_to(np.asarray(tonics, dtype=np.int16), (size,)),
+        mode_ids=np.array(mode_id_list, dtype=np.int16).reshape(size),
+        registry=registry,
+    )
+
+
+def analyze_encoded(encoded: EncodedProgression) -> ProgressionAnalysis:
+    """
+    Noyau vectorisé équivalent à `analyze_chord_in_context`, appliqué à tous les
+    accords à la fois.
+    """
+    registry = encoded.registry
+    intervals = (encoded.roots - encoded.tonics) % 12
+    degrees = registry.degree_table[encoded.mode_ids, intervals]
+    in_mode = degrees >= 0
+
+    expected = np.where(
+        in_mode,
+        registry.quality_table[encoded.mode_ids, np.maximum(degrees, 0)],
+        registry.borrowed_quality_table[intervals],
+    )
+    leading_tone = (
+        (encoded.mode_ids == _AEOLIAN_ID)
+        & (intervals == 7)
+        & np.isin(encoded.quality_ids, _LEADING_TONE_QUALITIES)
+    )
+    expected = np.where(leading_tone, encoded.quality_ids, expected)
+
+    # Rotation de la gamme sur la tonique du contexte (sur 12 bits)
+    base_masks = registry.scale_mask_table[encoded.mode_ids]
+    scale_masks = ((base_masks << encoded.tonics) | (base_masks >> (12 - encoded.tonics))) & 0xFFF
+    is_diatonic = (encoded.masks != 0) & ((encoded.masks & ~scale_masks) == 0)
+
+    return ProgressionAnalysis(intervals, degrees, expected, is_diatonic)
+
+
+@lru_cache(maxsize=4096)
+def degree_numeral(interval: int, quality_id: int) -> str:
+    """Chiffrage d'un accord de qualité `quality_id`, à `interval` demi-tons de la tonique."""
+    return format_numeral(CHROMATIC_DEGREES_MAP[interval], QUALITY_NAMES[quality_id])
+
+
+@lru_cache(maxsize=4096)
+def expected_chord_name(tonic: int, interval: int, quality_id: int) -> str:
+    """Nom de l'accord sur ce degré de la tonalité (bémol pour les degrés bémolisés)."""
+    expected_root_index = (tonic + interval) % 12
+    expected_root_name = get_note_from_index(expected_root_index)
+    if "b" in CHROMATIC_DEGREES_MAP[interval] and "#" in expected_root_name:
+        expected_root_name = get_note_from_index(expected_root_index + 1) + "b"
+    return expected_root_name + QUALITY_NAMES[quality_id]
+
+
+def serialize_analysis(
+    encoded: EncodedProgression, analysis: ProgressionAnalysis
+) -> List[QualityAnalysisItem]:
+    """Convertit le résultat vectorisé au format `QualityAnalysisItem`."""
+    items: List[QualityAnalysisItem] = []
+    rows = zip(
+        encoded.chords,
+        encoded.valid.tolist(),
+        encoded.quality_ids.tolist(),
+        encoded.tonics.tolist(),
+        analysis.intervals.tolist(),
+        analysis.expected_quality_ids.tolist(),
+        analysis.is_diatonic.tolist(),
+    )
+    for chord, valid, quality_id, tonic, interval, expected_id, is_diatonic in rows:
+        if not valid:
+            items.append(
+                {
+                    "chord": chord_name_of(chord),
+                    "found_numeral": None,
+                    "expected_numeral": None,
+                    "found_quality": None,
+                    "expected_quality": None,
+                    "expected_chord_name": None,
+                    "is_diatonic": None,
+                }
+            )
+            continue
+
+        has_expected = expected_id >= 0
+        items.append(
+            {
+                "chord": chord_name_of(chord),
+                "found_numeral": degree_numeral(interval, quality_id),
+                "expected_numeral": degree_numeral(interval, expected_id) if has_expected else None,
+                "found_quality": QUALITY_NAMES[quality_id],
+                "expected_quality": QUALITY_NAMES[expected_id] if has_expected else None,
+                "expected_chord_name": (
+                    expected_chord_name(tonic, interval, expected_id) if has_expected else None
+                ),
+                "is_diatonic": is_diatonic,
+            }
+        )
+    return items
+
+
+def analyze_progression(
+    progression: Sequence[ChordLike],
+    tonics: Union[int, Sequence[int]],
+    modes: Union[str, Sequence[str]],
+) -> List[QualityAnalysisItem]:
+    """Analyse toute une progression en un seul passage vectorisé."""
+    encoded = encode_progression(progression, tonics, modes)
+    return serialize_analysis(encoded, analyze_encoded(encoded))
+
+
+def diatonic_fit(progression: Sequence[ChordLike]) -> DiatonicFit:
+    """
+    Confronte toute la progression aux 12 toniques x modes du registre courant en un seul
+    passage : chaque accord est comparé à chaque gamme par opérations sur les masques.
+    Seuls les masques distincts sont comparés, pondérés par leur nombre d'occurrences :
+    un morceau entier n'en compte que quelques dizaines. Les accords inconnus (sans
+    notes) sont ignorés.
+    """
+    chords = [as_chord(chord) for chord in progression]
+    masks = np.array([chord.mask if chord else 0 for chord in chords], dtype=np.int32)
+    registry = get_mode_registry()
+    context_masks = registry.context_mask_table
+    shape = context_masks.shape
+    if not masks.any():
+        return DiatonicFit(
+            np.zeros(shape, dtype=np.int64),
+            np.zeros(shape, dtype=np.int32),
+            np.full(shape, -1, dtype=np.int64),
+            registry.names,
+        )
+
+    # Masques distincts, première position et nombre d'occurrences de chacun
+    unique_masks, first_indexes, counts = np.unique(masks, return_index=True, return_counts=True)
+    known = unique_masks != 0
+    unique_masks, first_indexes, counts = unique_masks[known], first_indexes[known], counts[known]
+    # Notes de chaque masque distinct hors de chaque gamme : [masque][tonique][mode]
+    outside = unique_masks[:, None, None] & ~context_masks[None, :, :]
+    non_diatonic = outside != 0
+    first_non_diatonic = np.where(non_diatonic, first_indexes[:, None, None], len(masks)).min(
+        axis=0
+    )
+    return DiatonicFit(
+        diatonic_counts=np.tensordot(counts, ~non_diatonic, axes=1),
+        out_of_key_masks=np.bitwise_or.reduce(outside, axis=0),
+        first_non_diatonic=np.where(first_non_diatonic < len(masks), first_non_diatonic, -1),
+        mode_names=registry.names,
+    )
+
+
+def serialize_fit(fit: DiatonicFit) -> List[List[DiatonicFitItem]]:
+    """Convertit la matrice d'ajustement en lignes (une par tonique) de cellules (une par mode)."""
+    rows = zip(
+        fit.diatonic_counts.tolist(),
+        fit.out_of_key_masks.tolist(),
+        fit.first_non_diatonic.tolist(),
+    )
+    matrix: List[List[DiatonicFitItem]] = []
+    for tonic, (counts, out_of_key_masks, first_indexes) in enumerate(rows):
+        matrix.append(
+            [
+                {
+                    "tonic": get_note_from_index(tonic),
+                    "mode": mode_name,
+                    "diatonic_count": count,
+                    "out_of_key_notes": [
+                        get_note_from_index(note) for note in range(12) if out_of_key >> note & 1
+                    ],
+                    "first_non_diatonic_index": None if first < 0 else first,
+                }
+                for mode_name, count, out_of_key, first in zip(
+                    fit.mode_names, counts, out_of_key_masks, first_indexes
+                )
+            ]
+        )
+    return matrix
+
+
+def detect_tonic_and_mode_locally(progression: Sequence[ChordLike]) -> Dict[str, Any]:
+    """
+    Détection hors ligne de la tonalité, au même format que `detect_tonic_and_mode`
+    (un seul segment) : la tonique x mode qui contient le plus d'accords de la
+    progression. À égalité, la tonique la plus souvent fondamentale d'un accord (le
+    premier et le dernier accord comptant double) l'emporte, puis le premier mode du
+    registre (les modes usuels d'abord).
+    """
+    chords = [as_chord(chord) for chord in progression]
+    known = [chord for chord in chords if chord is not None and chord.mask]
+    if not known:
+        raise ValueError("Aucun accord reconnu dans la progression.")
+    fit = diatonic_fit(progression)
+    # Départage des toniques : accords posés sur la tonique, puis premier et dernier accord
+    tonic_bonus = np.bincount([chord.root for chord in known], minlength=12)
+    tonic_bonus[known[-1].root] += 1
+    tonic_bonus[known[0].root] += 1
+    scores = fit.diatonic_counts * (len(known) + 3) + tonic_bonus[:, None]
+    tonic_index, mode_id = np.unravel_index(int(scores.argmax()), scores.shape)
+    tonic, mode_name = get_note_from_index(int(tonic_index)), fit.mode_names[mode_id]
+    count = int(fit.diatonic_counts[tonic_index, mode_id])
+    explanation = f"{count} accords sur {len(progression)} sont diatoniques à {tonic} {mode_name}."
+    return {
+        "global_analysis": {"tonic": tonic, "mode": mode_name, "explanation": explanation},
+        "harmonic_segments": [
+            {
+                "start_index": 0,
+                "end_index": len(progression) - 1,
+                "tonic": tonic,
+                "mode": mode_name,
+                "explanation": explanation,
+            }
+        ],
+    }
+
+
+# Caches exposés par /metrics (succès, échecs, taille)
+CACHES = {"numeral": degree_numeral, "expected_chord_name": expected_chord_name}
@@ -0,0 +1,85 @@
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Tuple
+
+from constants import CHORD_FORMULAS, CORE_QUALITIES, NUMERAL_SUFFIXES, TRIAD_REDUCTION_OVERRIDES
+
+# Triade désignée par (tierce, quinte), en demi-tons depuis la fondamentale
+_TRIADS_BY_THIRD_AND_FIFTH = {
+    (4, 7): "",
+    (3, 7): "m",
+    (3, 6): "dim",
+    (4, 8): "aug",
+}
+
+
+class Quality(NamedTuple):
+    """Qualité d'accord et tous ses attributs dérivés."""
+
+    id: int
+    name: str  # ex: "m7b5"
+    core: str  # Qualité de base : major, minor, dominant, diminished...
+    intervals: Tuple[int, ...]  # Formule en demi-tons depuis la fondamentale
+    mask: int  # Classes de hauteur sur la fondamentale Do (bit i = note i)
+    triad: str  # Réduction à la triade (ex: "m7" -> "m", "maj7" -> "")
+    numeral_suffix: str  # Suffixe du chiffrage romain (ex: "m7b5" -> "ø7")
+    is_dominant: bool  # Peut fonctionner comme un accord de dominante
+    is_triad: bool  # Accord de trois sons (triade simple ou suspendue)
+
+
+def _triad_reduction(name: str, mask: int) -> str:
+    if name in TRIAD_REDUCTION_OVERRIDES:
+        return TRIAD_REDUCTION_OVERRIDES[name]
+    third = 4 if mask & (1 << 4) else 3 if mask & (1 << 3) else None
+    fifth = next((fifth for fifth in (7, 6, 8) if mask & (1 << fifth)), None)
+    if third is None:
+        # Pas de tierce : accord suspendu ou power chord
+        if mask & (1 << 5):
+            return "sus4"
+        if mask & (1 << 2):
+            return "sus2"
+        return "5"
+    return _TRIADS_BY_THIRD_AND_FIFTH.get((third, fifth or 7), "")
+
+
+def _build_quality(quality_id: int, name: str) -> Quality:
+    if name not in CHORD_FORMULAS:
+        raise ValueError(f"La qualité '{name}' n'a pas de formule dans CHORD_FORMULAS.")
+
+    core = CORE_QUALITIES[name]
+    intervals = tuple(CHORD_FORMULAS[name])
+    mask = sum(1 << (interval % 12) for interval in set(intervals))
+    is_triad = len(intervals) == 3
+    return Quality(
+        id=quality_id,
+        name=name,
+        core=core,
+        intervals=intervals,
+        mask=mask,
+        triad=_triad_reduction(name, mask),
+        numeral_suffix=NUMERAL_SUFFIXES.get(name, ""),
+        # Les accords de dominante, et les triades majeures simples (sans extension)
+        is_dominant=core == "dominant" or (is_triad and mask == 0b10010001),
+        is_triad=is_triad,
+    )
+
+
+# --- Registre unique, construit une fois à l'import ---
+QUALITIES: Tuple[Quality, ...] = tuple(
+    _build_quality(quality_id, name) for quality_id, name in enumerate(CORE_QUALITIES)
+)
+if set(CHORD_FORMULAS) != set(CORE_QUALITIES):
+    raise ValueError("CORE_QUALITIES et CHORD_FORMULAS doivent définir les mêmes qualités.")
+
+QUALITY_NAMES: Tuple[str, ...] = tuple(quality.name for quality in QUALITIES)
+QUALITY_IDS: Mapping[str, int] = MappingProxyType({q.name: q.id for q in QUALITIES})
+QUALITY_BY_NAME: Mapping[str, Quality] = MappingProxyType({q.name: q for q in QUALITIES})
+
+# Ordre de reconnaissance des suffixes : du plus long au plus court
+QUALITY_PARSE_ORDER: Tuple[str, ...] = tuple(sorted(QUALITY_NAMES, key=len, reverse=True))
+
+
+def get_quality(name: Optional[str]) -> Optional[Quality]:
+    """Renvoie la qualité enregistrée sous ce nom, ou None si elle est inconnue."""
+    if name is None:
+        return None
+    return QUALITY_BY_NAME.get(name)
@@ -0,0 +1,112 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Longueur minimale (en accords) d'un bloc répété pour être dédupliqué.
+MIN_BLOCK_LENGTH = 4
+# Nombre maximal d'occurrences antérieures comparées pour une même fenêtre.
+MAX_CANDIDATES = 8
+
+_HASH_BASE = 1_000_003
+_HASH_MOD = (1 << 61) - 1
+
+
+class CompressedProgression(NamedTuple):
+    # Matériau unique de la progression, dans l'ordre de première apparition.
+    unique: List[str]
+    # Pour chaque accord de la progression d'origine, son index dans `unique`.
+    source_index: List[int]
+
+
+def compress_progression(
+    progression: List[str], min_block_length: int = MIN_BLOCK_LENGTH
+) -> CompressedProgression:
+    """
+    Repère les blocs répétés (couplets, refrains) d'une progression par hachage
+    glissant (Rabin-Karp) et ne conserve qu'une occurrence de chacun.
+
+    La progression est parcourue de gauche à droite : à chaque position, on cherche
+    la plus longue répétition d'un passage déjà vu (d'au moins `min_block_length`
+    accords, sans chevauchement). Si elle existe, ses accords pointent vers ceux de
+    l'occurrence précédente ; sinon l'accord est ajouté au matériau unique.
+
+    Returns:
+        CompressedProgression: le matériau unique et la correspondance index d'origine
+        -> index dans le matériau unique.
+    """
+    n = len(progression)
+    codes_by_chord: Dict[str, int] = {}
+    codes = [codes_by_chord.setdefault(chord, len(codes_by_chord) + 1) for chord in progression]
+
+    # Hachages préfixes : hash(codes[i:i+m]) se calcule en O(1)
+    prefix = [0] * (n + 1)
+    for i, code in enumerate(codes):
+        prefix[i + 1] = (prefix[i] * _HASH_BASE + code) % _HASH_MOD
+    base_power = pow(_HASH_BASE, min_block_length, _HASH_MOD)
+
+    def window_hash(start: int) -> int:
+        return (prefix[start + min_block_length] - prefix[start] * base_power) % _HASH_MOD
+
+    windows: Dict[int, List[int]] = {}
+    next_window = 0
+    unique: List[str] = []
+    source_index = [0] * n
+
+    i = 0
+    while i < n:
+        best_start, best_length = -1, 0
+        if i + min_block_length <= n:
+            for start in windows.get(window_hash(i), [])[-MAX_CANDIDATES:]:
+                length = 0
+                while (
+                    i + length < n
+                    and start + length < i
+                    and codes[start + length] == codes[i + length]
+                ):
+                    length += 1
+                if length > best_length:
+                    best_start, best_length = start, length
+
+        if best_length >= min_block_length:
+            for k in range(best_length):
+                source_index[i + k] = source_index[best_start + k]
+            i += best_length
+        else:
+            source_index[i] = len(unique)
+            unique.append(progression[i])
+            i += 1
+
+        # Enregistre les fenêtres désormais entièrement traitées
+        while next_window + min_block_length <= i:
+            windows.setdefault(window_hash(next_window), []).append(next_window)
+            next_window += 1
+
+    return CompressedProgression(unique, source_index)
+
+
+def expand_segments(
+    segments: List[Dict[str, Any]], source_index: List[int]
+) -> List[Dict[str, Any]]:
+    """
+    Reporte sur la progression d'origine des segments harmoniques calculés sur
+    le matériau unique : chaque accord hérite du segment de son occurrence unique,
+    puis les accords consécutifs d'un même segment sont regroupés.
+    """
+    unique_length = max(source_index, default=-1) + 1
+    segment_of_unique: List[Optional[int]] = [None] * unique_length
+    for index, segment in enumerate(segments):
+        start = max(segment["start_index"], 0)
+        end = min(segment["end_index"], unique_length - 1)
+        for u in range(start, end + 1):
+            if segment_of_unique[u] is None:
+                segment_of_unique[u] = index
+
+    expanded: List[Dict[str, Any]] = []
+    current_id: Optional[int] = None
+    for i, u in enumerate(source_index):
+        segment_id = segment_of_unique[u]
+        if segment_id is not None and segment_id == current_id:
+            expanded[-1]["end_index"] = i
+        elif segment_id is not None:
+            expanded.append({**segments[segment_id], "start_index": i, "end_index": i})
+        current_id = segment_id
+
+    return expanded
@@ -0,0 +1,181 @@
+from functools import lru_cache
+from typing import Dict, List, Mapping, NamedTuple, NotRequired, Sequence, Tuple, TypedDict
+
+import numpy as np
+
+from app.utils.common import ChordLike, as_chord, chord_name_of, get_note_index
+from app.utils.qualities import QUALITY_BY_NAME
+from constants import NOTES
+
+# Même convention que le front (sampler.js) : hauteur = octave * 12 + classe de hauteur,
+# et l'accord à l'état fondamental part de l'octave 3.
+BASE_OCTAVE = 3
+# Étendue du clavier du front (keyboard.js : de C3 à C6)
+DEFAULT_LOW = "C3"
+DEFAULT_HIGH = "C6"
+
+
+class VoiceLeadingWeights(NamedTuple):
+    """Poids du coût d'enchaînement, repris de l'import rapide du front."""
+
+    soprano: float = 3.0
+    bass: float = 2.0
+    overall: float = 1.0
+    repeated_bass: float = 10.0
+    # Écart au centre du registre, pour éviter que la progression ne dérive
+    centering: float = 0.1
+
+
+class VoicedChord(TypedDict):
+    chord: str
+    inversion: int  # Valeur de `ChordItem.inversion` (renversement et octave)
+    notes: List[str]  # Ex: ["E3", "G3", "C4"]
+    duration: NotRequired[int]
+
+
+class VoiceLeading(TypedDict):
+    cost: float
+    chords: List[VoicedChord]
+
+
+def parse_pitch(note: str) -> int:
+    """Hauteur d'une note avec octave (ex: "C#4"), dans la convention du front."""
+    name, octave = note[:-1], note[-1:]
+    if not octave.isdigit() or not name:
+        raise ValueError(f"Note invalide : '{note}'")
+    return int(octave) * 12 + get_note_index(name)
+
+
+def pitch_name(pitch: int) -> str:
+    return f"{NOTES[pitch % 12]}{pitch // 12}"
+
+
+def voicing_for_inversion(chord: ChordLike, inversion: int) -> Tuple[int, ...]:
+    """
+    Hauteurs jouées pour une valeur de `inversion`, comme `getNotesForChord` du front :
+    les `inversion % n` premières notes montent d'une octave, puis tout l'accord est
+    décalé de `inversion // n` octaves.
+    """
+    parsed = as_chord(chord)
+    if parsed is None:
+        raise ValueError(f"Accord non reconnu : '{chord_name_of(chord)}'")
+    intervals = QUALITY_BY_NAME[parsed.quality].intervals
+    size = len(intervals)
+    octave_shift, rotation = divmod(inversion, size)
+    base = BASE_OCTAVE * 12 + parsed.root
+    return tuple(
+        sorted(
+            base + interval + 12 * (index < rotation) + 12 * octave_shift
+            for index, interval in enumerate(intervals)
+        )
+    )
+
+
+@lru_cache(maxsize=4096)
+def voicing_candidates(chord_name: str, low: int, high: int) -> Tuple[Tuple[int, ...], np.ndarray]:
+    """
+    Valeurs de `inversion` dont toutes les notes tiennent dans [low, high], et les
+    hauteurs correspondantes (une ligne par candidat, notes triées).
+    """
+    chord = as_chord(chord_name)
+    if chord is None:
+        raise ValueError(f"Accord non reconnu : '{chord_name}'")
+    size = len(QUALITY_BY_NAME[chord.quality].intervals)
+    # Assez de valeurs pour balayer tout le registre, par octave et par renversement
+    span = (high - low) // 12 + 2
+    inversions: List[int] = []
+    voicings: List[Tuple[int, ...]] = []
+    for inversion in range(-span * size, span * size):
+        voicing = voicing_for_inversion(chord, inversion)
+        if voicing[0] >= low and voicing[-1] <= high:
+            inversions.append(inversion)
+            voicings.append(voicing)
+    if not voicings:
+        raise ValueError(f"L'accord '{chord_name}' ne tient pas dans le registre demandé.")
+    array = np.array(voicings, dtype=np.int32)
+    array.flags.writeable = False
+    return tuple(inversions), array
+
+
+def transition_costs(
+    previous: np.ndarray, current: np.ndarray, weights: VoiceLeadingWeights
+) -> np.ndarray:
+    """Coût de chaque enchaînement candidat précédent -> candidat courant (matrice k x k)."""
+    soprano = np.abs(previous[:, None, -1] - current[None, :, -1])
+    bass = np.abs(previous[:, None, 0] - current[None, :, 0])
+    size = min(previous.shape[1], current.shape[1])
+    overall = np.abs(previous[:, None, :size] - current[None, :, :size]).sum(axis=2) / size
+    costs: np.ndarray = (
+        weights.soprano * soprano
+        + weights.bass * bass
+        + weights.overall * overall
+        + weights.repeated_bass * (bass == 0)
+    )
+    return costs
+
+
+def optimize_voicings(
+    progression: Sequence[ChordLike],
+    low: str = DEFAULT_LOW,
+    high: str = DEFAULT_HIGH,
+    weights: VoiceLeadingWeights = VoiceLeadingWeights(),
+) -> VoiceLeading:
+    """
+    Choisit le renversement (et l'octave) de chaque accord pour minimiser le mouvement
+    des voix sur toute la progression, par programmation dynamique (Viterbi) :
+    O(n · k²) pour k voicings candidats par accord.
+    """
+    low_pitch, high_pitch = parse_pitch(low), parse_pitch(high)
+    if low_pitch > high_pitch:
+        raise ValueError("La note la plus grave doit être sous la plus aiguë.")
+    if not progression:
+        return {"cost": 0.0, "chords": []}
+
+    names = [chord_name_of(chord) for chord in progression]
+    candidates = [voicing_candidates(name, low_pitch, high_pitch) for name in names]
+    center = (low_pitch + high_pitch) / 2
+
+    def node_costs(voicings: np.ndarray) -> np.ndarray:
+        costs: np.ndarray = weights.centering * np.abs(voicings.mean(axis=1) - center)
+        return costs
+
+    # Coût minimal pour finir sur chaque candidat, et meilleur prédécesseur
+    total = node_costs(candidates[0][1])
+    backpointers: List[np.ndarray] = []
+    for (_, previous), (_, current) in zip(candidates, candidates[1:]):
+        step = total[:, None] + transition_costs(previous, current, weights)
+        best_previous = step.argmin(axis=0)
+        total = step[best_previous, np.arange(step.shape[1])] + node_costs(current)
+        backpointers.append(best_previous)
+
+    chosen = [int(total.argmin())]
+    for best_previous in reversed(backpointers):
+        chosen.append(int(best_previous[chosen[-1]]))
+    chosen.reverse()
+
+    chords: List[VoicedChord] = []
+    for name, (inversions, voicings), index in zip(names, candidates, chosen):
+        chords.append(
+            {
+                "chord": name,
+                "inversion": inversions[index],
+                "notes": [pitch_name(pitch) for pitch in voicings[index].tolist()],
+            }
+        )
+    return {"cost": round(float(total.min()), 6), "chords": chords}
+
+
+def optimize_variants(
+    variants: Mapping[str, Sequence[ChordLike]],
+    low: str = DEFAULT_LOW,
+    high: str = DEFAULT_HIGH,
+    weights: VoiceLeadingWeights = VoiceLeadingWeights(),
+) -> Dict[str, VoiceLeading]:
+    """Applique `optimize_voicings` à plusieurs progressions (ex: harmonized_chords)."""
+    return {
+        name: optimize_voicings(chords, low, high, weights) for name, chords in variants.items()
+    }
+
+
+# Caches exposés par /metrics (succès, échecs, taille)
+CACHES = {"voicing_candidates": voicing_candidates}
@@ -0,0 +1,142 @@
+"""
+Serveur local qui imite l'API REST de Gemini (`generateContent`), pour les tests de
+charge sans réseau.
+
+    python -m benchmarks.fake_gemini --port 8900 --latency lognormal --latency-ms 800
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8900 GEMINI_API_KEY=fake uvicorn app.main:app
+
+La réponse est une analyse préparée : tonalité fixe et un segment harmonique tous les
+`--segment-length` accords de la progression reçue. La latence suit la distribution
+demandée et une part `--error-rate` des appels échoue (HTTP 500 ou 429).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from typing import Any, Dict, NamedTuple, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# Progression envoyée dans le prompt de `detect_tonic_and_mode`
+_PROGRESSION = re.compile(r"Progression à analyser : (.*)$", re.MULTILINE)
+
+
+class FakeGeminiSettings(NamedTuple):
+    latency: str = "lognormal"
+    latency_ms: float = 800.0  # Latence médiane (moyenne pour uniform et exponential)
+    latency_sigma: float = 0.5  # Écart-type du logarithme (lognormal)
+    error_rate: float = 0.0
+    tonic: str = "C"
+    mode: str = "Ionian"
+    segment_length: int = 8
+    seed: Optional[int] = None
+
+
+def sample_latency(settings: FakeGeminiSettings, rng: random.Random) -> float:
+    """Latence d'un appel, en secondes."""
+    median = settings.latency_ms / 1000
+    if settings.latency == "fixed":
+        return median
+    if settings.latency == "uniform":
+        return rng.uniform(0, 2 * median)
+    if settings.latency == "exponential":
+        return rng.expovariate(1 / median) if median > 0 else 0.0
+    if settings.latency == "lognormal":
+        return median * rng.lognormvariate(0, settings.latency_sigma)
+    raise ValueError(
+        f"Distribution '{settings.latency}' inconnue ({', '.join(LATENCY_DISTRIBUTIONS)})."
+    )
+
+
+def canned_analysis(prompt: str, settings: FakeGeminiSettings) -> Dict[str, Any]:
+    """Analyse préparée pour la progression du prompt, au format attendu de Gemini."""
+    match = _PROGRESSION.search(prompt)
+    size = len(match.group(1).split(" - ")) if match else 1
+    segments = [
+        {
+            "start_index": start,
+            "end_index": min(start + settings.segment_length, size) - 1,
+            "tonic": settings.tonic,
+            "mode": settings.mode,
+            "explanation": "Segment préparé par le faux serveur Gemini.",
+        }
+        for start in range(0, size, settings.segment_length)
+    ]
+    return {
+        "global_analysis": {
+            "tonic": settings.tonic,
+            "mode": settings.mode,
+            "explanation": "Analyse préparée par le faux serveur Gemini.",
+        },
+        "harmonic_segments": segments,
+    }
+
+
+def create_app(settings: FakeGeminiSettings = FakeGeminiSettings()) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(settings.seed)
+
+    @app.post("/v1beta/models/{model_action}")
+    async def generate_content(model_action: str, request: Request):
+        body = await request.json()
+        await asyncio.sleep(sample_latency(settings, rng))
+        if rng.random() < settings.error_rate:
+            status = rng.choice((500, 429))
+            return JSONResponse(
+                {"error": {"code": status, "message": "Erreur simulée", "status": "INTERNAL"}},
+                status_code=status,
+            )
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = "```json\n" + json.dumps(canned_analysis(prompt, settings)) + "\n```"
+        return {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }
+            ],
+            "modelVersion": model_action.split(":")[0],
+        }
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Faux serveur Gemini pour les tests de charge.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tonic", default="C")
+    parser.add_argument("--mode", default="Ionian")
+    parser.add_argument("--segment-length", type=int, default=8)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    settings = FakeGeminiSettings(
+        args.latency,
+        args.latency_ms,
+        args.latency_sigma,
+        args.error_rate,
+        args.tonic,
+        args.mode,
+        args.segment_length,
+        args.seed,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
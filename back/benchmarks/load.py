@@ -0,0 +1,237 @@
+"""
+Test de charge de /analyze avec un faux serveur Gemini, sans réseau.
+
+    python -m benchmarks.load --concurrency 1,4,16,64 --duration 20 --latency-ms 800
+    python -m benchmarks.load --target http://127.0.0.1:8000 --concurrency 8
+
+Sans `--target`, la commande démarre le faux serveur Gemini (`benchmarks.fake_gemini`)
+et l'application (un seul worker uvicorn) qui l'appelle, puis les arrête à la fin.
+Chaque niveau de concurrence fait tourner autant d'utilisateurs qui envoient leurs
+requêtes l'une après l'autre pendant `--duration` secondes ; le débit, les latences
+(p50, p95, p99) et le taux d'erreur de chaque niveau sont affichés et, avec `-o`,
+écrits en JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TypedDict
+
+import httpx
+
+from benchmarks.fake_gemini import LATENCY_DISTRIBUTIONS
+from benchmarks.run import chord_items
+
+BACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LevelReport(TypedDict):
+    concurrency: int
+    requests: int
+    errors: int
+    error_rate: float
+    throughput: float  # Requêtes terminées par seconde
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Centile `q` (0-100) par rang le plus proche ; 0 si aucune valeur."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(concurrency: int, latencies: List[float], errors: int, elapsed: float) -> LevelReport:
+    ordered = sorted(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": len(ordered),
+        "errors": errors,
+        "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+        "throughput": round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+    }
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    url: str,
+    bodies: Sequence[Dict[str, Any]],
+    concurrency: int,
+    duration: float,
+) -> LevelReport:
+    """
+    `concurrency` utilisateurs envoient des requêtes sans pause pendant `duration`
+    secondes. Une réponse autre que 200, ou contenant `error`, compte comme erreur.
+    """
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    stop_at = started + duration
+
+    async def user(index: int) -> None:
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            body = bodies[index % len(bodies)]
+            index += concurrency
+            sent = time.perf_counter()
+            try:
+                response = await client.post(url, json=body)
+                failed = response.status_code != 200 or "error" in response.json()
+            except (httpx.HTTPError, ValueError):
+                failed = True
+            latencies.append(time.perf_counter() - sent)
+            errors += failed
+
+    await asyncio.gather(*(user(index) for index in range(concurrency)))
+    return summarize(concurrency, latencies, errors, time.perf_counter() - started)
+
+
+async def run_load(
+    base_url: str,
+    concurrency_levels: Sequence[int],
+    duration: float,
+    chords: int,
+    progressions: int = 50,
+    model: str = "gemini-2.5-flash",
+    timeout: float = 120.0,
+) -> List[LevelReport]:
+    bodies = [
+        {
+            "chordsData": [item.model_dump() for item in chord_items(chords, seed)],
+            "model": model,
+        }
+        for seed in range(progressions)
+    ]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        # Échauffement : imports paresseux et caches de l'application
+        await run_level(client, "/analyze", bodies, 1, min(duration, 2.0))
+        reports = []
+        for concurrency in concurrency_levels:
+            reports.append(await run_level(client, "/analyze", bodies, concurrency, duration))
+            print(_format(reports[-1]), file=sys.stderr)
+        return reports
+
+
+def _format(report: LevelReport) -> str:
+    return (
+        f"{report['concurrency']:>5} utilisateurs  {report['throughput']:8.2f} req/s  "
+        f"p50 {report['p50_ms']:8.1f} ms  p95 {report['p95_ms']:8.1f} ms  "
+        f"p99 {report['p99_ms']:8.1f} ms  erreurs {100 * report['error_rate']:5.1f} %  "
+        f"({report['requests']} requêtes)"
+    )
+
+
+def _wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté avant d'être prêt ({url}).")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Le serveur ne répond pas ({url}).")
+
+
+@contextmanager
+def local_servers(args: argparse.Namespace) -> Iterator[str]:
+    """Démarre le faux Gemini et l'application ; renvoie l'URL de l'application."""
+    gemini_url = f"http://127.0.0.1:{args.gemini_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    fake_gemini_command = [
+        sys.executable, "-m", "benchmarks.fake_gemini",
+        "--port", str(args.gemini_port),
+        "--latency", args.latency,
+        "--latency-ms", str(args.latency_ms),
+        "--latency-sigma", str(args.latency_sigma),
+        "--error-rate", str(args.error_rate),
+    ]  # fmt: skip
+    app_command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", str(args.app_port), "--workers", "1", "--log-level", "warning",
+    ]  # fmt: skip
+    env = {
+        **os.environ,
+        "GEMINI_API_ENDPOINT": gemini_url,
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "fake"),
+    }
+    processes = []
+    # Les erreurs simulées produisent des traces dans les journaux des serveurs
+    with open(args.server_log, "a", encoding="utf-8") as log:
+        try:
+            for command, ready_url in (
+                (fake_gemini_command, gemini_url),
+                (app_command, f"{app_url}/presets"),
+            ):
+                processes.append(
+                    subprocess.Popen(command, cwd=BACK_DIR, env=env, stdout=log, stderr=log)
+                )
+                _wait_until_ready(ready_url, processes[-1])
+            yield app_url
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait(timeout=10)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge de /analyze.")
+    parser.add_argument("--target", help="URL d'une application déjà démarrée")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32,64", help="Niveaux, ex: 1,8,64")
+    parser.add_argument("--duration", type=float, default=15.0, help="Secondes par niveau")
+    parser.add_argument("--chords", type=int, default=32, help="Accords par progression")
+    parser.add_argument("--progressions", type=int, default=50, help="Progressions distinctes")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Délai par requête (s)")
+    parser.add_argument("--app-port", type=int, default=8800)
+    parser.add_argument("--gemini-port", type=int, default=8900)
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--server-log", default=os.devnull, help="Journal des serveurs démarrés")
+    parser.add_argument("-o", "--output", help="Fichier de résultats (JSON)")
+    args = parser.parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    def load(base_url: str) -> List[LevelReport]:
+        return asyncio.run(
+            run_load(
+                base_url,
+                levels,
+                args.duration,
+                args.chords,
+                args.progressions,
+                args.model,
+                args.timeout,
+            )
+        )
+
+    if args.target:
+        reports = load(args.target)
+    else:
+        with local_servers(args) as app_url:
+            reports = load(app_url)
+    if args.output:
+        settings = {key: value for key, value in vars(args).items() if key != "output"}
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"settings": settings, "levels": reports}, output, indent=2)
+            output.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""
+Mesures de performance du moteur d'analyse et de /analyze de bout en bout.
+
+    python -m benchmarks.run -o resultats.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --quick
+
+Chaque mesure est le meilleur temps par appel sur plusieurs répétitions. Les mesures
+faites sur plusieurs tailles donnent l'exposant de croissance du temps (pente en
+échelle log-log) : un exposant proche de 2 signale un calcul devenu quadratique.
+Avec `--baseline`, un temps qui dépasse celui de référence au-delà du seuil est une
+régression. Les seuils sont dans `thresholds.json` ; la commande sort en erreur si
+l'un d'eux est dépassé.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi.testclient import TestClient
+
+import app.main
+from app.markov_generation.generator import generate_progressions, preset_model
+from app.melody_harmonization.generator import MelodyNote, harmonize_melody
+from app.modal_substitution.generator import get_substitution_info, get_substitutions
+from app.numeral_realization.generator import realize_template
+from app.pattern_detection.identifier import detect_patterns
+from app.pipeline import analyze_progression_segments, build_progression_analysis
+from app.progression_enumeration.generator import EnumerationConstraints, enumerate_page
+from app.reharmonization.generator import reharmonize
+from app.schema import ChordItem
+from app.utils.borrowed_modes import get_borrowed_chords
+from app.utils.chords_analyzer import analyze_chord_in_context
+from app.utils.common import ChordLike, get_chord_notes, parse_chord
+from app.voice_leading.generator import optimize_voicings
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+# Tailles des progressions de bout en bout
+END_TO_END_SIZES = (4, 16, 64, 256, 1024, 4096, 10000)
+# Tailles au-delà desquelles `--quick` s'arrête
+QUICK_MAX_SIZE = 1024
+
+# Accords tirés au hasard : diatoniques en do majeur et emprunts courants
+CHORD_POOL = (
+    ("C", ""), ("D", "m7"), ("E", "m"), ("F", "maj7"), ("G", "7"), ("A", "m"),
+    ("B", "m7b5"), ("C", "maj7"), ("Bb", ""), ("Ab", "maj7"), ("E", "7"), ("A", "7"),
+    ("D", "7"), ("F", "m"), ("Db", "7"), ("Eb", ""),
+)  # fmt: skip
+
+
+class Benchmark(NamedTuple):
+    name: str
+    # Taille -> fonction sans argument à chronométrer (la préparation n'est pas mesurée)
+    setup: Callable[[int], Callable[[], Any]]
+    sizes: Tuple[int, ...]
+
+
+class Measurement(NamedTuple):
+    name: str
+    size: int
+    seconds: float  # Meilleur temps par appel
+    loops: int  # Appels par répétition
+
+
+def chord_items(size: int, seed: Optional[int] = None) -> List[ChordItem]:
+    """Progression reproductible de `size` accords."""
+    rng = random.Random(size if seed is None else seed)
+    return [
+        ChordItem(id=index, root=root, quality=quality)
+        for index, (root, quality) in enumerate(rng.choice(CHORD_POOL) for _ in range(size))
+    ]
+
+
+def chord_names(size: int) -> List[str]:
+    return [f"{item.root}{item.quality}" for item in chord_items(size)]
+
+
+def stub_detection(
+    progression: Sequence[ChordLike],
+    model: Any = None,
+    timeout: Optional[float] = None,
+    registered_modes: bool = False,
+) -> Dict[str, Any]:
+    """Détection de tonalité fixe (do ionien), à la place de l'appel à Gemini."""
+    return {
+        "global_analysis": {"tonic": "C", "mode": "Ionian", "explanation": "benchmark"},
+        "harmonic_segments": [
+            {
+                "start_index": 0,
+                "end_index": len(progression) - 1,
+                "tonic": "C",
+                "mode": "Ionian",
+                "explanation": "benchmark",
+            }
+        ],
+    }
+
+
+def _quality_analysis(size: int) -> Tuple[List[ChordLike], List[Any]]:
+    names: List[ChordLike] = list(chord_names(size))
+    segments = stub_detection(names)["harmonic_segments"]
+    return names, analyze_progression_segments(names, segments)
+
+
+def _parse_chord(size: int) -> Callable[[], Any]:
+    names = chord_names(size)
+    return lambda: [parse_chord(name) for name in names]
+
+
+def _get_chord_notes(size: int) -> Callable[[], Any]:
+    names = chord_names(size)
+    return lambda: [get_chord_notes(name) for name in names]
+
+
+def _analyze_chord_in_context(size: int) -> Callable[[], Any]:
+    names = chord_names(size)
+    return lambda: [analyze_chord_in_context(name, 0, "Ionian") for name in names]
+
+
+def _get_substitutions(size: int) -> Callable[[], Any]:
+    names, analysis = _quality_analysis(size)
+    sub_info = get_substitution_info(analysis)
+    return lambda: get_substitutions(names, 9, sub_info, "Dorian")
+
+
+def _get_borrowed_chords(size: int) -> Callable[[], Any]:
+    _, analysis = _quality_analysis(size)
+    return lambda: get_borrowed_chords(analysis, "Ionian")
+
+
+def _detect_patterns(size: int) -> Callable[[], Any]:
+    _, analysis = _quality_analysis(size)
+    return lambda: detect_patterns(analysis, "C")
+
+
+def _reharmonize(size: int) -> Callable[[], Any]:
+    names = chord_names(size)
+    return lambda: reharmonize(names, "C", "Ionian")
+
+
+def _optimize_voicings(size: int) -> Callable[[], Any]:
+    names = chord_names(size)
+    return lambda: optimize_voicings(names)
+
+
+def _harmonize_melody(size: int) -> Callable[[], Any]:
+    rng = random.Random(size)
+    notes = [MelodyNote(rng.choice((60, 62, 64, 65, 67, 69, 71)), beat, 1) for beat in range(size)]
+    return lambda: harmonize_melody(notes, "C", "Ionian", beats_per_chord=4)
+
+
+def _generate_progressions(size: int) -> Callable[[], Any]:
+    model = preset_model("pop")
+    return lambda: generate_progressions(model, "C", "Ionian", length=8, samples=size, seed=0)
+
+
+def _enumerate_progressions(size: int) -> Callable[[], Any]:
+    constraints = EnumerationConstraints(length=4, borrow_modes=("Aeolian",), cadence="authentic")
+    return lambda: enumerate_page("C", "Ionian", constraints, limit=size)
+
+
+def _realize_template(size: int) -> Callable[[], Any]:
+    return lambda: realize_template("ii7 V7 Imaj7 vi7")
+
+
+def _pipeline(size: int) -> Callable[[], Any]:
+    items = chord_items(size)
+    detection = stub_detection(chord_names(size))
+    return lambda: build_progression_analysis(items, detection)
+
+
+def _analyze_endpoint(size: int) -> Callable[[], Any]:
+    # La détection est remplacée pour ne mesurer que le serveur, pas le réseau
+    app.main.detect_tonic_and_mode = stub_detection
+    client = TestClient(app.main.app)
+    body = {
+        "chordsData": [item.model_dump() for item in chord_items(size)],
+        "model": "benchmark",
+    }
+
+    def run() -> Any:
+        response = client.post("/analyze", json=body)
+        if response.status_code != 200 or "error" in response.json():
+            raise RuntimeError(f"/analyze a échoué : {response.text[:200]}")
+        return response
+
+    return run
+
+
+BENCHMARKS = [
+    Benchmark("parse_chord", _parse_chord, (1000,)),
+    Benchmark("get_chord_notes", _get_chord_notes, (1000,)),
+    Benchmark("analyze_chord_in_context", _analyze_chord_in_context, (1000,)),
+    Benchmark("get_substitutions", _get_substitutions, (16, 256, 4096)),
+    Benchmark("get_borrowed_chords", _get_borrowed_chords, (16, 256, 4096)),
+    Benchmark("detect_patterns", _detect_patterns, (16, 256, 4096)),
+    Benchmark("reharmonize", _reharmonize, (4, 16, 64, 256)),
+    Benchmark("optimize_voicings", _optimize_voicings, (16, 256, 4096)),
+    Benchmark("harmonize_melody", _harmonize_melody, (16, 256, 4096)),
+    Benchmark("generate_progressions", _generate_progressions, (1000,)),
+    Benchmark("enumerate_progressions", _enumerate_progressions, (100,)),
+    Benchmark("realize_template", _realize_template, (1,)),
+    Benchmark("pipeline", _pipeline, END_TO_END_SIZES),
+    Benchmark("analyze_endpoint", _analyze_endpoint, END_TO_END_SIZES),
+]
+
+
+def measure(
+    func: Callable[[], Any], repeat: int = 5, min_time: float = 0.05, budget: float = 10.0
+) -> Tuple[float, int]:
+    """
+    Meilleur temps par appel et nombre d'appels par répétition. Les appels rapides
+    sont groupés pour durer au moins `min_time` ; les plus lents sont moins répétés
+    pour tenir dans `budget` secondes.
+    """
+    started = time.perf_counter()
+    func()  # Échauffement (caches, imports paresseux)
+    first = time.perf_counter() - started
+    loops = max(1, math.ceil(min_time / first)) if first > 0 else 1000
+    repeat = max(1, min(repeat, int(budget / max(first * loops, 1e-9))))
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best, loops
+
+
+def scaling_exponent(sizes: Sequence[int], seconds: Sequence[float]) -> Optional[float]:
+    """
+    Pente de log(temps) en fonction de log(taille) sur la moitié supérieure des tailles,
+    où les coûts fixes ne masquent plus la croissance. None s'il y a moins de deux points.
+    """
+    points = sorted(zip(sizes, seconds))
+    points = points[(len(points) - 1) // 2 :]
+    if len(points) < 2:
+        return None
+    xs = [math.log(size) for size, _ in points]
+    ys = [math.log(max(value, 1e-12)) for _, value in points]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+def run_benchmarks(
+    benchmarks: Sequence[Benchmark],
+    max_size: Optional[int] = None,
+    repeat: int = 5,
+    log: Callable[[str], None] = lambda line: None,
+) -> Dict[str, Any]:
+    """Exécute les mesures et renvoie les résultats (sérialisables en JSON)."""
+    measurements: List[Measurement] = []
+    for benchmark in benchmarks:
+        for size in benchmark.sizes:
+            if max_size is not None and size > max_size and size != benchmark.sizes[0]:
+                continue
+            seconds, loops = measure(benchmark.setup(size), repeat)
+            measurements.append(Measurement(benchmark.name, size, seconds, loops))
+            log(f"{benchmark.name:<26} {size:>6}  {seconds * 1000:10.3f} ms")
+    scaling = {}
+    for benchmark in benchmarks:
+        points = [(m.size, m.seconds) for m in measurements if m.name == benchmark.name]
+        exponent = scaling_exponent([s for s, _ in points], [t for _, t in points])
+        if exponent is not None:
+            scaling[benchmark.name] = round(exponent, 3)
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": [m._asdict() for m in measurements],
+        "scaling": scaling,
+    }
+
+
+def check_thresholds(
+    results: Dict[str, Any], thresholds: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """Liste des seuils dépassés : croissance trop rapide, ou régression sur la référence."""
+    failures = []
+    max_exponents = thresholds.get("max_exponent", {})
+    for name, exponent in results["scaling"].items():
+        limit = max_exponents.get(name, max_exponents.get("default"))
+        if limit is not None and exponent > limit:
+            failures.append(f"{name} : croissance en n^{exponent:.2f} (seuil n^{limit})")
+    if baseline is not None:
+        reference = {(r["name"], r["size"]): r["seconds"] for r in baseline["results"]}
+        max_slowdown = thresholds.get("max_slowdown", {})
+        for result in results["results"]:
+            before = reference.get((result["name"], result["size"]))
+            if not before:
+                continue
+            limit = max_slowdown.get(result["name"], max_slowdown.get("default"))
+            ratio = result["seconds"] / before
+            if limit is not None and ratio > limit:
+                failures.append(
+                    f"{result['name']} ({result['size']}) : x{ratio:.2f} "
+                    f"par rapport à la référence (seuil x{limit})"
+                )
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mesures de performance de l'analyse.")
+    parser.add_argument("-o", "--output", help="Fichier de résultats (JSON)")
+    parser.add_argument("--baseline", help="Résultats de référence à comparer")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    parser.add_argument("--filter", help="Ne lance que les mesures dont le nom contient ceci")
+    parser.add_argument(
+        "--quick", action="store_true", help=f"Tailles limitées à {QUICK_MAX_SIZE} accords"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    benchmarks = [b for b in BENCHMARKS if not args.filter or args.filter in b.name]
+    results = run_benchmarks(
+        benchmarks,
+        QUICK_MAX_SIZE if args.quick else None,
+        args.repeat,
+        log=lambda line: print(line, file=sys.stderr),
+    )
+    for name, exponent in results["scaling"].items():
+        print(f"{name:<26} croissance n^{exponent:.2f}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+            output.write("\n")
+
+    with open(args.thresholds, encoding="utf-8") as thresholds_file:
+        thresholds = json.load(thresholds_file)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+    failures = check_thresholds(results, thresholds, baseline)
+    for failure in failures:
+        print(f"SEUIL DÉPASSÉ : {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 
 NOTES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
 NOTE_INDEX_MAP = {
@@ -124,17 +125,113 @@ CORE_QUALITIES = {
     "m7b5": "diminished",
     # Augmentés
     "aug": "augmented",
+    "+": "augmented",
     # Suspendus
     "sus2": "suspended",
     "sus4": "suspended",
     "7sus2": "suspended",
     "7sus4": "suspended",
     "9sus4": "suspended",
+    "13sus4": "suspended",
     # Autres
     "5": "power",
 }
 
-MODES_DATA: Dict[str, Tuple[List[int], List[str], Optional[int]]] = {}
+# Suffixe du chiffrage romain de chaque qualité (aucun suffixe par défaut)
+NUMERAL_SUFFIXES = {
+    "maj7": "maj7",
+    "m7": "7",
+    "7": "7",
+    "m7b5": "ø7",
+    "dim7": "°7",
+    "dim": "°",
+    "aug": "+",
+    "sus4": "sus4",
+    "sus2": "sus2",
+    "add9": "add9",
+    "m(maj7)": "m(maj7)",
+    "m6": "m6",
+    "m9": "m9",
+    "m11": "m11",
+    "m13": "m13",
+    "9": "9",
+    "11": "11",
+    "13": "13",
+}
+
+# Réductions à la triade qui ne se déduisent pas de la tierce et de la quinte
+TRIAD_REDUCTION_OVERRIDES = {
+    "7b5": "dim",  # Souvent, la base est diminuée
+}
+
+# Intervalles (en demi-tons depuis la fondamentale) de chaque qualité d'accord
+CHORD_FORMULAS: Dict[str, List[int]] = {
+    # --- Triades de base ---
+    "": [0, 4, 7],
+    "M": [0, 4, 7],
+    "maj": [0, 4, 7],
+    "m": [0, 3, 7],
+    "min": [0, 3, 7],
+    "dim": [0, 3, 6],
+    "d": [0, 3, 6],
+    "aug": [0, 4, 8],
+    "+": [0, 4, 8],
+    "5": [0, 7],
+    # --- Accords suspendus ---
+    "sus2": [0, 2, 7],
+    "sus4": [0, 5, 7],
+    "7sus2": [0, 2, 7, 10],
+    "7sus4": [0, 5, 7, 10],
+    "9sus4": [0, 5, 7, 10, 14],
+    "13sus4": [0, 5, 7, 10, 14, 21],
+    # --- Accords "add" ---
+    "add9": [0, 4, 7, 14],
+    "m(add9)": [0, 3, 7, 14],
+    # --- Accords de 6ème ---
+    "6": [0, 4, 7, 9],
+    "m6": [0, 3, 7, 9],
+    "6/9": [0, 4, 7, 9, 14],
+    # --- Accords de 7ème ---
+    "7": [0, 4, 7, 10],
+    "maj7": [0, 4, 7, 11],
+    "m7": [0, 3, 7, 10],
+    "dim7": [0, 3, 6, 9],
+    "m7b5": [0, 3, 6, 10],
+    "m(maj7)": [0, 3, 7, 11],
+    "maj7b5": [0, 4, 6, 11],
+    "maj7#5": [0, 4, 8, 11],
+    "maj7#11": [0, 4, 7, 11, 18],
+    # --- Accords de dominante altérés ---
+    "7b5": [0, 4, 6, 10],
+    "7#5": [0, 4, 8, 10],
+    "7b9": [0, 4, 7, 10, 13],
+    "7b13": [0, 4, 7, 10, 20],
+    "7#9": [0, 4, 7, 10, 15],
+    "7#11": [0, 4, 7, 10, 18],
+    "7alt": [0, 4, 10, 13, 18],  # Altéré générique : b9 et #11
+    "7b9b5": [0, 4, 6, 10, 13],
+    "7b9#5": [0, 4, 8, 10, 13],
+    "7#9b5": [0, 4, 6, 10, 15],
+    "7#9#5": [0, 4, 8, 10, 15],
+    "7b9#9": [0, 4, 7, 10, 13, 15],  # double altération de la 9e
+    "7b9#11": [0, 4, 7, 10, 13, 18],
+    "7#9#11": [0, 4, 7, 10, 15, 18],
+    "7b9b13": [0, 4, 7, 10, 13, 20],  # b13 = A# = +20 demi-tons
+    "7#9b13": [0, 4, 7, 10, 15, 20],
+    # --- Accords de 9ème ---
+    "9": [0, 4, 7, 10, 14],
+    "maj9": [0, 4, 7, 11, 14],
+    "m9": [0, 3, 7, 10, 14],
+    # --- Accords de 11ème ---
+    "11": [0, 4, 7, 10, 14, 17],
+    "m11": [0, 3, 7, 10, 14, 17],
+    # --- Accords de 13ème ---
+    "13": [0, 4, 7, 10, 14, 21],
+    "13#11": [0, 4, 7, 10, 14, 18, 21],
+    "m13": [0, 3, 7, 10, 14, 21],
+    "maj13": [0, 4, 7, 11, 14, 21],
+}
+
 MAJOR_MODES_DATA = {
     "Ionian": (
         [0, 2, 4, 5, 7, 9, 11],
@@ -251,6 +348,101 @@ MELODIC_MINOR_MODES = {
     ),
 }
 
-MODES_DATA.update(MAJOR_MODES_DATA)
-MODES_DATA.update(HARMONIC_MINOR_MODES)
-MODES_DATA.update(MELODIC_MINOR_MODES)
+# Tous les modes, en lecture seule (voir app/utils/modes.py pour le registre compilé)
+MODES_DATA: Mapping[str, Tuple[List[int], List[str], Optional[int]]] = MappingProxyType(
+    {**MAJOR_MODES_DATA, **HARMONIC_MINOR_MODES, **MELODIC_MINOR_MODES}
+)
+
+# Bibliothèque des enchaînements reconnus dans une progression analysée. Chaque motif
+# est une suite de chiffrages relatifs à la tonique du segment, quel que soit le mode :
+# majuscules = accord majeur, minuscules = mineur, "7" = dominante, "°" = diminué
+# (ø7 compris), "+" = augmenté, "sus" = suspendu. Les degrés chromatiques suivent
+# CHROMATIC_DEGREES_MAP (ex: "bVII7").
+CADENCE_PATTERNS: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+    {
+        "ii-V-I": ("ii V7 I", "ii V I"),
+        "Minor ii-V-i": ("ii° V7 i", "ii° V i"),
+        "Authentic Cadence": ("V7 I", "V I", "V7 i", "vii° I"),
+        "Plagal Cadence": ("IV I", "iv I", "iv i"),
+        "Deceptive Cadence": ("V7 vi", "V vi", "V7 bVI"),
+        "Backdoor Cadence": ("bVII7 I", "iv bVII7 I"),
+        "Tritone Substitution": ("ii bII7 I", "bII7 I", "bII7 i"),
+        "Turnaround": ("I vi ii V7", "I VI7 ii V7", "iii vi ii V7", "I bIII bVI bII7"),
+        "Andalusian Cadence": ("i bVII bVI V", "i bVII bVI V7"),
+        "Pop Progression": ("I V vi IV", "vi IV I V", "I vi IV V"),
+    }
+)
+
+# Petits corpus de chiffrages par style, pour la génération d'accords via preset.
+# Seuls le degré et la nature (triade ou 7e) comptent : la qualité vient du mode choisi.
+PROGRESSION_PRESETS: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+    {
+        "pop": (
+            "I V vi IV",
+            "vi IV I V",
+            "I vi IV V",
+            "I IV vi V",
+            "IV I V vi",
+            "I V IV V",
+            "I iii IV V",
+            "vi V IV V",
+        ),
+        "jazz": (
+            "ii7 V7 Imaj7",
+            "Imaj7 vi7 ii7 V7",
+            "iii7 vi7 ii7 V7 Imaj7",
+            "Imaj7 IVmaj7 iii7 vi7 ii7 V7 Imaj7",
+            "ii7 V7 iii7 vi7 ii7 V7 Imaj7",
+            "Imaj7 ii7 iii7 IVmaj7 V7 Imaj7",
+        ),
+        "classical": (
+            "I IV V I",
+            "I ii V I",
+            "I vi ii V I",
+            "I IV ii V I",
+            "I V vi iii IV I IV V I",
+            "I vi IV V7 I",
+        ),
+        "blues": (
+            "I7 IV7 I7 I7 IV7 IV7 I7 I7 V7 IV7 I7 V7",
+            "I7 IV7 I7 V7",
+        ),
+    }
+)
+
+# Écritures usuelles des grilles (ChordPro, lead sheets) -> qualité du registre.
+# Les qualités déjà connues (ex: "m7", "maj7") sont acceptées telles quelles.
+CHORD_SYMBOL_ALIASES: Mapping[str, str] = MappingProxyType(
+    {
+        "-": "m",
+        "mi": "m",
+        "-7": "m7",
+        "mi7": "m7",
+        "min7": "m7",
+        "M7": "maj7",
+        "Maj7": "maj7",
+        "ma7": "maj7",
+        "Δ": "maj7",
+        "Δ7": "maj7",
+        "M9": "maj9",
+        "ø": "m7b5",
+        "ø7": "m7b5",
+        "m7-5": "m7b5",
+        "-7b5": "m7b5",
+        "o": "dim",
+        "°": "dim",
+        "o7": "dim7",
+        "°7": "dim7",
+        "7-5": "7b5",
+        "7+5": "7#5",
+        "7-9": "7b9",
+        "7+9": "7#9",
+        "+7": "7#5",
+        "sus": "sus4",
+        "69": "6/9",
+        "add2": "add9",
+        "mM7": "m(maj7)",
+        "m(M7)": "m(maj7)",
+        "-maj7": "m(maj7)",
+    }
+)
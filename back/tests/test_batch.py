@@ -0,0 +1,108 @@
+import io
+import json
+
+import pytest
+
+from app.batch import load_done_ids, main, read_records, run_batch
+
+JSONL = "\n".join(
+    [
+        json.dumps({"id": "ii-V-I", "chords": ["Dm7", "G7", "Cmaj7"]}),
+        json.dumps({"id": "minor", "chords": "Am | Dm | E7 | Am"}),
+        json.dumps({"chordsData": [{"id": 1, "root": "F", "quality": "maj7"}, {"root": "C"}]}),
+        "",
+        json.dumps({"id": "invalid", "chords": ["Xyz"]}),
+    ]
+)
+
+
+def test_read_records():
+    records = list(read_records(io.StringIO(JSONL), "jsonl"))
+    assert [record.id for record in records] == ["ii-V-I", "minor", "3", "invalid"]
+    assert records[1].chords == ["Am", "Dm", "E7", "Am"]
+    assert records[2].chords == ["Fmaj7", "C"]
+    rows = "name,progression\nblues,C7 F7 C7 G7\n,Dm G C\n"
+    records = list(read_records(io.StringIO(rows), "csv", "name", "progression"))
+    assert [(record.id, record.chords) for record in records] == [
+        ("blues", ["C7", "F7", "C7", "G7"]),
+        ("2", ["Dm", "G", "C"]),
+    ]
+    with pytest.raises(ValueError):
+        list(read_records(io.StringIO(JSONL), "xml"))
+
+
+def test_unreadable_lines_become_error_records():
+    lines = JSONL + '\n{"id": "cut", "chords": ["C"\n[1, 2]\n{"id": "no-chords"}\n'
+    records = list(read_records(io.StringIO(lines), "jsonl"))
+    assert [(record.id, record.error is None) for record in records] == [
+        ("ii-V-I", True),
+        ("minor", True),
+        ("3", True),
+        ("invalid", True),
+        ("6", False),
+        ("7", False),
+        ("no-chords", False),
+    ]
+    rows = "name,progression\nblues,C7 F7\nshort\n"
+    records = list(read_records(io.StringIO(rows), "csv", "name", "progression"))
+    assert [(record.id, record.error is None) for record in records] == [
+        ("blues", True),
+        ("short", False),
+    ]
+
+    output = io.StringIO()
+    stats = run_batch(records, output)
+    assert (stats.processed, stats.failed) == (2, 1)
+    assert "Ligne 2 illisible" in json.loads(output.getvalue().splitlines()[1])["error"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch_writes_one_line_per_progression(workers):
+    output = io.StringIO()
+    stats = run_batch(read_records(io.StringIO(JSONL), "jsonl"), output, workers=workers)
+    lines = {line["id"]: line for line in map(json.loads, output.getvalue().splitlines())}
+    assert sorted(lines) == ["3", "ii-V-I", "invalid", "minor"]
+    assert lines["ii-V-I"]["result"]["tonic"] == "C"
+    assert [item["found_numeral"] for item in lines["ii-V-I"]["result"]["quality_analysis"]] == [
+        "ii7",
+        "V7",
+        "Imaj7",
+    ]
+    assert "error" in lines["invalid"]
+    assert (stats.processed, stats.failed) == (4, 1)
+    assert "progressions/s" in stats.report(1.0)
+    with pytest.raises(ValueError):
+        run_batch([], output, detector="foo")
+
+
+def test_resume_skips_finished_progressions(tmp_path, capsys):
+    source = tmp_path / "corpus.jsonl"
+    source.write_text(JSONL)
+    results = tmp_path / "results.jsonl"
+    # Interruption : une ligne complète, puis une ligne tronquée
+    results.write_text(json.dumps({"id": "ii-V-I", "result": {}}) + '\n{"id": "mi')
+    assert load_done_ids(str(results)) == {"ii-V-I"}
+
+    assert main([str(source), "-o", str(results), "--workers", "1"]) == 0
+    assert "1 déjà traitées" in capsys.readouterr().err
+    lines = results.read_text().splitlines()
+    ids = [json.loads(line)["id"] for line in lines if line.endswith("}")]
+    assert ids == ["ii-V-I", "minor", "3", "invalid"]
+
+    # Les progressions en erreur sont refaites à la reprise suivante
+    assert load_done_ids(str(results)) == {"ii-V-I", "minor", "3"}
+    assert main([str(source), "-o", str(results), "--workers", "1"]) == 0
+    assert "3 déjà traitées" in capsys.readouterr().err
+    assert json.loads(results.read_text().splitlines()[-1])["id"] == "invalid"
+
+
+def test_resume_after_truncated_first_line(tmp_path, capsys):
+    source = tmp_path / "corpus.jsonl"
+    source.write_text(JSONL)
+    results = tmp_path / "results.jsonl"
+    results.write_text('{"id": "ii')
+    assert load_done_ids(str(results)) == set()
+    assert main([str(source), "-o", str(results), "--workers", "1"]) == 0
+    lines = results.read_text().splitlines()
+    assert lines[0] == '{"id": "ii'
+    assert [json.loads(line)["id"] for line in lines[1:]] == ["ii-V-I", "minor", "3", "invalid"]
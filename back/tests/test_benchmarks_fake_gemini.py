@@ -0,0 +1,66 @@
+import random
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+from app.utils.mode_detection_gemini import detect_tonic_and_mode
+from benchmarks.fake_gemini import FakeGeminiSettings, create_app, sample_latency
+
+URL = "/v1beta/models/gemini-2.5-flash:generateContent"
+
+
+def prompt_body(chords):
+    text = f"# Rôle\n...\nProgression à analyser : {' - '.join(chords)}"
+    return {"contents": [{"parts": [{"text": text}], "role": "user"}]}
+
+
+def test_canned_segments_cover_the_progression():
+    client = TestClient(create_app(FakeGeminiSettings("fixed", 0, segment_length=3, tonic="G")))
+    response = client.post(URL, json=prompt_body(["G", "C", "D", "Em", "C", "D", "G"]))
+    assert response.status_code == 200
+    text = response.json()["candidates"][0]["content"]["parts"][0]["text"]
+    assert '"tonic": "G"' in text
+    assert '"start_index": 6, "end_index": 6' in text
+
+
+def test_errors_are_simulated():
+    client = TestClient(create_app(FakeGeminiSettings("fixed", 0, error_rate=1.0)))
+    assert client.post(URL, json=prompt_body(["C"])).status_code in (429, 500)
+
+
+@pytest.mark.parametrize("distribution", ["fixed", "uniform", "exponential", "lognormal"])
+def test_latency_distributions(distribution):
+    rng = random.Random(0)
+    settings = FakeGeminiSettings(distribution, 100)
+    samples = sorted(sample_latency(settings, rng) for _ in range(2001))
+    assert all(sample >= 0 for sample in samples)
+    assert 0.05 < samples[1000] < 0.15
+    with pytest.raises(ValueError):
+        sample_latency(FakeGeminiSettings("foo"), rng)
+
+
+def test_gemini_client_uses_the_configured_endpoint(monkeypatch):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    settings = FakeGeminiSettings("fixed", 0, mode="Dorian")
+    server = uvicorn.Server(
+        uvicorn.Config(create_app(settings), host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        while not server.started:
+            time.sleep(0.01)
+        monkeypatch.setenv("GEMINI_API_ENDPOINT", f"http://127.0.0.1:{port}")
+        monkeypatch.setenv("GEMINI_API_KEY", "fake")
+        result = detect_tonic_and_mode(["Dm7", "G7", "Dm7", "G7"], "gemini-2.5-flash", 5)
+    finally:
+        server.should_exit = True
+        thread.join()
+    assert result["global_analysis"]["mode"] == "Dorian"
+    assert result["harmonic_segments"][0]["end_index"] == 3
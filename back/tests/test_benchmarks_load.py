@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+
+from benchmarks.load import percentile, run_level, summarize
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3
+    assert percentile([], 50) == 0
+
+
+def test_summarize():
+    report = summarize(4, [0.2, 0.1, 0.4, 0.3], errors=1, elapsed=2.0)
+    assert report == {
+        "concurrency": 4,
+        "requests": 4,
+        "errors": 1,
+        "error_rate": 0.25,
+        "throughput": 2.0,
+        "p50_ms": 200.0,
+        "p95_ms": 400.0,
+        "p99_ms": 400.0,
+    }
+
+
+def test_run_level_counts_errors():
+    seen = []
+
+    def handler(request):
+        seen.append(request.content)
+        if len(seen) % 4 == 0:
+            return httpx.Response(500, text="Internal Server Error")
+        if len(seen) % 4 == 1:
+            return httpx.Response(200, json={"error": "Progression cannot be empty"})
+        return httpx.Response(200, json={"tonic": "C"})
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            return await run_level(client, "/analyze", [{"id": 1}, {"id": 2}], 3, 0.05)
+
+    report = asyncio.run(run())
+    assert report["concurrency"] == 3
+    assert report["requests"] == len(seen) > 3
+    assert report["errors"] == len(seen) // 4 + (len(seen) + 3) // 4
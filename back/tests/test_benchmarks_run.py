@@ -0,0 +1,50 @@
+import pytest
+
+from benchmarks.run import (
+    BENCHMARKS,
+    Benchmark,
+    check_thresholds,
+    run_benchmarks,
+    scaling_exponent,
+)
+
+SIZES = [4, 16, 64, 256, 1024]
+
+
+def test_scaling_exponent():
+    assert scaling_exponent(SIZES, [1e-3 + 1e-6 * n for n in SIZES]) < 1.2
+    assert scaling_exponent(SIZES, [1e-6 * n * n for n in SIZES]) == pytest.approx(2)
+    assert scaling_exponent([100], [1.0]) is None
+
+
+def test_check_thresholds():
+    thresholds = {"max_exponent": {"default": 1.4, "slow": 2.5}, "max_slowdown": {"default": 1.5}}
+    results = {
+        "results": [
+            {"name": "fast", "size": 10, "seconds": 0.002},
+            {"name": "slow", "size": 10, "seconds": 0.001},
+        ],
+        "scaling": {"fast": 2.0, "slow": 2.0},
+    }
+    baseline = {"results": [{"name": "fast", "size": 10, "seconds": 0.001}]}
+    assert check_thresholds(results, thresholds) == ["fast : croissance en n^2.00 (seuil n^1.4)"]
+    failures = check_thresholds(results, thresholds, baseline)
+    assert len(failures) == 2 and failures[1].startswith("fast (10) : x2.00")
+
+
+def test_run_benchmarks():
+    pipeline = next(benchmark for benchmark in BENCHMARKS if benchmark.name == "pipeline")
+    results = run_benchmarks(
+        [pipeline._replace(sizes=(4, 16, 64)), Benchmark("noop", lambda size: lambda: None, (1,))],
+        repeat=1,
+    )
+    assert [(r["name"], r["size"]) for r in results["results"]] == [
+        ("pipeline", 4),
+        ("pipeline", 16),
+        ("pipeline", 64),
+        ("noop", 1),
+    ]
+    assert set(results["scaling"]) == {"pipeline"}
+    # --quick : la plus petite taille est toujours mesurée
+    quick = run_benchmarks([pipeline._replace(sizes=(4, 16))], max_size=2, repeat=1)
+    assert [r["size"] for r in quick["results"]] == [4]
@@ -0,0 +1,72 @@
+import pytest
+
+from app.chord_identification.identifier import identify_chord, pitch_set_of
+
+
+def names(matches):
+    return [match["name"] for match in matches]
+
+
+@pytest.mark.parametrize(
+    "notes, expected",
+    [
+        ([0, 4, 7], "C"),
+        ([9, 0, 4], "Am"),
+        ([7, 11, 2, 5], "G7"),
+        ([2, 5, 9, 0], "Dm7"),
+        ([8, 11, 2], "G#dim"),
+        ([0, 4, 7, 11], "Cmaj7"),
+        ([0, 4, 7, 10, 2], "C9"),
+        ([0, 5, 7], "Csus4"),
+        ([0, 7], "C5"),
+    ],
+)
+def test_identify_chord_exact_matches(notes, expected):
+    matches = identify_chord(notes)
+    assert matches[0]["name"] == expected
+    assert matches[0]["missing_notes"] == []
+    assert matches[0]["extra_notes"] == []
+
+
+def test_identify_chord_aliases_are_not_proposed():
+    assert not {"CM", "Cmaj", "Cmin", "Cd", "C+"} & set(names(identify_chord([0, 4, 7], limit=8)))
+
+
+def test_identify_chord_bass_selects_inversion():
+    # Mêmes notes, nom différent selon la basse
+    assert identify_chord([9, 0, 4, 7], bass=9)[0]["name"] == "Am7"
+    assert identify_chord([9, 0, 4, 7], bass=0)[0]["name"] == "C6"
+    assert identify_chord([11, 2, 5, 9], bass=11)[0]["name"] == "Bm7b5"
+    first_inversion = identify_chord([0, 4, 7], bass=4)[0]
+    assert first_inversion["name"] == "C/E"
+    assert first_inversion["bass"] == "E"
+
+
+def test_identify_chord_midi_notes_use_lowest_note_as_bass():
+    assert identify_chord([64, 67, 72])[0]["name"] == "C/E"
+    assert identify_chord([60, 64, 67])[0]["name"] == "C"
+
+
+def test_identify_chord_omitted_fifth():
+    best = identify_chord([0, 4, 10])[0]
+    assert best["name"] == "C7"
+    assert best["missing_notes"] == ["G"]
+
+
+def test_identify_chord_ranking_and_limit():
+    matches = identify_chord([0, 3, 6, 9], limit=3)
+    assert len(matches) == 3
+    assert all(match["quality"] == "dim7" for match in matches)
+    scores = [match["score"] for match in identify_chord([0, 4, 7], limit=8)]
+    assert scores == sorted(scores)
+
+
+def test_identify_chord_no_match():
+    assert identify_chord([]) == []
+    assert identify_chord([0, 1, 2, 3, 4, 5]) == []
+
+
+def test_pitch_set_of():
+    assert pitch_set_of([0, 4, 7]) == pitch_set_of([60, 64, 79]) == 0b10010001
+    with pytest.raises(ValueError):
+        pitch_set_of([-1])
@@ -0,0 +1,121 @@
+import pytest
+
+from app.lead_sheet_ingestion.parser import (
+    LeadSheetParser,
+    analyze_song,
+    normalize_chord_symbol,
+    parse_lead_sheets,
+)
+
+SONGBOOK = """\
+{title: Let It Be}
+{start_of_verse: Verse 1}
+When I [C]find myself in [G]times of trouble
+[Am]Mother Mary [F]comes to me
+{end_of_verse}
+{soc}
+[F]  [C/E]  [Dm7]  [C]
+{eoc}
+{c: Outro}
+| C / G / | F | % | Cmaj11#5 |
+{new_song}
+[Intro]
+C    G    Am   F
+Autumn leaves lyrics, ignored
+Chorus:
+| Dm7 | G7 | Cmaj7 | N.C. |
+Am  E7  x2
+{title: Waltz}
+{time: 3/4}
+| D | A7 / / |
+"""
+
+
+def chords_of(song):
+    return [(chord.root + chord.quality, chord.inversion, chord.duration) for chord in song.chords]
+
+
+@pytest.mark.parametrize(
+    "symbol, expected",
+    [
+        ("Am7", ("A", "m7", 0)),
+        ("Bbmaj7", ("Bb", "maj7", 0)),
+        ("F#ø", ("F#", "m7b5", 0)),
+        ("CM7", ("C", "maj7", 0)),
+        ("C-7", ("C", "m7", 0)),
+        ("C6/9", ("C", "6/9", 0)),
+        ("C/E", ("C", "", 1)),
+        ("Am7/G", ("A", "m7", 3)),
+        ("C/Bb", ("C", "", 0)),
+        ("E♭m", ("Eb", "m", 0)),
+        ("Cmaj11#5", None),
+        ("Hello", None),
+    ],
+)
+def test_normalize_chord_symbol(symbol, expected):
+    assert normalize_chord_symbol(symbol) == expected
+
+
+def test_songbook_is_split_into_songs():
+    first, second, third = parse_lead_sheets([SONGBOOK])
+    assert first.title == "Let It Be"
+    assert chords_of(first) == [
+        ("C", 0, 4),
+        ("G", 0, 4),
+        ("Am", 0, 4),
+        ("F", 0, 4),
+        ("F", 0, 4),
+        ("C", 1, 4),
+        ("Dm7", 0, 4),
+        ("C", 0, 4),
+        ("C", 0, 2),
+        ("G", 0, 2),
+        ("F", 0, 4),
+        ("F", 0, 4),
+    ]
+    assert first.sections == [
+        {"label": "Verse 1", "start_index": 0, "end_index": 3},
+        {"label": "Chorus", "start_index": 4, "end_index": 7},
+        {"label": "Outro", "start_index": 8, "end_index": 11},
+    ]
+    assert first.unknown_symbols == ["Cmaj11#5"]
+
+    # Grille en texte brut : une mesure par accord, "N.C." et paroles ignorés
+    assert second.title is None
+    assert [name for name, _, _ in chords_of(second)] == [
+        "C", "G", "Am", "F", "Dm7", "G7", "Cmaj7", "Am", "E7", "Am", "E7",
+    ]  # fmt: skip
+    assert [section["label"] for section in second.sections] == ["Intro", "Chorus"]
+
+    assert third.title == "Waltz"
+    assert chords_of(third) == [("D", 0, 3), ("A7", 0, 3)]
+
+
+def test_parsing_is_incremental():
+    # Le texte arrive par petits blocs qui coupent lignes et symboles
+    parser = LeadSheetParser()
+    songs = []
+    for start in range(0, len(SONGBOOK), 7):
+        songs.extend(parser.feed(SONGBOOK[start : start + 7]))
+        if start < SONGBOOK.index("{new_song}"):
+            assert songs == []
+    # Les deux premiers morceaux sont complets avant la fin du texte
+    assert [song.title for song in songs] == ["Let It Be", None]
+    songs.extend(parser.close())
+    assert [chords_of(song) for song in songs] == [
+        chords_of(song) for song in parse_lead_sheets([SONGBOOK])
+    ]
+
+
+def test_analyze_song():
+    song = next(parse_lead_sheets(["{title: ii-V}\n[Dm7]One [G7]two [Cmaj7]three\n"]))
+    result = analyze_song(song, detector="local")
+    assert result["title"] == "ii-V"
+    assert result["chordsData"][0]["root"] == "D"
+    assert result["analysis"]["tonic"] == "C"
+    assert [item["found_numeral"] for item in result["analysis"]["quality_analysis"]] == [
+        "ii7",
+        "V7",
+        "Imaj7",
+    ]
+    assert "error" in analyze_song(song, detector="foo")
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from app.markov_generation.generator import (
+    STATE_COUNT,
+    generate_progressions,
+    model_from_templates,
+    preset_model,
+    sample_progressions,
+    states_from_analysis,
+    states_from_numerals,
+    train_markov_model,
+)
+from app.modal_substitution.generator import get_diatonic_triad_chord
+from app.utils.common import get_diatonic_7th_chord
+from app.utils.progression_kernel import analyze_progression
+from constants import PROGRESSION_PRESETS
+
+
+def test_states_from_numerals():
+    # I, V7 et vi ; un chiffrage inconnu coupe la suite
+    assert states_from_numerals(["I", "V7", "(foo)", "vi"]) == [[1, 8], [11]]
+    analysis = analyze_progression(["Dm7", "G7", "Cmaj7"], 0, "Ionian")
+    assert states_from_analysis(analysis) == [[2, 8, 0]]
+
+
+def test_trained_probabilities_are_normalized():
+    model = train_markov_model([[1, 9, 11, 7], [1, 7, 9, 1]], max_order=2)
+    for probabilities, known in zip(model.probabilities, model.known):
+        assert probabilities.shape[1] == STATE_COUNT
+        assert np.allclose(probabilities[known].sum(axis=1), 1)
+        assert not probabilities[~known].any()
+    with pytest.raises(ValueError):
+        train_markov_model([], max_order=2)
+    with pytest.raises(ValueError):
+        train_markov_model([[1]], max_order=9)
+
+
+def template_sequences(templates):
+    return [
+        sequence for template in templates for sequence in states_from_numerals(template.split())
+    ]
+
+
+def test_samples_only_follow_observed_transitions():
+    templates = PROGRESSION_PRESETS["pop"]
+    observed = {
+        pair for sequence in template_sequences(templates) for pair in zip(sequence, sequence[1:])
+    }
+    states, log_probability = sample_progressions(
+        model_from_templates(templates, max_order=1), length=6, samples=500, seed=0
+    )
+    assert states.shape == (500, 6)
+    assert np.isfinite(log_probability).all()
+    for row in states.tolist():
+        assert set(zip(row, row[1:])) <= observed
+
+
+def test_constraints_are_enforced():
+    states, _ = sample_progressions(
+        preset_model("jazz"), length=5, samples=300, start_on_tonic=True, cadence="plagal", seed=1
+    )
+    degrees = states // 2 + 1
+    assert (degrees[:, 0] == 1).all()
+    assert (degrees[:, -2] == 4).all()
+    assert (degrees[:, -1] == 1).all()
+    with pytest.raises(ValueError):
+        sample_progressions(preset_model("jazz"), length=1, samples=10, cadence="authentic")
+    with pytest.raises(ValueError):
+        sample_progressions(preset_model("jazz"), length=4, samples=10, cadence="foo")
+
+
+def test_generated_progressions_use_the_diatonic_builders():
+    progressions = generate_progressions(
+        preset_model("jazz"), "Eb", "Dorian", length=4, samples=2000, seed=3
+    )
+    assert len(progressions) == len({tuple(p["chords"]) for p in progressions})
+    scores = [progression["log_probability"] for progression in progressions]
+    assert scores == sorted(scores, reverse=True)
+    for progression in progressions:
+        for numeral, chord in zip(progression["numerals"], progression["chords"]):
+            (state,) = states_from_numerals([numeral])[0]
+            degree, is_triad = state // 2 + 1, bool(state % 2)
+            if is_triad:
+                expected = get_diatonic_triad_chord(degree, 3, "Dorian")
+            else:
+                expected = get_diatonic_7th_chord(degree, 3, "Dorian")
+            assert chord == expected
+
+
+def test_generation_is_reproducible():
+    model = preset_model("pop")
+    first = generate_progressions(model, "C", "Ionian", samples=100, seed=42)
+    assert generate_progressions(model, "C", "Ionian", samples=100, seed=42) == first
+    assert len(generate_progressions(model, "C", "Ionian", samples=100, limit=2)) == 2
+    with pytest.raises(ValueError):
+        generate_progressions(model, "C", "Foo")
+    with pytest.raises(ValueError):
+        preset_model("unknown")
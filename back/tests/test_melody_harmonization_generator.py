@@ -0,0 +1,83 @@
+from itertools import product
+
+import numpy as np
+import pytest
+
+from app.melody_harmonization.generator import (
+    HarmonizationWeights,
+    MelodyNote,
+    _candidates,
+    harmonize_melody,
+    harmonize_melody_analysis,
+    melody_profile,
+)
+from app.utils.modes import get_mode_registry
+
+# "Ah vous dirai-je maman" : une note par temps, un silence à la fin de chaque phrase
+TWINKLE = [60, 60, 67, 67, 69, 69, 67, None, 65, 65, 64, 64, 62, 62, 60, None]
+TWINKLE_NOTES = [MelodyNote(pitch, beat, 1) for beat, pitch in enumerate(TWINKLE) if pitch]
+
+
+def test_profile_splits_notes_across_slots():
+    notes = [MelodyNote(60, 0, 3), MelodyNote(64, 3, 2), MelodyNote(7, 6.5, 0.5)]
+    profile = melody_profile(notes, 2)
+    assert profile.shape == (4, 12)
+    assert profile[:, 0].tolist() == [2, 1, 0, 0]
+    assert profile[:, 4].tolist() == [0, 1, 1, 0]
+    assert profile[3, 7] == 0.5
+    with pytest.raises(ValueError):
+        melody_profile([], 4)
+    with pytest.raises(ValueError):
+        melody_profile([MelodyNote(60, 0, 0)], 4)
+
+
+def test_harmonizes_a_simple_tune():
+    _, slots = harmonize_melody(TWINKLE_NOTES, "C", "Ionian", beats_per_chord=2, sevenths=False)
+    assert [slot["chord"] for slot in slots] == ["C", "C", "F", "C", "F", "C", "G", "C"]
+    assert [slot["start"] for slot in slots[:3]] == [0, 2, 4]
+    assert {slot["source"] for slot in slots} == {"mode:Ionian"}
+
+
+def test_dynamic_programming_is_optimal():
+    weights = HarmonizationWeights()
+    notes = [MelodyNote(68, 0, 1), MelodyNote(67, 1, 1), MelodyNote(63, 2, 1)]
+    cost, slots = harmonize_melody(notes, "C", "Ionian", 1, False, weights)
+    candidates = _candidates(get_mode_registry(), 0, "Ionian", False, (1.0, 1.0))
+    profile = melody_profile(notes, 1)
+    local = 3 * (profile @ (1 - candidates.members).T) / profile.sum(axis=1, keepdims=True)
+    local += candidates.borrowing
+    off_tonic = candidates.roots != 0
+
+    def total(path):
+        value = sum(local[slot, index] for slot, index in enumerate(path))
+        value += sum(candidates.transitions[a, b] for a, b in zip(path, path[1:]))
+        return value + off_tonic[path[0]] + off_tonic[path[-1]]
+
+    best = min(product(range(len(candidates.names)), repeat=3), key=total)
+    assert cost == pytest.approx(total(best))
+    assert [slot["chord"] for slot in slots] == [candidates.names[i] for i in best]
+    # Ab, G, Eb : la mélodie appelle des accords empruntés
+    assert any(slot["source"] != "mode:Ionian" for slot in slots)
+
+
+def test_output_uses_the_analyze_format():
+    result = harmonize_melody_analysis(TWINKLE_NOTES, "G", "Ionian", beats_per_chord=4)
+    assert result["tonic"] == "G"
+    assert len(result["quality_analysis"]) == len(result["harmonization"]["chords"]) == 4
+    assert [item["chord"] for item in result["quality_analysis"]] == [
+        slot["chord"] for slot in result["harmonization"]["chords"]
+    ]
+    assert all(item["duration"] == 4 for item in result["quality_analysis"])
+    assert "harmonized_chords" in result and "tritone_substitutions" in result
+    # Le mode est accepté quelle que soit sa casse, comme à l'harmonisation
+    assert harmonize_melody_analysis(TWINKLE_NOTES, "G", "ionian")["mode"] == "Ionian"
+    with pytest.raises(ValueError):
+        harmonize_melody(TWINKLE_NOTES, "C", "Foo")
+
+
+def test_long_melodies_are_harmonized():
+    rng = np.random.default_rng(0)
+    pitches = rng.choice([60, 62, 64, 65, 67, 69, 71], size=2000)
+    notes = [MelodyNote(int(pitch), index / 2, 0.5) for index, pitch in enumerate(pitches)]
+    _, slots = harmonize_melody(notes, "C", "Ionian", beats_per_chord=1)
+    assert len(slots) == 1000
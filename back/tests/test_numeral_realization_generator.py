@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.modal_substitution.generator import get_diatonic_triad_chord
+from app.numeral_realization.generator import (
+    parse_numeral_template,
+    realize_degrees,
+    realize_template,
+)
+from app.utils.common import get_diatonic_7th_chord, get_note_index
+from app.utils.modes import MODE_REGISTRY
+
+
+def test_parse_numeral_template():
+    steps = parse_numeral_template("ii7–V7–Imaj7 | vii° VII")
+    assert [(s.degree, s.is_triad, s.is_minor) for s in steps] == [
+        (2, False, True),
+        (5, False, False),
+        (1, False, False),
+        (7, True, True),
+        (7, True, False),
+    ]
+    assert parse_numeral_template(["I", "V7"]) == parse_numeral_template("I-V7")
+
+
+@pytest.mark.parametrize("template", ["", "ii7 X7", "VIII", "Ii", "I bVII", "#iv°"])
+def test_parse_numeral_template_invalid(template):
+    with pytest.raises(ValueError):
+        parse_numeral_template(template)
+
+
+def test_realize_template_all_contexts_match_diatonic_builders():
+    """Chaque réalisation correspond aux constructeurs diatoniques, accord par accord."""
+    realizations = realize_template("ii7 V7 I vi")
+    # Seuls les modes où le modèle est diatonique (casse et qualité des chiffrages) sont réalisés
+    assert {r["mode"] for r in realizations} == {"Ionian"}
+    assert len(realizations) == 12
+    for realization in realizations:
+        tonic_index = get_note_index(realization["tonic"])
+        mode_name = realization["mode"]
+        assert realization["chords"] == [
+            get_diatonic_7th_chord(2, tonic_index, mode_name),
+            get_diatonic_7th_chord(5, tonic_index, mode_name),
+            get_diatonic_triad_chord(1, tonic_index, mode_name),
+            get_diatonic_triad_chord(6, tonic_index, mode_name),
+        ]
+
+
+def test_realize_template_selected_contexts():
+    realizations = realize_template("ii–v7–i7", tonics=["C", "Bb"], modes=["dorian", "Aeolian"])
+    assert [(r["tonic"], r["mode"]) for r in realizations] == [
+        ("C", "Dorian"),
+        ("C", "Aeolian"),
+        ("A#", "Dorian"),
+        ("A#", "Aeolian"),
+    ]
+    assert realizations[0]["chords"] == ["Dm", "Gm7", "Cm7"]
+    assert realizations[1]["chords"] == ["Ddim", "Gm7", "Cm7"]
+    assert realizations[1]["numerals"] == ["ii°", "v7", "i7"]
+    assert realize_template("ii7 V7 Imaj7", ["C"], ["Ionian"])[0]["chords"] == [
+        "Dm7",
+        "G7",
+        "Cmaj7",
+    ]
+
+
+@pytest.mark.parametrize(
+    "template", ["I bVII bVI V7", "I bIII IV", "i iv V7", "Vmaj7 Im7", "ii° V7 I", "iiø7 V7"]
+)
+def test_realize_template_rejects_non_diatonic_numerals(template):
+    """Un chiffrage chromatique, de casse ou de qualité contraire au mode n'est pas réalisé."""
+    with pytest.raises(ValueError):
+        realize_template(template, ["C"], ["Ionian"])
+
+
+def test_explicit_suffixes_select_the_modes():
+    """Un suffixe qui fixe la qualité écarte les modes dont l'accord diffère."""
+    steps = parse_numeral_template("Vmaj7 ii7 IIm7 viiø7 V9")
+    assert [step.quality is not None for step in steps] == [True, True, True, True, False]
+    assert steps[1].quality == steps[2].quality and steps[2].is_minor
+    assert {r["mode"] for r in realize_template("Vmaj7 Imaj7")} == {"Lydian"}
+    assert {r["mode"] for r in realize_template("iiø7 V7 i", ["C"])} == {"Harmonic Minor"}
+    assert realize_template("IIm7 V7 Imaj7", ["C"])[0]["chords"] == ["Dm7", "G7", "Cmaj7"]
+
+
+def test_realize_template_unknown_mode():
+    with pytest.raises(ValueError):
+        realize_template("I IV V", modes=["Bebop"])
+
+
+def test_realize_degrees_matches_realize_template():
+    degrees = np.array([[1, 4, 0], [5, 3, 4]])
+    is_triad = np.array([[False, False, False], [True, True, True]])
+    aeolian = MODE_REGISTRY.ids["Aeolian"]
+    chords, numerals = realize_degrees(degrees, is_triad, get_note_index("D"), aeolian)
+    expected = [
+        realize_template(template, tonics=["D"], modes=["Aeolian"])[0]
+        for template in ("iiø7 v7 i7", "VI iv v")
+    ]
+    assert chords == [realization["chords"] for realization in expected]
+    assert numerals == [realization["numerals"] for realization in expected]
@@ -0,0 +1,85 @@
+import pytest
+
+from app.pattern_detection.identifier import (
+    PATTERN_AUTOMATON,
+    SECONDARY_DOMINANT_CHAIN,
+    compile_patterns,
+    detect_patterns,
+    find_patterns,
+    numeral_symbol,
+)
+from app.pipeline import analyze_progression_segments
+from app.utils.progression_kernel import analyze_progression
+
+
+def names_and_spans(matches):
+    return [(match["name"], match["start_index"], match["end_index"]) for match in matches]
+
+
+@pytest.mark.parametrize(
+    "chord, tonic, expected",
+    [
+        ("Dm7", 0, "ii"),
+        ("G13", 0, "V7"),
+        ("Cmaj7", 0, "I"),
+        ("Bb7", 0, "bVII7"),
+        ("Bm7b5", 0, "vii°"),
+        ("Bm7b5", 9, "ii°"),
+        ("Xyz", 0, None),
+    ],
+)
+def test_numeral_symbol(chord, tonic, expected):
+    assert numeral_symbol(chord, tonic) == expected
+
+
+def brute_force(symbols, automaton):
+    return sorted(
+        (pattern_id, start, start + len(pattern.symbols) - 1)
+        for pattern_id, pattern in enumerate(automaton.patterns)
+        for start in range(len(symbols) - len(pattern.symbols) + 1)
+        if tuple(symbols[start : start + len(pattern.symbols)]) == pattern.symbols
+    )
+
+
+def test_automaton_matches_brute_force():
+    automaton = compile_patterns({"a": ("x y", "y"), "b": ("x y z", "y z x y"), "c": ("z z",)})
+    symbols = ["x", "y", "z", "x", "y", "z", "z", None, "y", "x", "y"]
+    assert sorted(find_patterns(symbols, automaton)) == brute_force(symbols, automaton)
+
+
+def test_default_library_matches_brute_force():
+    symbols = ["ii", "V7", "I", "vi", "ii", "V7", "I", "III7", "VI7", "II7", "V7", "I", "iv"]
+    assert sorted(find_patterns(symbols)) == brute_force(symbols, PATTERN_AUTOMATON)
+
+
+def test_detect_cadences():
+    progression = ["Dm7", "G7", "Cmaj7", "Fm", "Bb7", "C"]
+    matches = detect_patterns(analyze_progression(progression, 0, "Ionian"), "C")
+    assert names_and_spans(matches) == [
+        ("ii-V-I", 0, 2),
+        ("Authentic Cadence", 1, 2),
+        ("Backdoor Cadence", 3, 5),
+    ]
+    assert matches[0]["numerals"] == ["ii7", "V7", "Imaj7"]
+    assert matches[2]["chords"] == ["Fm", "Bb7", "C"]
+
+
+def test_overlapping_chain_is_merged():
+    progression = ["B7", "E7", "A7", "D7", "G7", "C"]
+    matches = detect_patterns(analyze_progression(progression, 0, "Ionian"), "C")
+    assert (SECONDARY_DOMINANT_CHAIN, 0, 4) in names_and_spans(matches)
+
+
+def test_patterns_follow_segment_tonics():
+    segments = [
+        {"start_index": 0, "end_index": 2, "tonic": "C", "mode": "Ionian", "explanation": ""},
+        {"start_index": 3, "end_index": 5, "tonic": "A", "mode": "Aeolian", "explanation": ""},
+    ]
+    progression = ["Dm7", "G7", "C", "Bm7b5", "E7", "Am"]
+    analysis = analyze_progression_segments(progression, segments)
+    assert names_and_spans(detect_patterns(analysis, "C")) == [
+        ("ii-V-I", 0, 2),
+        ("Authentic Cadence", 1, 2),
+        ("Minor ii-V-i", 3, 5),
+        ("Authentic Cadence", 4, 5),
+    ]
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from app.pipeline import ANALYSIS_SECTIONS, build_progression_analysis
+from app.schema import ChordItem
+from app.utils.deadline import AnalysisCancelled, Deadline, DeadlineExceeded
+from app.utils.metrics import StageTimer
+from app.utils.modes import register_modes, reset_mode_registry
+
+PROGRESSION = [
+    ChordItem(id=1, root="D", quality="m7"),
+    ChordItem(id=2, root="G", quality="7"),
+    ChordItem(id=3, root="C", quality="maj7"),
+]
+
+ANALYSIS_RESULT = {
+    "global_analysis": {"tonic": "C", "mode": "Ionian", "explanation": "ii-V-I"},
+    "harmonic_segments": [
+        {"start_index": 0, "end_index": 2, "tonic": "C", "mode": "Ionian", "explanation": ""}
+    ],
+}
+
+
+def test_build_progression_analysis_complete():
+    """Sans échéance, toutes les sections sont calculées."""
+    result = build_progression_analysis(PROGRESSION, ANALYSIS_RESULT)
+    for section in ANALYSIS_SECTIONS:
+        assert section in result
+    assert "partial" not in result
+    assert len(result["harmonized_chords"]["Dorian"]) == 3
+
+
+def test_build_progression_analysis_registered_modes_opt_in():
+    """Les gammes enregistrées ne servent à l'harmonisation et aux emprunts que sur demande."""
+    register_modes({"Test": ([0, 2, 4, 6, 7, 9, 11], None, None)})
+    progression = PROGRESSION + [ChordItem(id=4, root="D", quality="")]
+    segment = {**ANALYSIS_RESULT["harmonic_segments"][0], "end_index": 3}
+    analysis_result = {**ANALYSIS_RESULT, "harmonic_segments": [segment]}
+    try:
+        result = build_progression_analysis(progression, analysis_result)
+        assert "Test" not in result["harmonized_chords"]
+        assert "Test" not in result["borrowed_chords"]["D"]
+        result = build_progression_analysis(progression, analysis_result, registered_modes=True)
+        assert len(result["harmonized_chords"]["Test"]) == 4
+        assert "Test" in result["borrowed_chords"]["D"]
+    finally:
+        reset_mode_registry()
+
+
+def test_build_progression_analysis_partial_on_deadline():
+    """Une échéance dépassée renvoie les sections déjà calculées et marque la réponse."""
+    deadline = Deadline(0.001)
+    time.sleep(0.01)
+    result = build_progression_analysis(PROGRESSION, ANALYSIS_RESULT, deadline)
+    assert result["partial"] is True
+    assert result["missing_sections"] == ANALYSIS_SECTIONS
+    assert result["tonic"] == "C"
+
+
+def test_build_progression_analysis_records_stages():
+    """Chaque section est chronométrée, dans l'ordre du calcul."""
+    timer = StageTimer(None)
+    build_progression_analysis(PROGRESSION, ANALYSIS_RESULT, timer=timer)
+    assert list(timer.durations) == [
+        "segment_analysis",
+        "harmonic_patterns",
+        "borrowed_chords",
+        "major_modes_substitutions",
+        "harmonization",
+        "secondary_dominants",
+        "tritone_substitutions",
+    ]
+    assert all(seconds >= 0 for seconds in timer.durations.values())
+
+
+def test_build_progression_analysis_cancelled():
+    """Une annulation interrompt l'analyse au lieu de renvoyer un résultat partiel."""
+    deadline = Deadline()
+    deadline.cancel()
+    with pytest.raises(AnalysisCancelled):
+        build_progression_analysis(PROGRESSION, ANALYSIS_RESULT, deadline)
+
+
+def test_deadline_check():
+    assert Deadline().remaining() is None
+    Deadline(10).check()
+    expired = Deadline(0.001)
+    time.sleep(0.01)
+    assert expired.expired()
+    with pytest.raises(DeadlineExceeded):
+        expired.check()
@@ -0,0 +1,105 @@
+from itertools import islice, product
+
+import pytest
+
+from app.progression_enumeration.generator import (
+    EnumerationConstraints,
+    chord_candidates,
+    enumerate_page,
+    enumerate_progressions,
+    iter_solutions,
+)
+
+
+def brute_force(candidates, constraints):
+    """Filtre toutes les progressions possibles (référence pour le backtracking)."""
+    solutions = []
+    for solution in product(range(len(candidates)), repeat=constraints.length):
+        chosen = [candidates[index] for index in solution]
+        if constraints.distinct and len(set(solution)) < len(solution):
+            continue
+        if constraints.start_on_tonic and chosen[0].degree != 1:
+            continue
+        if constraints.cadence == "authentic" and [c.degree for c in chosen[-2:]] != [5, 1]:
+            continue
+        if sum(candidate.borrowed for candidate in chosen) < constraints.min_borrowed:
+            continue
+        solutions.append(solution)
+    return solutions
+
+
+def test_candidates_come_from_the_mode_tables():
+    constraints = EnumerationConstraints(borrow_modes=("Aeolian",))
+    candidates = chord_candidates("C", "Ionian", constraints)
+    diatonic = [c.chord for c in candidates if not c.borrowed]
+    borrowed = {c.numeral: c.chord for c in candidates if c.borrowed}
+    assert diatonic[:4] == ["C", "Cmaj7", "Dm", "Dm7"]
+    assert len(diatonic) == 14
+    # Les accords d'Aeolian déjà diatoniques à Ionian (ex: Dm, F) ne sont pas des emprunts
+    assert borrowed["bVI"] == "Ab"
+    assert borrowed["iv7"] == "Fm7"
+    assert "Dm" not in borrowed.values()
+    triads = chord_candidates("C", "Ionian", EnumerationConstraints(sevenths=False))
+    assert [c.chord for c in triads] == ["C", "Dm", "Em", "F", "G", "Am", "Bdim"]
+    with pytest.raises(ValueError):
+        chord_candidates("C", "Foo", constraints)
+
+
+@pytest.mark.parametrize(
+    "constraints",
+    [
+        EnumerationConstraints(length=3),
+        EnumerationConstraints(length=3, distinct=False, start_on_tonic=True),
+        EnumerationConstraints(length=4, start_on_tonic=True, cadence="authentic", sevenths=False),
+        EnumerationConstraints(
+            length=4, cadence="authentic", borrow_modes=("Aeolian",), min_borrowed=2, triads=False
+        ),
+    ],
+)
+def test_backtracking_matches_brute_force(constraints):
+    candidates = chord_candidates("D", "Ionian", constraints)
+    assert list(iter_solutions(candidates, constraints)) == brute_force(candidates, constraints)
+
+
+def test_unsatisfiable_constraints_yield_nothing():
+    # Sept triades seulement pour huit positions sans répétition
+    constraints = EnumerationConstraints(length=8, sevenths=False)
+    assert list(enumerate_progressions("C", "Ionian", constraints)) == []
+    constraints = EnumerationConstraints(length=3, min_borrowed=1)
+    assert list(enumerate_progressions("C", "Ionian", constraints)) == []
+    with pytest.raises(ValueError):
+        list(enumerate_progressions("C", "Ionian", EnumerationConstraints(cadence="foo")))
+    with pytest.raises(ValueError):
+        list(enumerate_progressions("C", "Ionian", EnumerationConstraints(length=50)))
+
+
+def test_enumeration_is_lazy():
+    # Des milliards de solutions : seules les premières sont construites
+    constraints = EnumerationConstraints(length=12, borrow_modes=("Aeolian", "Dorian"))
+    first = list(islice(enumerate_progressions("C", "Ionian", constraints), 3))
+    assert first[0]["chords"][:3] == ["C", "Cmaj7", "Dm"]
+    assert len({tuple(progression["chords"]) for progression in first}) == 3
+
+
+def test_pages_cover_every_solution_once():
+    constraints = EnumerationConstraints(
+        length=4, start_on_tonic=True, cadence="plagal", borrow_modes=("Aeolian",), min_borrowed=1
+    )
+    expected = list(enumerate_progressions("A", "Ionian", constraints))
+    collected, cursor = [], None
+    while True:
+        page = enumerate_page("A", "Ionian", constraints, cursor, limit=37)
+        collected.extend(page["progressions"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert collected == expected
+    for progression in collected:
+        assert progression["numerals"][0].upper() in ("I", "IMAJ7", "I7")
+        assert progression["numerals"][-2].upper().startswith("IV")
+        assert progression["numerals"][-1].upper() in ("I", "IMAJ7", "I7")
+    assert all(any(progression["borrowed"]) for progression in collected)
+    with pytest.raises(ValueError):
+        enumerate_page("A", "Ionian", constraints, cursor=[0, 1], limit=10)
+    with pytest.raises(ValueError):
+        enumerate_page("A", "Ionian", constraints, limit=10_000)
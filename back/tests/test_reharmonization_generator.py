@@ -0,0 +1,80 @@
+import itertools
+
+import pytest
+
+from app.reharmonization.generator import (
+    CostWeights,
+    build_candidates,
+    make_transition_cost,
+    reharmonize,
+    search_lattice,
+)
+
+PROGRESSION = ["Dm7", "G7", "Cmaj7", "A7", "Dm7", "G7", "C"]
+
+
+def brute_force(lattice, transition_cost, top_k):
+    paths = []
+    for indexes in itertools.product(*(range(len(options)) for options in lattice)):
+        chosen = [lattice[i][j] for i, j in enumerate(indexes)]
+        cost = chosen[0].cost + sum(
+            transition_cost(previous, current) + current.cost
+            for previous, current in zip(chosen, chosen[1:])
+        )
+        paths.append(round(cost, 6))
+    return sorted(paths)[:top_k]
+
+
+def test_exact_search_matches_exhaustive_enumeration():
+    lattice = build_candidates(PROGRESSION[:4], "C", "Ionian")
+    cost = make_transition_cost()
+    results = search_lattice(lattice, cost, top_k=10, beam_width=None)
+    assert [c for c, _ in results] == brute_force(lattice, cost, 10)
+    # Chemins distincts, triés par coût
+    assert len({tuple(path) for _, path in results}) == 10
+
+
+def test_candidates():
+    lattice = build_candidates(PROGRESSION, "C", "Ionian")
+    g7 = {candidate.chord.name: candidate for candidate in lattice[1]}
+    assert g7["G7"].source == "original"
+    assert g7["C#7"].source == "tritone"
+    assert g7["Gm7"].source == "mode:Mixolydian"  # Une seule note modifiée (Bb)
+    # Chaque accord n'est proposé qu'une fois, avec son coût le plus bas
+    assert len(g7) == len(lattice[1])
+    assert g7["G7"].cost == 0.0
+
+
+def test_reharmonize_returns_sorted_top_k():
+    results = reharmonize(PROGRESSION, "C", "Ionian", top_k=4)
+    assert len(results) == 4
+    assert [r["cost"] for r in results] == sorted(r["cost"] for r in results)
+    assert all(len(r["chords"]) == len(PROGRESSION) for r in results)
+    assert results[0]["chords"][1]["found_numeral"] is not None
+    assert len({tuple(c["chord"] for c in r["chords"]) for r in results}) == 4
+
+
+def test_reharmonize_pluggable_cost():
+    def prefer_tritone(previous, current):
+        return 0.0 if current.source == "tritone" else 2.0
+
+    best = reharmonize(["Dm7", "G7", "Cmaj7"], "C", "Ionian", transition_cost=prefer_tritone)[0]
+    assert best["chords"][1] == {"chord": "C#7", "source": "tritone", "found_numeral": "bII7"}
+
+
+def test_reharmonize_without_borrowing_cost_prefers_borrowed_chords():
+    weights = CostWeights(root_motion=0.0, common_tones=0.0, borrowing=0.0)
+    results = reharmonize(["C", "F", "G"], "C", "Ionian", top_k=50, weights=weights)
+    assert all(r["cost"] == 0.0 for r in results)
+
+
+def test_reharmonize_bounded_beam():
+    long_progression = PROGRESSION * 20
+    results = reharmonize(long_progression, "C", "Ionian", top_k=3, beam_width=16)
+    assert len(results) == 3
+
+
+@pytest.mark.parametrize("progression, mode", [(["Dm7", "Hx"], "Ionian"), (["C"], "Bebop")])
+def test_reharmonize_invalid_input(progression, mode):
+    with pytest.raises(ValueError):
+        reharmonize(progression, "C", mode)
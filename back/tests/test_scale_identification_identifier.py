@@ -0,0 +1,48 @@
+from app.scale_identification.identifier import identify_scales
+
+C_MAJOR = [0, 2, 4, 5, 7, 9, 11]
+
+
+def contexts(matches):
+    return [(match["tonic"], match["mode"]) for match in matches]
+
+
+def test_identify_scales_full_scale_matches_its_seven_modes():
+    matches = identify_scales(C_MAJOR)
+    assert contexts(matches) == [
+        ("C", "Ionian"),
+        ("D", "Dorian"),
+        ("E", "Phrygian"),
+        ("F", "Lydian"),
+        ("G", "Mixolydian"),
+        ("A", "Aeolian"),
+        ("B", "Locrian"),
+    ]
+    assert all(match["unplayed_notes"] == [] for match in matches)
+
+
+def test_identify_scales_every_match_contains_the_notes():
+    notes = [0, 3, 7, 11]  # Cm(maj7)
+    matches = identify_scales(notes)
+    assert ("C", "Harmonic Minor") in contexts(matches)
+    assert ("C", "Melodic Minor") in contexts(matches)
+    for match in matches:
+        assert {"C", "D#", "G", "B"} <= set(match["scale_notes"])
+
+
+def test_identify_scales_ranking():
+    matches = identify_scales([60, 64, 67])
+    scores = [match["score"] for match in matches]
+    assert scores == sorted(scores)
+    # Les gammes dont la tonique est jouée passent avant les autres
+    assert matches[0]["tonic"] == "C"
+    assert len(matches[0]["unplayed_notes"]) == 4
+
+
+def test_identify_scales_tonic_hint_and_limit():
+    matches = identify_scales(C_MAJOR, tonic=9, limit=2)
+    assert contexts(matches) == [("A", "Aeolian"), ("C", "Ionian")]
+
+
+def test_identify_scales_no_match():
+    assert identify_scales([0, 1, 2]) == []
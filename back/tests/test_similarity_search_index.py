@@ -0,0 +1,151 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.similarity_search import index as similarity_index
+from app.similarity_search.index import (
+    NUM_HASHES,
+    SimilarityIndex,
+    analyze_for_index,
+    merge_start,
+    minhash_signature,
+    progression_ngrams,
+)
+
+BLUES = ["C7", "F7", "C7", "C7", "F7", "F7", "C7", "A7", "Dm7", "G7", "C7", "G7"]
+RHYTHM = ["Cmaj7", "Am7", "Dm7", "G7", "Em7", "A7", "Dm7", "G7", "Cmaj7"]
+ANDALUSIAN = ["Am", "G", "F", "E7", "Am", "G", "F", "E7"]
+
+
+def transpose(progression, semitones):
+    notes = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+    transposed = []
+    for chord in progression:
+        root = chord[:2] if len(chord) > 1 and chord[1] == "#" else chord[:1]
+        transposed.append(notes[(notes.index(root) + semitones) % 12] + chord[len(root) :])
+    return transposed
+
+
+def test_tokens_are_transposition_invariant():
+    tokens = analyze_for_index(RHYTHM, "C", "Ionian")
+    assert analyze_for_index(transpose(RHYTHM, 5), "F", "Ionian") == tokens
+    assert tokens[:4] == ["Imaj7:maj7", "vi7:m7", "ii7:m7", "V7:7"]
+    # Accord hors du mode : degré chromatique
+    assert analyze_for_index(["C", "Ab"], "C", "Ionian")[1] == "bVI:"
+    with pytest.raises(ValueError):
+        analyze_for_index(RHYTHM, "C", "Foo")
+
+
+def test_minhash_estimates_jaccard():
+    first = progression_ngrams(analyze_for_index(RHYTHM, "C", "Ionian"))
+    second = progression_ngrams(analyze_for_index(RHYTHM[:6], "C", "Ionian"))
+    jaccard = len(np.intersect1d(first, second)) / len(np.union1d(first, second))
+    estimate = (minhash_signature(first) == minhash_signature(second)).mean()
+    assert minhash_signature(first).shape == (NUM_HASHES,)
+    assert abs(estimate - jaccard) < 0.3
+
+
+def fill(index):
+    index.insert("blues", analyze_for_index(BLUES, "C", "Mixolydian"))
+    index.insert("rhythm", analyze_for_index(RHYTHM, "C", "Ionian"))
+    index.insert("andalusian", analyze_for_index(ANDALUSIAN, "A", "Aeolian"))
+
+
+def test_query_in_memory():
+    index = SimilarityIndex()
+    fill(index)
+    matches = index.query(analyze_for_index(transpose(RHYTHM, 2), "D", "Ionian"), top_k=2)
+    assert matches[0] == {"key": "rhythm", "score": 1.0}
+    assert len(matches) == 2
+    with pytest.raises(ValueError):
+        index.save()
+    with pytest.raises(ValueError):
+        index.insert("", ["I:"])
+
+
+def test_persisted_index_is_memory_mapped(tmp_path):
+    directory = str(tmp_path / "index")
+    index = SimilarityIndex(directory)
+    fill(index)
+    index.save()
+    assert index.pending_count == 0
+    index.insert("andalusian-2", analyze_for_index(transpose(ANDALUSIAN[:5], 7), "E", "Aeolian"))
+    index.save()
+    index.join()
+    # Le second segment, plus petit que le premier, n'est pas fusionné
+    assert index.segment_count == 2
+    assert sorted(name for name in os.listdir(directory) if name.startswith("seg")) == [
+        "segment-000001",
+        "segment-000002",
+    ]
+
+    # Un autre worker charge l'index sans rien recalculer
+    reloaded = SimilarityIndex(directory)
+    assert len(reloaded) == 4
+    assert isinstance(reloaded._segments[0].arrays.signatures, np.memmap)
+    matches = reloaded.query(analyze_for_index(transpose(ANDALUSIAN, 5), "D", "Aeolian"), top_k=2)
+    assert [match["key"] for match in matches] == ["andalusian", "andalusian-2"]
+    assert reloaded.query(analyze_for_index(BLUES, "G", "Mixolydian"), 1)[0]["key"] == "blues"
+
+
+def test_concurrent_writers_keep_each_others_entries(tmp_path):
+    directory = str(tmp_path / "index")
+    first, second = SimilarityIndex(directory), SimilarityIndex(directory)
+    first.insert("blues", analyze_for_index(BLUES, "C", "Mixolydian"))
+    second.insert("rhythm", analyze_for_index(RHYTHM, "C", "Ionian"))
+    first.save()
+    # `second` a été ouvert avant la première génération : il fusionne dans celle-ci
+    second.save()
+    second.join()
+    keys = [key.decode() for segment in second._segments for key in segment.arrays.keys.tolist()]
+    assert sorted(keys) == ["blues", "rhythm"]
+    assert len(SimilarityIndex(directory)) == 2
+
+
+def test_merge_start():
+    assert merge_start([]) == 0
+    assert merge_start([8]) == 1
+    assert merge_start([8, 4, 2, 1]) == 4
+    assert merge_start([1, 1]) == 0
+    assert merge_start([4, 1, 1]) == 1
+    assert merge_start([2, 1, 1]) == 0
+
+
+def test_flushes_and_merges_in_the_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(similarity_index, "FLUSH_THRESHOLD", 2)
+    directory = str(tmp_path / "index")
+    index = SimilarityIndex(directory)
+    index.insert("blues", analyze_for_index(BLUES, "C", "Mixolydian"))
+    index.insert("rhythm", analyze_for_index(RHYTHM, "C", "Ionian"))
+    index.join()
+    assert (index.pending_count, index.segment_count) == (0, 1)
+
+    # Segments de même taille : fusionnés en un seul, hors de l'appel à `save`
+    index.insert("andalusian", analyze_for_index(ANDALUSIAN, "A", "Aeolian"))
+    index.save()
+    index.insert("andalusian-2", analyze_for_index(transpose(ANDALUSIAN, 5), "D", "Aeolian"))
+    index.save()
+    index.join()
+    assert (len(index), index.segment_count) == (4, 1)
+    # Les segments fusionnés restent lisibles jusqu'à la publication suivante
+    folders = sorted(name for name in os.listdir(directory) if name.startswith("seg"))
+    assert folders == [f"segment-{generation:06d}" for generation in range(1, 5)]
+    index.insert("blues-2", analyze_for_index(BLUES, "G", "Mixolydian"))
+    index.save()
+    folders = sorted(name for name in os.listdir(directory) if name.startswith("seg"))
+    assert folders == ["segment-000004", "segment-000005"]
+    matches = index.query(analyze_for_index(ANDALUSIAN, "A", "Aeolian"), top_k=2)
+    assert [match["key"] for match in matches] == ["andalusian", "andalusian-2"]
+    assert len(SimilarityIndex(directory)) == 5
+
+
+def test_query_sees_segments_published_by_another_worker(tmp_path):
+    directory = str(tmp_path / "index")
+    reader, writer = SimilarityIndex(directory), SimilarityIndex(directory)
+    tokens = analyze_for_index(BLUES, "C", "Mixolydian")
+    assert reader.query(tokens) == []
+    writer.insert("blues", tokens)
+    writer.save()
+    assert reader.query(tokens) == [{"key": "blues", "score": 1.0}]
+    assert len(reader) == 1
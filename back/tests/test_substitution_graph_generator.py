@@ -0,0 +1,85 @@
+import pytest
+
+from app.substitution_graph.generator import (
+    EDGE_KINDS,
+    find_chain,
+    get_approaches,
+    get_substitutes,
+    get_substitution_graph,
+)
+from app.tritone_substitution.generator import get_tritone_substitute
+from app.utils.modes import register_modes, reset_mode_registry
+
+
+def chords_of(steps):
+    return [step["chord"] for step in steps]
+
+
+def test_adjacency_is_consistent():
+    graph = get_substitution_graph()
+    forward, backward = graph.forward, graph.backward
+    assert len(forward.neighbors) == len(backward.neighbors) == forward.offsets[-1]
+    assert set(forward.kinds.tolist()) == set(range(len(EDGE_KINDS)))
+    assert get_substitution_graph() is graph
+
+
+@pytest.mark.parametrize("chord", ["G7", "Db7", "E7b9", "A"])
+def test_tritone_substitutes_match_the_generator(chord):
+    tritones = [item["chord"] for item in get_substitutes(chord, kinds=["tritone"])]
+    assert tritones == [get_tritone_substitute(chord)[0]]
+
+
+def test_substitutes_in_a_key():
+    substitutes = get_substitutes("Dm7", "C")
+    borrowed = {item["chord"] for item in substitutes if item["relation"] == "borrowing"}
+    # Degré II dans les modes parallèles de Do
+    assert {"Dm7b5", "D7", "C#maj7"} <= borrowed
+    assert all(item["tonic"] == "C" for item in substitutes)
+    # Un alias désigne le même nœud
+    assert get_substitutes("CM", "C") == get_substitutes("C", "C")
+
+
+def test_approaches_to_target():
+    approaches = [chords_of(approach) for approach in get_approaches("Cmaj7")]
+    assert ["Dm7", "G7", "Cmaj7"] in approaches
+    assert ["D7", "G7", "Cmaj7"] in approaches
+    assert ["Fm7", "A#7", "Cmaj7"] in approaches
+    assert chords_of(get_approaches("Am", steps=1)[0])[-1] == "Am"
+    assert get_approaches("Bdim", steps=1) == []
+    assert get_approaches("Cmaj7")[0][1]["relation"] == "related_ii"
+
+
+def test_find_chain():
+    chain = find_chain("G7", "Cmaj7")
+    assert chain == [
+        {"chord": "G7", "relation": None},
+        {"chord": "Cmaj7", "relation": "secondary_dominant"},
+    ]
+    assert find_chain("C", "C") == [{"chord": "C", "relation": None}]
+    chain = find_chain("Dm7", "Db7", kinds=["related_ii", "tritone"])
+    assert chords_of(chain) == ["Dm7", "G7", "C#7"]
+    assert [step["relation"] for step in chain] == [None, "related_ii", "tritone"]
+    assert find_chain("Cmaj7", "G7", kinds=["tritone"]) is None
+
+
+def test_invalid_queries():
+    with pytest.raises(ValueError):
+        get_substitutes("Xyz")
+    with pytest.raises(ValueError):
+        get_substitutes("C", kinds=["foo"])
+    with pytest.raises(ValueError):
+        get_approaches("C", steps=9)
+
+
+def test_graph_follows_the_mode_registry():
+    def borrowed(chord):
+        return {item["chord"] for item in get_substitutes(chord, "C", kinds=["borrowing"])}
+
+    assert "Eaug" not in borrowed("Dm7")
+    try:
+        registry = register_modes({"Test": ([0, 4, 5, 6, 7, 9, 10], None, None)})
+        assert get_substitution_graph().registry is registry
+        assert "Eaug" in borrowed("Dm7")
+    finally:
+        reset_mode_registry()
+    assert "Eaug" not in borrowed("Dm7")
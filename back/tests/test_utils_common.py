@@ -1,14 +1,20 @@
 import pytest
 
+from app.schema import ChordItem
 from app.utils.common import (
+    Chord,
     _get_core_quality,
+    as_chord,
+    get_chord_notes,
     get_diatonic_7th_chord,
     get_note_from_index,
     get_note_index,
+    get_tonic_index,
     is_chord_diatonic,
     is_dominant_chord,
     parse_chord,
 )
+from app.utils.qualities import QUALITY_NAMES
 
 
 @pytest.mark.parametrize(
@@ -208,3 +214,41 @@ def test_is_chord_diatonic(chord, key, mode, expected):
     Teste la fonction is_chord_diatonic avec une variété de cas.
     """
     assert is_chord_diatonic(chord, key, mode) == expected
+
+
+def test_as_chord():
+    chord = as_chord("F#m7")
+    assert chord.name == "F#m7"
+    assert (chord.root, chord.quality) == (6, "m7")
+    assert QUALITY_NAMES[chord.quality_id] == "m7"
+    # F# A C# E
+    assert chord.mask == (1 << 6) | (1 << 9) | (1 << 1) | (1 << 4)
+    # Un même nom n'est analysé qu'une fois
+    assert as_chord("F#m7") is chord
+    assert as_chord(chord) is chord
+    assert as_chord("Hm7") is None
+
+
+@pytest.mark.parametrize("chord_name", ["Cmaj7", "G7", "Bm7b5", "F#", "Gsus2", "Ebm6"])
+def test_chord_object_matches_chord_name(chord_name):
+    """Les fonctions acceptent indifféremment un nom d'accord ou un Chord déjà analysé."""
+    chord = as_chord(chord_name)
+    assert parse_chord(chord) == parse_chord(chord_name)
+    assert get_chord_notes(chord) == get_chord_notes(chord_name)
+    assert is_dominant_chord(chord) == is_dominant_chord(chord_name)
+    for mode in ["Ionian", "Aeolian", "Harmonic Minor"]:
+        assert is_chord_diatonic(chord, "C", mode) == is_chord_diatonic(chord_name, "C", mode)
+
+
+def test_chord_from_item():
+    assert Chord.from_item(ChordItem(id=1, root="Bb", quality="7")) == as_chord("Bb7")
+
+
+def test_get_tonic_index():
+    assert get_tonic_index("C") == 0
+    assert get_tonic_index("F#") == 6
+    assert get_tonic_index("Bb") == get_tonic_index("A#") == 10
+    assert get_tonic_index("Cb") == 11
+    for tonic in ("H", "Hb", "C##"):
+        with pytest.raises(ValueError):
+            get_tonic_index(tonic)
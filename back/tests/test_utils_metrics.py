@@ -0,0 +1,67 @@
+import re
+from functools import lru_cache
+
+from app.utils.metrics import (
+    Counter,
+    Histogram,
+    StageTimer,
+    model_label,
+    render_cache_metrics,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Durées.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "detection")
+    histogram.observe(0.2, 'a"b')
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP test_seconds Durées.", "# TYPE test_seconds histogram"]
+    assert 'test_seconds_bucket{stage="detection",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{stage="detection",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{stage="detection",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{stage="detection"} 3.650000' in lines
+    assert 'test_seconds_count{stage="detection"} 4' in lines
+    assert 'test_seconds_count{stage="a\\"b"} 1' in lines
+    assert histogram.count("detection") == 4
+
+
+def test_counter():
+    counter = Counter("test_calls_total", "Appels.", ("model", "outcome"))
+    counter.inc("flash", "ok")
+    counter.inc("flash", "ok")
+    counter.inc("flash", "error")
+    assert counter.value("flash", "ok") == 2
+    assert 'test_calls_total{model="flash",outcome="error"} 1' in counter.render()
+
+
+def test_stage_timer():
+    histogram = Histogram("test_stage_seconds", "Étapes.", ("stage",))
+    timer = StageTimer(histogram)
+    with timer.stage("detection"):
+        pass
+    timer.restart()
+    timer.lap("analysis")
+    timer.lap("analysis")
+    assert list(timer.durations) == ["detection", "analysis"]
+    assert histogram.count("analysis") == 2
+    assert re.fullmatch(r"detection;dur=\d+\.\d, analysis;dur=\d+\.\d", timer.server_timing())
+
+
+def test_cache_metrics():
+    @lru_cache(maxsize=None)
+    def square(value):
+        return value * value
+
+    for value in (1, 2, 1, 1):
+        square(value)
+    lines = render_cache_metrics({"square": square})
+    assert 'chords_cache_hits_total{cache="square"} 2' in lines
+    assert 'chords_cache_misses_total{cache="square"} 2' in lines
+    assert 'chords_cache_size{cache="square"} 2' in lines
+    assert 'chords_cache_hit_ratio{cache="square"} 0.5' in lines
+
+
+def test_model_label_is_bounded():
+    assert model_label("gemini-2.5-flash") == "gemini-2.5-flash"
+    assert model_label("gemini-2.5-flash-" + "x" * 100) == "other"
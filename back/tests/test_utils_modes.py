@@ -0,0 +1,133 @@
+import pytest
+
+from app.utils.borrowed_modes import find_possible_modes_for_chord
+from app.utils.common import get_scale_notes, is_chord_diatonic
+from app.utils.modes import (
+    MODE_REGISTRY,
+    derive_seventh_qualities,
+    get_mode_registry,
+    load_modes_file,
+    register_heptatonic_scales,
+    register_modes,
+    reset_mode_registry,
+)
+from constants import MODES_DATA
+
+
+def test_registry_matches_modes_data():
+    assert MODE_REGISTRY.names == tuple(MODES_DATA)
+    for mode_name, (intervals, qualities, _) in MODES_DATA.items():
+        mode_id = MODE_REGISTRY.ids[mode_name]
+        assert MODE_REGISTRY.intervals[mode_id] == tuple(intervals)
+        assert MODE_REGISTRY.qualities[mode_id] == tuple(qualities)
+        for interval in range(12):
+            expected = intervals.index(interval) if interval in intervals else -1
+            assert MODE_REGISTRY.degree(mode_name, interval) == expected
+
+
+@pytest.mark.parametrize(
+    "mode_name, expected",
+    [("Dorian", "Dorian"), ("dorian", "Dorian"), ("LOCRIAN ♮6", "Locrian ♮6"), ("Foo", None)],
+)
+def test_resolve_mode_name(mode_name, expected):
+    mode_id = MODE_REGISTRY.resolve(mode_name)
+    assert (MODE_REGISTRY.names[mode_id] if mode_id is not None else None) == expected
+
+
+def test_scale_masks_by_tonic():
+    # D Dorian = notes de Do majeur
+    ionian = MODE_REGISTRY.ids["Ionian"]
+    dorian = MODE_REGISTRY.ids["Dorian"]
+    assert MODE_REGISTRY.scale_masks_by_tonic[2][dorian] == MODE_REGISTRY.scale_masks[ionian]
+    assert MODE_REGISTRY.scale_masks[ionian] == 0b101010110101
+
+
+def test_registry_is_read_only():
+    with pytest.raises(TypeError):
+        MODES_DATA["New"] = ([0], ["maj7"], None)  # type: ignore[index]
+    with pytest.raises(ValueError):
+        MODE_REGISTRY.degree_table[0, 0] = 3
+
+
+@pytest.fixture
+def reset_registry():
+    yield
+    reset_mode_registry()
+
+
+def test_derived_qualities_match_modes_data():
+    for intervals, qualities, _ in MODES_DATA.values():
+        assert derive_seventh_qualities(intervals) == tuple(qualities)
+
+
+def test_register_modes_derives_qualities(reset_registry):
+    registry = register_modes({"Bebop Dominant": ([0, 2, 4, 5, 7, 9, 10, 11], None, None)})
+    assert get_mode_registry() is registry
+    assert registry.names[: len(MODES_DATA)] == MODE_REGISTRY.names
+    bebop = registry.ids["Bebop Dominant"]
+    assert len(registry.qualities[bebop]) == 8
+    assert registry.by_mask[0b111010110101] == (bebop,)
+    # Le registre intégré n'est pas modifié
+    assert "Bebop Dominant" not in MODE_REGISTRY.ids
+    assert reset_mode_registry() is MODE_REGISTRY
+
+
+@pytest.mark.parametrize(
+    "modes_data",
+    [
+        {"Ionian": ([0, 2, 4, 5, 7, 9, 11], None, None)},
+        {"dorian": ([0, 2, 3, 5, 7, 9, 10], None, None)},
+        {"Trop court": ([0, 4, 7], None, None)},
+        {"Désordre": ([0, 4, 2, 7, 9], None, None)},
+        {"Sans tonique": ([2, 4, 5, 7, 9], None, None)},
+        {"Qualités": ([0, 2, 4, 7, 9], ["maj7"], None)},
+        {"Inconnue": ([0, 2, 4, 7, 9], ["maj7", "m7", "m7", "7", "foo"], None)},
+    ],
+)
+def test_register_modes_rejects_invalid_scales(modes_data, reset_registry):
+    with pytest.raises(ValueError):
+        register_modes(modes_data)
+    assert get_mode_registry() is MODE_REGISTRY
+
+
+def test_register_heptatonic_scales(reset_registry):
+    registry = register_heptatonic_scales()
+    # Tous les ensembles de sept notes contenant la tonique, sans doublon
+    assert len(registry) == 462
+    assert len(registry.by_mask) == 462
+    assert set(registry.heptatonic_names) == set(registry.names)
+    # Déjà tous présents : rien de plus
+    assert len(register_heptatonic_scales()) == 462
+
+
+def test_load_modes_file(tmp_path, reset_registry):
+    path = tmp_path / "scales.json"
+    path.write_text(
+        '{"scales": [{"name": "Bebop Major", "intervals": [0, 2, 4, 5, 7, 8, 9, 11]}]}',
+        encoding="utf-8",
+    )
+    registry = load_modes_file(str(path))
+    assert get_mode_registry() is registry
+    assert len(registry) == len(MODES_DATA) + 1
+    assert len(registry.qualities[registry.ids["Bebop Major"]]) == 8
+
+
+@pytest.mark.parametrize(
+    "content", ["[]", '{"scales": [{"intervals": [0, 2, 4]}]}', '{"scales": [1]}', "{"]
+)
+def test_load_modes_file_rejects_invalid_configuration(content, tmp_path, reset_registry):
+    path = tmp_path / "scales.json"
+    path.write_text(content, encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_modes_file(str(path))
+    assert get_mode_registry() is MODE_REGISTRY
+
+
+def test_registered_modes_are_used_by_the_analysis(reset_registry):
+    register_modes({"Major Pentatonic": ([0, 2, 4, 7, 9], None, None)})
+    assert get_scale_notes("C", "Major Pentatonic") == ["C", "D", "E", "G", "A"]
+    assert is_chord_diatonic("C6", "C", "Major Pentatonic")
+    assert "Major Pentatonic" in find_possible_modes_for_chord("Am7", "C")
+    # Un mode retiré n'est plus reconnu (pas de masque périmé en cache)
+    reset_mode_registry()
+    assert not is_chord_diatonic("C6", "C", "Major Pentatonic")
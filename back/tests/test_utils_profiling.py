@@ -0,0 +1,55 @@
+import time
+
+from app.utils.profiling import RequestProfiler, profiled_call
+
+
+def _allocate(size):
+    return [str(i) for i in range(size)]
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_profiler_reports_stages_and_hot_frames():
+    profiler = RequestProfiler(interval=0.001)
+    assert profiler.start()
+    # Un seul profilage à la fois
+    assert not RequestProfiler().start()
+
+    with profiler.stage("allocation"):
+        kept = profiled_call(profiler, _allocate)(50_000)
+    profiler.restart()
+    profiled_call(profiler, _spin)(0.1)
+    profiler.lap("spin")
+    report = profiler.stop()
+    assert profiler.stop() is report
+
+    assert list(report["stages"]) == ["allocation", "spin"]
+    allocation = report["stages"]["allocation"]
+    assert allocation["allocated_bytes"] > 1_000_000
+    assert allocation["peak_bytes"] >= allocation["allocated_bytes"]
+    assert report["stages"]["spin"]["allocated_bytes"] < 100_000
+    assert report["samples"] > 0
+    spin = next(
+        item for item in report["hottest_functions"] if item["function"].startswith("_spin")
+    )
+    assert 0 < spin["self_samples"] <= spin["total_samples"]
+    assert any(
+        item["location"].startswith("tests/test_utils_profiling.py")
+        for item in report["retained_allocations"]
+    )
+    assert len(kept) == 50_000
+
+    # Le verrou est libéré à la fin
+    other = RequestProfiler()
+    assert other.start()
+    other.stop()
+
+
+def test_profiled_call_without_profiler():
+    assert profiled_call(None, _allocate) is _allocate
@@ -0,0 +1,136 @@
+import pytest
+
+from app.utils.chords_analyzer import analyze_chord_in_context
+from app.utils.common import get_chord_notes, get_note_from_index, is_chord_diatonic
+from app.utils.modes import register_modes, reset_mode_registry
+from app.utils.progression_kernel import (
+    analyze_progression,
+    detect_tonic_and_mode_locally,
+    diatonic_fit,
+    serialize_fit,
+)
+from constants import MODES_DATA
+
+CHORDS = [
+    "Cmaj7",
+    "Dm7",
+    "G7",
+    "D",
+    "Dbmaj7",
+    "E7",
+    "EM",
+    "D#add9",
+    "Bm7b5",
+    "G#dim7",
+    "F#m(maj7)",
+    "Abmaj7#5",
+    "Bbsus4",
+    "C6/9",
+    "Hm7",
+    "Invalid",
+]
+
+
+@pytest.mark.parametrize("mode_name", list(MODES_DATA))
+@pytest.mark.parametrize("tonic_index", [0, 3, 9])
+def test_analyze_progression_matches_chord_analysis(mode_name, tonic_index):
+    """Le noyau vectorisé donne exactement le même résultat que l'analyse accord par accord."""
+    expected = [analyze_chord_in_context(c, tonic_index, mode_name) for c in CHORDS]
+    assert analyze_progression(CHORDS, tonic_index, mode_name) == expected
+
+
+def test_analyze_progression_per_chord_contexts():
+    """Chaque accord peut avoir son propre contexte (tonique, mode)."""
+    progression = ["Dm7", "G7", "Cmaj7", "Am7", "E7"]
+    tonics = [0, 0, 0, 9, 9]
+    modes = ["Ionian", "Ionian", "Ionian", "Aeolian", "Aeolian"]
+    expected = [analyze_chord_in_context(c, t, m) for c, t, m in zip(progression, tonics, modes)]
+    assert analyze_progression(progression, tonics, modes) == expected
+
+
+def test_analyze_progression_empty():
+    assert analyze_progression([], 0, "Ionian") == []
+
+
+@pytest.mark.parametrize("mode_name", list(MODES_DATA))
+def test_diatonic_fit_matches_chord_by_chord_check(mode_name):
+    """Chaque cellule de la matrice correspond à la vérification accord par accord."""
+    fit = diatonic_fit(CHORDS)
+    mode_id = list(MODES_DATA).index(mode_name)
+    for tonic_index in range(12):
+        tonic = get_note_from_index(tonic_index)
+        diatonic = [is_chord_diatonic(chord, tonic, mode_name) for chord in CHORDS]
+        known = [get_chord_notes(chord) is not None for chord in CHORDS]
+        non_diatonic = [i for i, ok in enumerate(diatonic) if known[i] and not ok]
+        assert fit.diatonic_counts[tonic_index, mode_id] == sum(diatonic)
+        assert fit.first_non_diatonic[tonic_index, mode_id] == (
+            non_diatonic[0] if non_diatonic else -1
+        )
+
+
+def test_serialize_fit():
+    matrix = serialize_fit(diatonic_fit(["Dm7", "G7", "Cmaj7", "Ab"]))
+    assert len(matrix) == 12
+    c_ionian = matrix[0][0]
+    assert c_ionian == {
+        "tonic": "C",
+        "mode": "Ionian",
+        "diatonic_count": 3,
+        "out_of_key_notes": ["D#", "G#"],
+        "first_non_diatonic_index": 3,
+    }
+    c_aeolian = matrix[0][list(MODES_DATA).index("Aeolian")]
+    assert c_aeolian["out_of_key_notes"] == ["E", "A", "B"]
+    assert c_aeolian["first_non_diatonic_index"] == 0
+
+
+def test_diatonic_fit_weights_repeated_chords():
+    """Les accords répétés sont comptés autant de fois qu'ils apparaissent."""
+    fit = diatonic_fit(CHORDS)
+    repeated = diatonic_fit(list(reversed(CHORDS)) + CHORDS * 2)
+    assert (repeated.diatonic_counts == 3 * fit.diatonic_counts).all()
+    assert (repeated.out_of_key_masks == fit.out_of_key_masks).all()
+    shifted = diatonic_fit(["Hm7"] + CHORDS)
+    # Un accord inconnu en tête décale la première position non diatonique
+    assert (shifted.first_non_diatonic[fit.first_non_diatonic < 0] == -1).all()
+    known = fit.first_non_diatonic >= 0
+    assert (shifted.first_non_diatonic[known] == fit.first_non_diatonic[known] + 1).all()
+
+
+def test_diatonic_fit_without_known_chords():
+    fit = diatonic_fit(["Invalid"])
+    assert not fit.diatonic_counts.any()
+    assert (fit.first_non_diatonic == -1).all()
+
+
+@pytest.mark.parametrize(
+    "intervals", [[0, 2, 4, 7, 9], [0, 2, 4, 5, 7, 9, 10, 11], [0, 1, 2, 3, 4, 5, 6]]
+)
+def test_analyze_progression_with_registered_modes(intervals):
+    """Les modes ajoutés au registre passent par le même noyau que les modes intégrés."""
+    register_modes({"Added": (intervals, None, None)})
+    try:
+        expected = [analyze_chord_in_context(c, 2, "Added") for c in CHORDS]
+        assert analyze_progression(CHORDS, 2, "Added") == expected
+        fit = diatonic_fit(CHORDS)
+        assert fit.mode_names[-1] == "Added"
+        assert fit.diatonic_counts.shape == (12, len(MODES_DATA) + 1)
+    finally:
+        reset_mode_registry()
+
+
+@pytest.mark.parametrize(
+    "progression, tonic, mode",
+    [
+        (["Dm7", "G7", "Cmaj7"], "C", "Ionian"),
+        (["Em", "D", "C", "D", "Em"], "E", "Aeolian"),
+        (["Dm", "C", "Dm"], "D", "Dorian"),
+    ],
+)
+def test_local_detection(progression, tonic, mode):
+    result = detect_tonic_and_mode_locally(progression)
+    assert (result["global_analysis"]["tonic"], result["global_analysis"]["mode"]) == (tonic, mode)
+    (segment,) = result["harmonic_segments"]
+    assert (segment["start_index"], segment["end_index"]) == (0, len(progression) - 1)
+    with pytest.raises(ValueError):
+        detect_tonic_and_mode_locally(["Xyz"])
@@ -0,0 +1,48 @@
+import pytest
+
+from app.utils.qualities import QUALITIES, QUALITY_IDS, get_quality
+from constants import CHORD_FORMULAS, CORE_QUALITIES
+
+
+def test_registry_covers_all_qualities():
+    assert {q.name for q in QUALITIES} == set(CORE_QUALITIES) == set(CHORD_FORMULAS)
+    for quality in QUALITIES:
+        assert QUALITY_IDS[quality.name] == quality.id
+
+
+@pytest.mark.parametrize(
+    "name, core, triad, suffix, is_dominant, is_triad",
+    [
+        ("", "major", "", "", True, True),
+        ("maj7", "major", "", "maj7", False, False),
+        ("m7", "minor", "m", "7", False, False),
+        ("m7b5", "diminished", "dim", "ø7", False, False),
+        ("dim7", "diminished", "dim", "°7", False, False),
+        ("maj7#5", "major", "aug", "", False, False),
+        ("7", "dominant", "", "7", True, False),
+        ("7b5", "dominant", "dim", "", True, False),
+        ("7sus4", "suspended", "sus4", "", False, False),
+        ("+", "augmented", "aug", "", False, True),
+        ("min", "minor", "m", "", False, True),
+        ("5", "power", "5", "", False, False),
+    ],
+)
+def test_quality_attributes(name, core, triad, suffix, is_dominant, is_triad):
+    quality = get_quality(name)
+    assert quality.core == core
+    assert quality.triad == triad
+    assert quality.numeral_suffix == suffix
+    assert quality.is_dominant == is_dominant
+    assert quality.is_triad == is_triad
+
+
+def test_quality_mask():
+    # m7 : 0, 3, 7, 10
+    assert get_quality("m7").mask == (1 << 0) | (1 << 3) | (1 << 7) | (1 << 10)
+    # Les extensions sont ramenées à l'octave (9e = 2)
+    assert get_quality("add9").mask & (1 << 2)
+
+
+def test_unknown_quality():
+    assert get_quality("xyz") is None
+    assert get_quality(None) is None
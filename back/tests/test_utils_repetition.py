@@ -0,0 +1,55 @@
+import pytest
+
+from app.utils.repetition import compress_progression, expand_segments
+
+VERSE = ["Am7", "D7", "Gmaj7", "Cmaj7"]
+CHORUS = ["F#m7b5", "B7", "Em", "E7"]
+
+
+def test_compress_progression_without_repetition():
+    progression = ["C", "F", "G", "C"]
+    compressed = compress_progression(progression)
+    assert compressed.unique == progression
+    assert compressed.source_index == [0, 1, 2, 3]
+
+
+def test_compress_progression_repeated_sections():
+    """Couplet / refrain / couplet / refrain : seul le premier passage est conservé."""
+    progression = VERSE + CHORUS + VERSE + CHORUS + ["Am"]
+    compressed = compress_progression(progression)
+    assert compressed.unique == VERSE + CHORUS + ["Am"]
+    assert compressed.source_index == list(range(8)) + list(range(8)) + [8]
+    # Chaque accord d'origine pointe vers un accord identique du matériau unique
+    for i, u in enumerate(compressed.source_index):
+        assert compressed.unique[u] == progression[i]
+
+
+@pytest.mark.parametrize("length", [1, 2, 3])
+def test_compress_progression_ignores_short_repetitions(length):
+    progression = VERSE[:length] + ["Bb"] + VERSE[:length]
+    assert compress_progression(progression).unique == progression
+
+
+def test_compress_progression_long_song():
+    progression = (VERSE * 2 + CHORUS * 2) * 12
+    compressed = compress_progression(progression)
+    assert len(compressed.unique) < 20
+    assert [compressed.unique[u] for u in compressed.source_index] == progression
+
+
+def test_expand_segments():
+    """Les segments calculés sur le matériau unique sont reportés sur chaque répétition."""
+    progression = VERSE + CHORUS + VERSE + CHORUS
+    compressed = compress_progression(progression)
+    segments = [
+        {"start_index": 0, "end_index": 3, "tonic": "G", "mode": "Ionian", "explanation": "a"},
+        {"start_index": 4, "end_index": 7, "tonic": "E", "mode": "Aeolian", "explanation": "b"},
+    ]
+    expanded = expand_segments(segments, compressed.source_index)
+    assert [(s["start_index"], s["end_index"], s["tonic"]) for s in expanded] == [
+        (0, 3, "G"),
+        (4, 7, "E"),
+        (8, 11, "G"),
+        (12, 15, "E"),
+    ]
+    assert expanded[2]["explanation"] == "a"
@@ -0,0 +1,105 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from app.voice_leading.generator import (
+    VoiceLeadingWeights,
+    optimize_variants,
+    optimize_voicings,
+    parse_pitch,
+    pitch_name,
+    transition_costs,
+    voicing_candidates,
+    voicing_for_inversion,
+)
+
+
+@pytest.mark.parametrize(
+    "chord, inversion, expected",
+    [
+        # Mêmes notes que `getNotesForChord` du front
+        ("C", 0, ["C3", "E3", "G3"]),
+        ("C", 1, ["E3", "G3", "C4"]),
+        ("C", 3, ["C4", "E4", "G4"]),
+        ("C", -1, ["G2", "C3", "E3"]),
+        ("G7", 2, ["D4", "F4", "G4", "B4"]),
+        ("Cmaj9", 0, ["C3", "E3", "G3", "B3", "D4"]),
+    ],
+)
+def test_voicing_for_inversion(chord, inversion, expected):
+    assert [pitch_name(pitch) for pitch in voicing_for_inversion(chord, inversion)] == expected
+
+
+def test_parse_pitch():
+    assert parse_pitch("C3") == 36
+    assert parse_pitch("Bb4") == 58
+    assert pitch_name(parse_pitch("F#5")) == "F#5"
+    with pytest.raises(ValueError):
+        parse_pitch("H")
+
+
+def test_candidates_stay_in_range():
+    inversions, voicings = voicing_candidates("Am7", parse_pitch("C3"), parse_pitch("C5"))
+    assert voicings.min() >= parse_pitch("C3")
+    assert voicings.max() <= parse_pitch("C5")
+    assert len(set(inversions)) == len(inversions) == len(voicings)
+    for inversion, voicing in zip(inversions, voicings.tolist()):
+        assert list(voicing_for_inversion("Am7", inversion)) == voicing
+
+
+def brute_force(progression, low, high, weights):
+    candidates = [
+        voicing_candidates(chord, parse_pitch(low), parse_pitch(high)) for chord in progression
+    ]
+    center = (parse_pitch(low) + parse_pitch(high)) / 2
+    best = float("inf")
+    for path in itertools.product(*(range(len(inversions)) for inversions, _ in candidates)):
+        voicings = [candidates[position][1][index] for position, index in enumerate(path)]
+        cost = sum(weights.centering * abs(voicing.mean() - center) for voicing in voicings)
+        for previous, current in zip(voicings, voicings[1:]):
+            cost += transition_costs(previous[None], current[None], weights)[0, 0]
+        best = min(best, cost)
+    return best
+
+
+@pytest.mark.parametrize(
+    "progression",
+    [["C", "Am", "F", "G7"], ["Dm7", "G7", "Cmaj7"], ["C", "C", "F#dim", "B7"]],
+)
+def test_dynamic_programming_matches_brute_force(progression):
+    weights = VoiceLeadingWeights()
+    result = optimize_voicings(progression, "C3", "C5", weights)
+    assert result["cost"] == pytest.approx(brute_force(progression, "C3", "C5", weights))
+    assert [item["chord"] for item in result["chords"]] == progression
+
+
+def test_smooth_voice_leading():
+    result = optimize_voicings(["C", "F", "G", "C"])
+    bass_notes = [parse_pitch(item["notes"][0]) for item in result["chords"]]
+    soprano = [parse_pitch(item["notes"][-1]) for item in result["chords"]]
+    # Aucun saut de plus d'une quarte au soprano
+    assert max(np.abs(np.diff(soprano))) <= 5
+    assert all(a != b for a, b in zip(bass_notes, bass_notes[1:]))
+    for item in result["chords"]:
+        assert item["notes"] == [
+            pitch_name(pitch) for pitch in voicing_for_inversion(item["chord"], item["inversion"])
+        ]
+
+
+def test_invalid_input():
+    assert optimize_voicings([]) == {"cost": 0.0, "chords": []}
+    with pytest.raises(ValueError):
+        optimize_voicings(["C", "Xyz"])
+    with pytest.raises(ValueError):
+        optimize_voicings(["C"], "C5", "C3")
+    with pytest.raises(ValueError):
+        # Registre trop étroit pour un accord de 13e
+        optimize_voicings(["C13"], "C3", "G3")
+
+
+def test_optimize_variants():
+    variants = {"Ionian": ["C", "Dm", "G"], "Dorian": ["Cm", "Dm", "G"]}
+    results = optimize_variants(variants)
+    assert set(results) == set(variants)
+    assert [item["chord"] for item in results["Dorian"]["chords"]] == ["Cm", "Dm", "G"]